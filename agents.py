@@ -1,22 +1,267 @@
-from langchain_community.chat_models import ChatZhipuAI
-from langchain.agents import create_openai_tools_agent
-from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
+import threading
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from httpx_sse import aconnect_sse, connect_sse
+from langchain_community.chat_models.zhipuai import ChatZhipuAI
+from langchain_core.language_models import BaseChatModel
+from langchain_core.language_models.chat_models import agenerate_from_stream, generate_from_stream
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from langchain_core.runnables import Runnable
 from config import Config
-from tools import tools
+from glm_client import auth_headers, chat_chunk, chat_payload, chat_result, get_async_http_client, get_http_client
+from llm_cache import get_llm_cache
+from metrics import token_usage_handler
+from rate_limiter import AdaptiveRateLimiter, get_limiter
+from tools import get_tools
+
+
+def _report_throttle(limiter: AdaptiveRateLimiter, error: Exception) -> bool:
+    """
+    如果异常是 GLM 返回的 429，通知限速器降速并返回 True。
+    """
+    response = getattr(error, "response", None)
+    if response is None or response.status_code != 429:
+        return False
+    limiter.on_throttle(response.headers.get("Retry-After"))
+    return True
+
+
+class RateLimitedChatZhipuAI(ChatZhipuAI):
+    """
+    每次请求 GLM 都经过共享的 "glm" 限速器；遇到 429 时降低速率，非流式请求最多重试 max_retries 次。
+
+    限速包在 BaseChatModel 的 _generate/_agenerate/_stream/_astream 之外；ChatZhipuAI 只提供字段、
+    bind_tools 与环境变量读取，请求格式由 glm_client 按 GLM 的公开接口构造，不依赖 langchain_community 的
+    内部函数。请求通过 glm_client 中共享的 httpx 客户端发出，复用连接池；ChatZhipuAI 本身每次调用都会新建客户端。
+    """
+
+    max_retries: int = 2
+
+    def _prepare(self, messages: List[BaseMessage], stop: Optional[List[str]], stream: bool,
+                 kwargs: dict) -> Tuple[dict, dict]:
+        payload = chat_payload(self.model_name, self.temperature, self.max_tokens, messages, stop, stream, **kwargs)
+        return payload, auth_headers(self.zhipuai_api_key)
+
+    def _request(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, **kwargs: Any) -> ChatResult:
+        payload, headers = self._prepare(messages, stop, False, kwargs)
+        response = get_http_client().post(self.zhipuai_api_base, json=payload, headers=headers)
+        response.raise_for_status()
+        return chat_result(response.json(), self.model_name)
+
+    async def _arequest(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                        **kwargs: Any) -> ChatResult:
+        payload, headers = self._prepare(messages, stop, False, kwargs)
+        response = await get_async_http_client().post(self.zhipuai_api_base, json=payload, headers=headers)
+        response.raise_for_status()
+        return chat_result(response.json(), self.model_name)
+
+    def _request_stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                        run_manager: Any = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        payload, headers = self._prepare(messages, stop, True, kwargs)
+        with connect_sse(get_http_client(), "POST", self.zhipuai_api_base,
+                         json=payload, headers=headers) as event_source:
+            event_source.response.raise_for_status()
+            for sse in event_source.iter_sse():
+                chunk = chat_chunk(sse.data)
+                if chunk is None:
+                    continue
+                if run_manager:
+                    run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+                yield chunk
+                if chunk.generation_info is not None:
+                    break
+
+    async def _arequest_stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                               run_manager: Any = None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        payload, headers = self._prepare(messages, stop, True, kwargs)
+        async with aconnect_sse(get_async_http_client(), "POST", self.zhipuai_api_base,
+                                json=payload, headers=headers) as event_source:
+            event_source.response.raise_for_status()
+            async for sse in event_source.aiter_sse():
+                chunk = chat_chunk(sse.data)
+                if chunk is None:
+                    continue
+                if run_manager:
+                    await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+                yield chunk
+                if chunk.generation_info is not None:
+                    break
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None,
+                  stream: Optional[bool] = None, **kwargs: Any) -> ChatResult:
+        if stream if stream is not None else self.streaming:
+            return generate_from_stream(self._stream(messages, stop=stop, run_manager=run_manager, **kwargs))
+        limiter = get_limiter("glm")
+        if limiter is None:
+            return self._request(messages, stop, **kwargs)
+        for attempt in range(self.max_retries + 1):
+            try:
+                with limiter.slot():
+                    result = self._request(messages, stop, **kwargs)
+            except Exception as e:
+                if not _report_throttle(limiter, e) or attempt == self.max_retries:
+                    raise
+                continue
+            limiter.on_success()
+            return result
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Any = None, stream: Optional[bool] = None, **kwargs: Any) -> ChatResult:
+        if stream if stream is not None else self.streaming:
+            return await agenerate_from_stream(
+                self._astream(messages, stop=stop, run_manager=run_manager, **kwargs)
+            )
+        limiter = get_limiter("glm")
+        if limiter is None:
+            return await self._arequest(messages, stop, **kwargs)
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with limiter.aslot():
+                    result = await self._arequest(messages, stop, **kwargs)
+            except Exception as e:
+                if not _report_throttle(limiter, e) or attempt == self.max_retries:
+                    raise
+                continue
+            limiter.on_success()
+            return result
+
+    def _stream(self, *args: Any, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        limiter = get_limiter("glm")
+        if limiter is None:
+            yield from self._request_stream(*args, **kwargs)
+            return
+        # 流式请求在整个输出期间都占用一个并发名额
+        with limiter.slot():
+            try:
+                yield from self._request_stream(*args, **kwargs)
+            except Exception as e:
+                _report_throttle(limiter, e)
+                raise
+        limiter.on_success()
+
+    async def _astream(self, *args: Any, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        limiter = get_limiter("glm")
+        if limiter is None:
+            async for chunk in self._arequest_stream(*args, **kwargs):
+                yield chunk
+            return
+        async with limiter.aslot():
+            try:
+                async for chunk in self._arequest_stream(*args, **kwargs):
+                    yield chunk
+            except Exception as e:
+                _report_throttle(limiter, e)
+                raise
+        limiter.on_success()
+
+
+# 模型与各个 Agent 都在首次使用时创建，导入本模块不会构建任何对象；
+# Agent 按 (prompt 名, 工具名) 缓存，图中声明的多个节点可以使用不同的 prompt 与工具
+_chat_model: Optional[BaseChatModel] = None
+_agent_runnables: Dict[Tuple[str, Optional[Tuple[str, ...]]], Runnable] = {}
+_beautify_agents: Dict[str, Runnable] = {}
+_direct_agents: Dict[str, Runnable] = {}
+_summary_agent: Optional[Runnable] = None
+_lock = threading.RLock()
+
+
+def get_chat_model() -> BaseChatModel:
+    """
+    返回共享的 ChatZhipuAI 模型，请求经过客户端限速。
+    """
+    global _chat_model
+    if _chat_model is None:
+        with _lock:
+            if _chat_model is None:
+                _chat_model = RateLimitedChatZhipuAI(
+                    temperature=Config.MODEL_CONFIG["temperature"],
+                    api_key=Config.API_KEY,
+                    model=Config.MODEL_CONFIG["model"],
+                    max_retries=Config.MODEL_CONFIG["max_retries"],
+                    # 相同模型、temperature、prompt 与工具 schema 的请求直接复用缓存结果
+                    cache=get_llm_cache(Config.MODEL_CONFIG["model"], Config.MODEL_CONFIG["temperature"]) or False,
+                    # 按节点记录 prompt 与 completion 的 token 用量
+                    callbacks=[token_usage_handler],
+                )
+    return _chat_model
+
+
+def set_chat_model(model: BaseChatModel) -> None:
+    """
+    替换共享模型（例如基准测试中的替身模型），各个 Agent 会在下次使用时按新模型重建。
+    """
+    global _chat_model, _summary_agent
+    with _lock:
+        _chat_model = model
+        _agent_runnables.clear()
+        _beautify_agents.clear()
+        _direct_agents.clear()
+        _summary_agent = None
+
+
+def get_agent_runnable(prompt: str = "agent_prompt", tools: Optional[Sequence[str]] = None) -> Runnable:
+    """
+    返回调用工具的 Agent。prompt 为 Config.PROMPT_TEMPLATES 中的名字，tools 为空时使用全部已启用的工具。
+    """
+    key = (prompt, tuple(tools) if tools is not None else None)
+    agent = _agent_runnables.get(key)
+    if agent is None:
+        with _lock:
+            agent = _agent_runnables.get(key)
+            if agent is None:
+                # langchain.agents 会加载大量模块，只在第一次创建 Agent 时导入
+                from langchain.agents import create_openai_tools_agent
+                from langchain_core.prompts import ChatPromptTemplate
+
+                agent_prompt = ChatPromptTemplate.from_messages(Config.PROMPT_TEMPLATES[prompt])
+                agent_tools = [tool for tool in get_tools() if tools is None or tool.name in tools]
+                agent = _agent_runnables[key] = create_openai_tools_agent(get_chat_model(), agent_tools, agent_prompt)
+    return agent
+
+
+def get_beautify_agent(prompt: str = "beautify_prompt") -> Runnable:
+    """
+    返回美化 Agent，prompt 为 Config.PROMPT_TEMPLATES 中的名字。
+    """
+    agent = _beautify_agents.get(prompt)
+    if agent is None:
+        with _lock:
+            agent = _beautify_agents.get(prompt)
+            if agent is None:
+                from langchain_core.prompts import ChatPromptTemplate
+
+                beautify_prompt = ChatPromptTemplate.from_messages(Config.PROMPT_TEMPLATES[prompt])
+                agent = _beautify_agents[prompt] = beautify_prompt | get_chat_model()
+    return agent
+
+
+def get_direct_agent(prompt: str = "direct_prompt") -> Runnable:
+    """
+    返回不绑定工具、直接作答的 Agent，prompt 为 Config.PROMPT_TEMPLATES 中的名字。
+    """
+    agent = _direct_agents.get(prompt)
+    if agent is None:
+        with _lock:
+            agent = _direct_agents.get(prompt)
+            if agent is None:
+                from langchain_core.prompts import ChatPromptTemplate
 
-# 初始化 ChatZhipuAI 模型
-chat_zhipu = ChatZhipuAI(
-    temperature=Config.MODEL_CONFIG["temperature"],
-    api_key=Config.API_KEY,
-    model=Config.MODEL_CONFIG["model"],
-)
+                direct_prompt = ChatPromptTemplate.from_messages(Config.PROMPT_TEMPLATES[prompt])
+                agent = _direct_agents[prompt] = direct_prompt | get_chat_model()
+    return agent
 
-# 从配置中加载 Prompt 模板
-agent_prompt = ChatPromptTemplate.from_messages(Config.PROMPT_TEMPLATES["agent_prompt"])
-beautify_prompt = ChatPromptTemplate.from_messages(Config.PROMPT_TEMPLATES["beautify_prompt"])
 
-# 创建 Agent
-agent_runnable = create_openai_tools_agent(chat_zhipu, tools, agent_prompt)
+def get_summary_agent() -> Runnable:
+    """
+    返回对话摘要 Agent，history 的 summary 策略用它压缩较早的对话。
+    """
+    global _summary_agent
+    if _summary_agent is None:
+        with _lock:
+            if _summary_agent is None:
+                from langchain_core.prompts import ChatPromptTemplate
 
-# 创建美化 Agent
-beautify_agent = beautify_prompt | chat_zhipu
\ No newline at end of file
+                summary_prompt = ChatPromptTemplate.from_messages(Config.PROMPT_TEMPLATES["summary_prompt"])
+                _summary_agent = summary_prompt | get_chat_model()
+    return _summary_agent
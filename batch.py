@@ -0,0 +1,132 @@
+import argparse
+import asyncio
+import csv
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator
+
+
+def read_inputs(path: str) -> Iterator[Dict[str, str]]:
+    """
+    读取 JSONL 或 CSV 输入，每条记录至少包含 input 字段，id 缺省时使用行号。
+    """
+    with open(path, encoding="utf-8", newline="") as f:
+        if path.endswith(".csv"):
+            rows = csv.DictReader(f)
+        else:
+            rows = (json.loads(line) for line in f if line.strip())
+        for index, row in enumerate(rows):
+            yield {"id": str(row.get("id") or index), "input": row["input"]}
+
+
+def load_results(path: str) -> Dict[str, dict]:
+    """
+    从已有的输出文件中恢复进度，每个 id 只保留最后一条记录。
+    """
+    if not os.path.exists(path):
+        return {}
+    results = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # 进程崩溃时最后一行可能只写了一半
+                continue
+            results[record["id"]] = record
+    return results
+
+
+def rewrite_results(path: str, records: Iterable[dict]) -> None:
+    """
+    用给定的记录整体替换输出文件；先写临时文件再替换，重写中途崩溃不会丢失已有结果。
+    """
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    os.replace(temp_path, path)
+
+
+async def run_batch(app, input_path: str, output_path: str, concurrency: int = 8) -> Dict[str, float]:
+    """
+    以有界并发把输入逐条送入编译好的图，每完成一条立即追加写入输出 JSONL。
+
+    成功完成的记录不再重复执行；失败的记录会重跑，重跑前先从输出文件中删去旧的失败记录，
+    多次重跑后每个 id 仍然只有一条结果。
+    """
+    from graphs import final_output
+
+    results = load_results(output_path)
+    done = {key for key, record in results.items() if not record.get("error")}
+    pending = [row for row in read_inputs(input_path) if row["id"] not in done]
+    if results:
+        retried = {row["id"] for row in pending}
+        rewrite_results(output_path, (record for key, record in results.items() if key not in retried))
+    semaphore = asyncio.Semaphore(concurrency)
+    stats = {"skipped": len(done), "succeeded": 0, "failed": 0}
+    start = time.perf_counter()
+
+    with open(output_path, "a", encoding="utf-8") as out:
+        async def run_one(row: Dict[str, str]) -> None:
+            async with semaphore:
+                record = {"id": row["id"], "input": row["input"]}
+                row_start = time.perf_counter()
+                try:
+                    result = await app.ainvoke({
+                        "input": row["input"],
+                        "chat_history": [],
+                        "agent_outcome": None,
+                        "intermediate_steps": [],
+                    })
+                    record["output"] = final_output(result)
+                    stats["succeeded"] += 1
+                except Exception as e:
+                    record["error"] = f"{type(e).__name__}: {e}"
+                    stats["failed"] += 1
+                record["seconds"] = round(time.perf_counter() - row_start, 3)
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+                finished = stats["succeeded"] + stats["failed"]
+                if finished % 100 == 0:
+                    print(f"已完成 {finished}/{len(pending)}，{finished / (time.perf_counter() - start):.2f} 条/秒")
+
+        await asyncio.gather(*(run_one(row) for row in pending))
+
+    elapsed = time.perf_counter() - start
+    stats["seconds"] = elapsed
+    stats["qps"] = (stats["succeeded"] + stats["failed"]) / elapsed if elapsed else 0.0
+    return stats
+
+
+async def _main(args) -> None:
+    # 同步节点在默认线程池中运行，线程数需要跟上并发度
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=args.concurrency * 2))
+    if args.stub:
+        os.environ.setdefault("ZHIPUAI_API_KEY", "stub.stub")
+        from benchmarks.stub_servers import StubSearchServer
+        from benchmarks.stubs import StubChatModel, install_stub_llm, use_stub_search
+
+        server = StubSearchServer(latency=0.05).start()
+        use_stub_search(server.url)
+        install_stub_llm(StubChatModel(latency=0.05))
+
+    import metrics
+    from workflow import create_workflow
+
+    if args.metrics_port:
+        metrics.start_http_server(args.metrics_port)
+    stats = await run_batch(create_workflow(), args.input, args.output, args.concurrency)
+    print("批量执行结束:", json.dumps(stats, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="批量运行工作流，支持断点续跑")
+    parser.add_argument("input", help="输入文件（.jsonl 或 .csv），每条记录包含 input 字段，可选 id 字段")
+    parser.add_argument("output", help="输出 JSONL 文件，已成功的记录在重跑时会被跳过")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--stub", action="store_true", help="使用本地替身模型与替身搜索服务，离线运行")
+    parser.add_argument("--metrics-port", type=int, help="在该端口的 /metrics 上暴露 Prometheus 格式的运行指标")
+    asyncio.run(_main(parser.parse_args()))
@@ -0,0 +1,101 @@
+import re
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.runnables import Runnable
+
+from config import Config
+from observations import SENTENCE_END
+
+# 流水线模式下由 agent 节点完成润色，beautify 节点看到这个标记后直接放行
+PIPELINED_LOG = "文本美化完成（流水线）"
+
+_PARAGRAPH_END = re.compile(r"(?<=\n\n)")
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=Config.BEAUTIFY["max_concurrency"], thread_name_prefix="beautify"
+                )
+    return _executor
+
+
+class PipelinedBeautifier(BaseCallbackHandler):
+    """
+    挂在 agent 的模型调用上：回答一边生成，一边把已完整的句子或段落提交给 beautify_agent 并发润色，
+    最后按原顺序拼接，使两次模型调用在时间上重叠。
+    """
+
+    def __init__(self, beautify_agent: Runnable, chunk_by: str = "sentence", min_chunk_chars: int = 20):
+        self.beautify_agent = beautify_agent
+        self.splitter = _PARAGRAPH_END if chunk_by == "paragraph" else SENTENCE_END
+        self.separator = "\n\n" if chunk_by == "paragraph" else ""
+        self.min_chunk_chars = min_chunk_chars
+        self.streamed = ""
+        self._pending = ""
+        self._futures: List[Future] = []
+
+    @classmethod
+    def from_config(cls, beautify_agent: Runnable) -> "PipelinedBeautifier":
+        return cls(beautify_agent, Config.BEAUTIFY["chunk_by"], Config.BEAUTIFY["min_chunk_chars"])
+
+    def _submit(self, text: str) -> None:
+        # 不继承当前的回调配置，避免润色产生的 token 又回到本处理器
+        self._futures.append(_get_executor().submit(self.beautify_agent.invoke, {"text": text}))
+
+    def _drain(self, final: bool = False) -> None:
+        parts = self.splitter.split(self._pending)
+        # 最后一段可能还没写完，留到下一个 token 再处理
+        tail = "" if final else parts.pop()
+        chunk = ""
+        for part in parts:
+            chunk += part
+            if len(chunk) >= self.min_chunk_chars:
+                self._submit(chunk)
+                chunk = ""
+        self._pending = chunk + tail
+        if final and self._pending.strip():
+            self._submit(self._pending)
+            self._pending = ""
+
+    def on_llm_new_token(self, token: str, **kwargs) -> None:
+        if not token:
+            return
+        self.streamed += token
+        self._pending += token
+        self._drain()
+
+    def cancel(self) -> None:
+        """
+        本轮是工具调用而不是最终回答时，丢弃已提交的润色任务。
+        """
+        for future in self._futures:
+            future.cancel()
+        self._futures = []
+        self._pending = ""
+        self.streamed = ""
+
+    def finish(self, output: str) -> str:
+        """
+        提交剩余文本并按顺序拼接润色结果。
+
+        如果流式收到的文本与最终回答不一致（例如回答来自 LLM 缓存、没有逐 token 输出），
+        则按最终回答重新分块。
+        """
+        if self.streamed != output:
+            self.cancel()
+            self._pending = output
+        self._drain(final=True)
+        polished = [future.result().content.strip() if self.separator else future.result().content
+                    for future in self._futures]
+        self._futures = []
+        return self.separator.join(polished)
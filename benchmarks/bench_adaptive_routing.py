@@ -0,0 +1,61 @@
+# 用法：python -m benchmarks.bench_adaptive_routing [--requests 30] [--glm-latency 0.1] [--answer-size 30]
+import argparse
+import os
+import time
+
+from benchmarks.stub_servers import STUB_API_KEY, StubSearchServer
+
+os.environ.setdefault("ZHIPUAI_API_KEY", STUB_API_KEY)
+
+from benchmarks.common import format_row, latency_summary
+
+# 寒暄与改写类请求会被直接作答，其余问题仍走工具循环
+QUESTIONS = ("嗨！", "第{i}次：你好，今天心情不错", "第{i}次提问：杭州今天什么天气？", "帮我找一找近期的离婚相关案件，第{i}页",
+             "帮我写一句第{i}号生日祝福")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="自适应路由：混合请求下每个请求的延迟、模型调用次数与 agent 的 token 用量")
+    parser.add_argument("--requests", type=int, default=30)
+    parser.add_argument("--glm-latency", type=float, default=0.1)
+    parser.add_argument("--search-latency", type=float, default=0.1)
+    parser.add_argument("--answer-size", type=int, default=30, help="替身模型带工具作答时的回答长度")
+    args = parser.parse_args()
+
+    from config import Config
+
+    Config.RATE_LIMITS = {}
+    Config.SEARCH_CACHE["enabled"] = False
+    Config.LLM_CACHE["enabled"] = False
+
+    from benchmarks.stubs import StubChatModel, install_stub_llm, use_stub_search
+    from workflow import create_workflow
+
+    search = StubSearchServer(latency=args.search_latency).start()
+    use_stub_search(search.url)
+    model = StubChatModel(latency=args.glm_latency, answer_size=args.answer_size)
+    install_stub_llm(model)
+    app = create_workflow(False)
+
+    for enabled in (False, True):
+        Config.ROUTING["enabled"] = enabled
+        latencies = []
+        tokens = 0
+        calls, searches = model.calls, search.requests
+        for i in range(args.requests):
+            question = QUESTIONS[i % len(QUESTIONS)].format(i=i)
+            start = time.perf_counter()
+            state = app.invoke({"input": question, "chat_history": [], "intermediate_steps": []})
+            latencies.append(time.perf_counter() - start)
+            tokens += state["budget"].get("tokens", 0)
+        print(format_row("routing on" if enabled else "routing off", {
+            **latency_summary(latencies),
+            "glm_calls": (model.calls - calls) / args.requests,
+            "searches": (search.requests - searches) / args.requests,
+            "agent_tokens": tokens / args.requests,
+        }))
+    search.stop()
+
+
+if __name__ == "__main__":
+    main()
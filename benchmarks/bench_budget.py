@@ -0,0 +1,66 @@
+# 用法：python -m benchmarks.bench_budget [--requests 20] [--glm-latency 0.02] [--search-latency 0.02]
+import argparse
+import os
+import time
+
+from benchmarks.stub_servers import STUB_API_KEY, StubSearchServer
+
+os.environ.setdefault("ZHIPUAI_API_KEY", STUB_API_KEY)
+
+from benchmarks.common import format_row, latency_summary
+
+UNBOUNDED = {"max_iterations": None, "max_tokens": None, "max_seconds": None, "max_duplicate_queries": None}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="一直请求工具调用的 agent：有无预算时每个请求的延迟、调用次数与能否作答")
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--glm-latency", type=float, default=0.02)
+    parser.add_argument("--search-latency", type=float, default=0.02)
+    parser.add_argument("--tool-calls", type=int, default=2, help="agent 每轮请求的工具调用数")
+    args = parser.parse_args()
+
+    from config import Config
+
+    Config.RATE_LIMITS = {}
+    Config.SEARCH_CACHE["enabled"] = False
+
+    from benchmarks.stubs import StubChatModel, install_stub_llm, use_stub_search
+    from workflow import create_workflow
+
+    search = StubSearchServer(latency=args.search_latency).start()
+    use_stub_search(search.url)
+    # 工具轮数远大于图的 max_loops：模型每轮都用同样的查询继续搜索，从不主动作答
+    model = StubChatModel(latency=args.glm_latency, tool_calls=args.tool_calls, tool_rounds=100)
+    install_stub_llm(model)
+    app = create_workflow(False)
+
+    scenarios = {
+        "no budget (max_loops only)": UNBOUNDED,
+        "Config.BUDGET": {},
+        "max_seconds=0.1": {"max_seconds": 0.1, "max_duplicate_queries": None},
+    }
+    for name, budget in scenarios.items():
+        latencies = []
+        answered = 0
+        tokens = 0
+        calls, searches = model.calls, search.requests
+        for i in range(args.requests):
+            inputs = {"input": f"第{i}个问题：杭州今天什么天气？", "chat_history": [], "intermediate_steps": []}
+            start = time.perf_counter()
+            state = app.invoke(inputs, {"configurable": {"budget": budget}})
+            latencies.append(time.perf_counter() - start)
+            answered += "output" in getattr(state["agent_outcome"], "return_values", {})
+            tokens += state["budget"].get("tokens", 0)
+        print(format_row(name, {
+            **latency_summary(latencies),
+            "answered": answered / args.requests,
+            "glm_calls": (model.calls - calls) / args.requests,
+            "searches": (search.requests - searches) / args.requests,
+            "agent_tokens": tokens / args.requests,
+        }))
+    search.stop()
+
+
+if __name__ == "__main__":
+    main()
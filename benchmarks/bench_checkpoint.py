@@ -0,0 +1,122 @@
+# 用法：python -m benchmarks.bench_checkpoint [--turns 20] [--glm-latency 0.02] [--search-latency 0.02]
+import argparse
+import asyncio
+import functools
+import os
+import statistics
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+from benchmarks.stub_servers import STUB_API_KEY, StubSearchServer
+
+os.environ.setdefault("ZHIPUAI_API_KEY", STUB_API_KEY)
+
+from benchmarks.common import format_row, latency_summary
+
+
+def _timed(func: Callable, samples: List[float]) -> Callable:
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            samples.append(time.perf_counter() - start)
+    return wrapper
+
+
+def _instrument(saver) -> Dict[str, List[float]]:
+    """
+    记录每次 put/put_writes 的耗时；异步接口最终也调用这两个同步方法。
+    """
+    samples = {"put": [], "put_writes": []}
+    saver.put = _timed(saver.put, samples["put"])
+    saver.put_writes = _timed(saver.put_writes, samples["put_writes"])
+    return samples
+
+
+def _savers(directory: str) -> Dict[str, Callable]:
+    from langgraph.checkpoint.memory import MemorySaver
+
+    from checkpoints import open_checkpointer
+
+    return {
+        "no checkpointer": lambda: False,
+        "memory": MemorySaver,
+        "sqlite": lambda: open_checkpointer(os.path.join(directory, "sync.sqlite")),
+        "sqlite codec": lambda: open_checkpointer(os.path.join(directory, "codec.sqlite"), "codec"),
+    }
+
+
+def run_session(app, turns: int, thread_id: str, use_async: bool) -> List[float]:
+    """
+    在同一个会话中连续提问 turns 轮，返回每轮的耗时；历史逐轮变长，检查点也随之变大。
+    """
+    from workflow import aturn_inputs, session_config, turn_inputs
+
+    config = session_config(thread_id) if app.checkpointer is not None else None
+    latencies = []
+
+    async def arun(question: str):
+        inputs = await aturn_inputs(app, config, question) if config else _fresh(question)
+        await app.ainvoke(inputs, config)
+
+    for turn in range(turns):
+        question = f"第{turn}轮：杭州今天什么天气？"
+        start = time.perf_counter()
+        if use_async:
+            asyncio.run(arun(question))
+        else:
+            inputs = turn_inputs(app, config, question) if config else _fresh(question)
+            app.invoke(inputs, config)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def _fresh(question: str) -> dict:
+    return {"input": question, "chat_history": [], "agent_outcome": None, "intermediate_steps": []}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="检查点写入的开销：每轮延迟与 put 耗时，对比不保存检查点")
+    parser.add_argument("--turns", type=int, default=20, help="同一会话中的轮数")
+    parser.add_argument("--glm-latency", type=float, default=0.02)
+    parser.add_argument("--search-latency", type=float, default=0.02)
+    args = parser.parse_args()
+
+    from config import Config
+
+    Config.RATE_LIMITS = {}
+    Config.SEARCH_CACHE["enabled"] = False
+
+    from benchmarks.stubs import StubChatModel, install_stub_llm, use_stub_search
+    from workflow import create_workflow
+
+    search = StubSearchServer(latency=args.search_latency).start()
+    use_stub_search(search.url)
+    install_stub_llm(StubChatModel(latency=args.glm_latency))
+
+    with tempfile.TemporaryDirectory() as directory:
+        for name, factory in _savers(directory).items():
+            for use_async in (False, True):
+                saver = factory()
+                samples = _instrument(saver) if saver else {"put": [], "put_writes": []}
+                app = create_workflow(saver)
+                # 预热一轮，排除首次构建与导入
+                run_session(app, 1, "warm-up", use_async)
+                samples["put"].clear()
+                samples["put_writes"].clear()
+                latencies = run_session(app, args.turns, f"{name}-{use_async}", use_async)
+                writes = samples["put"] + samples["put_writes"]
+                print(format_row(f"{name} ({'ainvoke' if use_async else 'invoke'})", {
+                    **latency_summary(latencies),
+                    "writes_per_turn": len(writes) / args.turns,
+                    "write_ms_per_turn": sum(writes) * 1000 / args.turns,
+                    "put_p50_ms": statistics.median(samples["put"]) * 1000 if samples["put"] else 0.0,
+                }))
+    search.stop()
+
+
+if __name__ == "__main__":
+    main()
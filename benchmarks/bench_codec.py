@@ -0,0 +1,113 @@
+# 用法：python -m benchmarks.bench_codec [--runs 20] [--content-size 2000] [--repeat 20]
+import argparse
+import os
+import pickle
+import time
+from typing import Callable, List
+
+from benchmarks.stub_servers import STUB_API_KEY, StubSearchServer
+
+os.environ.setdefault("ZHIPUAI_API_KEY", STUB_API_KEY)
+
+from benchmarks.common import format_row
+
+
+def _collect(runs: int, content_size: int):
+    """
+    用替身服务执行 runs 次工作流，返回每次执行的 (各步的完整状态, 各节点返回的增量)。
+    """
+    from benchmarks.stubs import StubChatModel, install_stub_llm, use_stub_search
+    from config import Config
+    from workflow import create_workflow
+
+    Config.RATE_LIMITS = {}
+    search = StubSearchServer(content_size=content_size).start()
+    use_stub_search(search.url)
+    install_stub_llm(StubChatModel(latency=0, tool_calls=2, tool_rounds=2))
+    app = create_workflow(False)
+    executions = []
+    for i in range(runs):
+        # 每 4 次执行重复一次问题，搜索缓存返回相同的原文
+        inputs = {"input": f"第{i % 4}个问题：杭州今天什么天气？", "chat_history": [], "agent_outcome": None,
+                  "intermediate_steps": []}
+        states, updates = [], []
+        for mode, chunk in app.stream(inputs, stream_mode=["values", "updates"]):
+            if mode == "values":
+                states.append(dict(chunk))
+            else:
+                updates.extend(chunk.items())
+        executions.append((states, updates))
+    search.stop()
+    return executions
+
+
+def _timed(fn: Callable, items: list, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for item in items:
+            fn(item)
+    return (time.perf_counter() - start) / (repeat * len(items)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AgentState 的编码大小、编解码耗时与往返正确性：pickle、JSON、msgpack 与 codec")
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--content-size", type=int, default=2000, help="每条搜索结果的字符数")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    import codec
+    from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+    executions = _collect(args.runs, args.content_size)
+    states = [state for run_states, _ in executions for state in run_states]
+    jsonplus = JsonPlusSerializer()
+    formats = {
+        "pickle": (pickle.dumps, pickle.loads),
+        "jsonplus json": (jsonplus.dumps, jsonplus.loads),
+        "jsonplus msgpack": (lambda state: jsonplus.dumps_typed(state)[1],
+                             lambda data: jsonplus.loads_typed(("msgpack", data))),
+        "codec": (codec.encode, codec.decode),
+    }
+    print(f"{len(states)} 个状态，来自 {args.runs} 次执行")
+    for name, (dumps, loads) in formats.items():
+        encoded = [dumps(state) for state in states]
+        correct = sum(loads(data) == state for data, state in zip(encoded, states))
+        print(format_row(name, {
+            "bytes_per_state": sum(map(len, encoded)) / len(encoded),
+            "encode_us": _timed(dumps, states, args.repeat),
+            "decode_us": _timed(loads, encoded, args.repeat),
+            "roundtrip": correct / len(states),
+        }))
+
+    # 增量：每个节点只编码它返回的部分，同一个编码器跨执行共享字符串表与内容块，
+    # 按顺序解码并用 reducer 合并后与每次执行的最终状态比较
+    encoder = codec.StateEncoder()
+    frames: List[List[bytes]] = []
+    start = time.perf_counter()
+    for _, updates in executions:
+        frames.append([encoder.encode(update) for _, update in updates])
+    encode_seconds = time.perf_counter() - start
+    decoder = codec.StateDecoder()
+    correct = 0
+    start = time.perf_counter()
+    decoded_runs = []
+    for run_frames in frames:
+        decoded_runs.append([decoder.decode(frame) for frame in run_frames])
+    decode_seconds = time.perf_counter() - start
+    for (run_states, _), run_updates in zip(executions, decoded_runs):
+        state = dict(run_states[0])
+        for update in run_updates:
+            state = codec.apply_update(state, update)
+        correct += state == run_states[-1]
+    count = sum(map(len, frames))
+    print(format_row("codec delta stream", {
+        "bytes_per_state": sum(len(frame) for run_frames in frames for frame in run_frames) / len(states),
+        "encode_us": encode_seconds / count * 1e6,
+        "decode_us": decode_seconds / count * 1e6,
+        "roundtrip": correct / len(executions),
+    }))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+# 用法：python -m benchmarks.bench_graphs [--scenario all] [--requests 50] [--concurrency 4]
+#       [--save-baseline | --check] [--glm-latency 0.05] [--tool-calls 1] [--answer-size 120] ...
+import argparse
+import contextlib
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict
+
+from benchmarks.stub_servers import STUB_API_KEY, StubGLMServer, StubSearchServer
+
+os.environ.setdefault("ZHIPUAI_API_KEY", STUB_API_KEY)
+
+from benchmarks.common import format_row, latency_summary
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baselines", "graphs.json")
+
+# 与吞吐量、延迟一起比较的指标及其方向：1 表示越大越差，-1 表示越小越差
+REGRESSION_KEYS = {"p50_ms": 1, "p95_ms": 1, "throughput": -1, "alloc_kib_per_request": 1}
+
+
+def _use_stub_glm(model, url: str) -> None:
+    # 直接修改模型实例，已绑定到 agent/链上的同一个模型也随之生效
+    model.zhipuai_api_base = url
+    model.zhipuai_api_key = STUB_API_KEY
+
+
+def _agent_inputs(i: int) -> dict:
+    return {
+        "input": f"第{i}个问题：杭州今天什么天气？",
+        "chat_history": [],
+        "agent_outcome": None,
+        "intermediate_steps": [],
+    }
+
+
+def _create_graph(shape: str, glm_url: str, search_url: str):
+    # 三种形态共享 agents 中的模型与搜索客户端，替身服务只需设置一次
+    from benchmarks.stubs import use_stub_search
+
+    import agents
+    import graphs
+
+    _use_stub_glm(agents.get_chat_model(), glm_url)
+    use_stub_search(search_url)
+    return graphs.create_graph(shape)
+
+
+def build_chatbot(glm_url: str, search_url: str) -> Callable[[int], dict]:
+    """
+    单节点聊天图（llm1.py）。
+    """
+    graph = _create_graph("chat", glm_url, search_url)
+    return lambda i: graph.invoke({"messages": [{"role": "user", "content": f"第{i}个问题：嗨！"}]})
+
+
+def build_agent(glm_url: str, search_url: str) -> Callable[[int], dict]:
+    """
+    agent 与工具循环（llm1_tool1.py）。
+    """
+    app = _create_graph("agent", glm_url, search_url)
+    return lambda i: app.invoke(_agent_inputs(i))
+
+
+def build_workflow(glm_url: str, search_url: str) -> Callable[[int], dict]:
+    """
+    agent -> action -> beautify 三节点图（workflow.py，llm2.py 与 main.py 都运行它）。
+    """
+    app = _create_graph("beautify", glm_url, search_url)
+    return lambda i: app.invoke(_agent_inputs(i))
+
+
+SCENARIOS: Dict[str, Callable[[str, str], Callable[[int], dict]]] = {
+    "chatbot": build_chatbot,
+    "agent": build_agent,
+    "workflow": build_workflow,
+}
+
+
+def run_scenario(name: str, args) -> Dict[str, float]:
+    """
+    在当前进程中启动替身服务并运行一个场景，返回吞吐量、延迟分位数、峰值 RSS 与每请求的内存分配。
+    """
+    if not args.rate_limit:
+        # 替身服务没有配额，默认关闭客户端限速，让结果反映代码本身的开销
+        from config import Config
+        Config.RATE_LIMITS = {}
+    glm = StubGLMServer(latency=args.glm_latency, token_latency=args.token_latency, tool_calls=args.tool_calls,
+                        tool_rounds=args.tool_rounds, answer_size=args.answer_size)
+    search = StubSearchServer(latency=args.search_latency, results=args.results, content_size=args.content_size)
+    with glm, search, contextlib.redirect_stdout(io.StringIO()):
+        invoke = SCENARIOS[name](glm.url, search.url)
+        # 预热：首次调用会加载延迟导入的模块并建立连接
+        for i in range(args.warmup):
+            invoke(-1 - i)
+
+        def timed(i: int) -> float:
+            start = time.perf_counter()
+            invoke(i)
+            return time.perf_counter() - start
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            latencies = list(pool.map(timed, range(args.requests)))
+        elapsed = time.perf_counter() - start
+
+        # 内存分配单独顺序测量，tracemalloc 会显著拖慢执行，不能与计时混在一起
+        tracemalloc.start()
+        allocated = []
+        for i in range(args.alloc_requests):
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            invoke(args.requests + i)
+            allocated.append(tracemalloc.get_traced_memory()[1] - before)
+        tracemalloc.stop()
+
+    result = {
+        "throughput": args.requests / elapsed,
+        **latency_summary(latencies),
+        "peak_rss_mib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "alloc_kib_per_request": sum(allocated) / len(allocated) / 1024 if allocated else 0.0,
+        "glm_requests": glm.requests,
+        "search_requests": search.requests,
+    }
+    return result
+
+
+def _params(args) -> Dict[str, float]:
+    return {key: getattr(args, key) for key in (
+        "requests", "concurrency", "glm_latency", "token_latency", "search_latency",
+        "tool_calls", "tool_rounds", "answer_size", "results", "content_size", "rate_limit",
+    )}
+
+
+def _run_isolated(name: str, argv) -> Dict[str, float]:
+    # 每个场景在独立进程中运行，峰值 RSS 与导入开销互不影响
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_graphs", "--scenario", name, "--json", *argv],
+        check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def _compare(name: str, current: Dict[str, float], baseline: Dict[str, float], tolerance: float):
+    regressions = []
+    for key, direction in REGRESSION_KEYS.items():
+        old, new = baseline.get(key), current.get(key)
+        if not old or new is None:
+            continue
+        change = (new - old) / old * direction
+        if change > tolerance:
+            regressions.append(f"{name}.{key}: {old:.2f} -> {new:.2f} ({change:+.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="在本地替身 GLM 与联网搜索服务上端到端运行各个图")
+    parser.add_argument("--scenario", choices=["all", *SCENARIOS], default="all")
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--alloc-requests", type=int, default=5, help="在 tracemalloc 下顺序执行的请求数")
+    parser.add_argument("--glm-latency", type=float, default=0.05, help="替身 GLM 首 token 前的延迟（秒）")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="替身 GLM 每个 token 的延迟（秒）")
+    parser.add_argument("--search-latency", type=float, default=0.05, help="替身搜索服务每次请求的延迟（秒）")
+    parser.add_argument("--tool-calls", type=int, default=1, help="每轮返回的 web_search 调用数")
+    parser.add_argument("--tool-rounds", type=int, default=1, help="给出最终回答前的工具调用轮数")
+    parser.add_argument("--answer-size", type=int, default=120, help="最终回答的字符数")
+    parser.add_argument("--results", type=int, default=3, help="每次搜索返回的结果条数")
+    parser.add_argument("--content-size", type=int, default=200, help="每条搜索结果的字符数")
+    parser.add_argument("--rate-limit", action="store_true", help="保留 Config.RATE_LIMITS 中的客户端限速")
+    parser.add_argument("--save-baseline", action="store_true", help=f"把结果写入 {BASELINE_PATH}")
+    parser.add_argument("--check", action="store_true", help="与基线比较，超出容差时以非零状态退出")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="--check 允许的相对退化比例")
+    parser.add_argument("--json", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.json:
+        print(json.dumps(run_scenario(args.scenario, args)))
+        return
+
+    passthrough = [arg for arg in sys.argv[1:] if arg not in ("--save-baseline", "--check")]
+    if "--scenario" in passthrough:
+        index = passthrough.index("--scenario")
+        del passthrough[index:index + 2]
+    names = list(SCENARIOS) if args.scenario == "all" else [args.scenario]
+    results = {}
+    for name in names:
+        results[name] = _run_isolated(name, passthrough)
+        print(format_row(name, results[name]))
+
+    if args.save_baseline:
+        baselines = {}
+        if os.path.exists(BASELINE_PATH):
+            with open(BASELINE_PATH, encoding="utf-8") as f:
+                baselines = json.load(f)
+        for name, result in results.items():
+            baselines[name] = {"params": _params(args), "result": result}
+        os.makedirs(os.path.dirname(BASELINE_PATH), exist_ok=True)
+        with open(BASELINE_PATH, "w", encoding="utf-8") as f:
+            json.dump(baselines, f, ensure_ascii=False, indent=2, sort_keys=True)
+            f.write("\n")
+        print("基线已保存到", BASELINE_PATH)
+
+    if args.check:
+        with open(BASELINE_PATH, encoding="utf-8") as f:
+            baselines = json.load(f)
+        regressions = []
+        for name, result in results.items():
+            baseline = baselines.get(name)
+            if baseline is None:
+                print(f"{name}: 没有基线，跳过比较")
+                continue
+            if baseline["params"] != _params(args):
+                print(f"{name}: 基线的替身参数与本次不同，跳过比较")
+                continue
+            regressions.extend(_compare(name, result, baseline["result"], args.tolerance))
+        if regressions:
+            print("性能退化：\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+        print("未发现超出容差的退化")
+
+
+if __name__ == "__main__":
+    main()
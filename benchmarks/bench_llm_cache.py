@@ -0,0 +1,60 @@
+# 用法：python -m benchmarks.bench_llm_cache [--requests 200] [--unique 50] [--latency 0.02]
+import argparse
+import random
+import tempfile
+import time
+
+from langchain.prompts import ChatPromptTemplate
+
+from benchmarks.common import format_row
+from benchmarks.stubs import StubChatModel
+from config import Config
+from llm_cache import LLMResponseCache
+
+
+def _run(prompts, cache, latency):
+    model = StubChatModel(latency=latency, cache=cache if cache is not None else False)
+    chain = ChatPromptTemplate.from_messages(Config.PROMPT_TEMPLATES["beautify_prompt"]) | model
+    start = time.perf_counter()
+    for text in prompts:
+        chain.invoke({"text": text})
+    return time.perf_counter() - start, model.calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LLM 响应缓存的命中率与节省的延迟")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--unique", type=int, default=50, help="不同输入的数量，其余为重复输入")
+    parser.add_argument("--latency", type=float, default=0.02, help="替身模型每次调用的延迟（秒）")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    texts = [f"第{i}段需要润色的文本。" for i in range(args.unique)]
+    prompts = [rng.choice(texts) for _ in range(args.requests)]
+    # 与 prompts 等价、仅空白和全半角不同的输入，用于验证 normalize 模式
+    variants = [text.replace("。", " 。 ").replace("第", "第 ") if i % 2 else text for i, text in enumerate(prompts)]
+
+    baseline, _ = _run(prompts, None, args.latency)
+    print(format_row("no cache", {"seconds": baseline, "model_calls": args.requests}))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cases = [
+            ("memory LRU", prompts, LLMResponseCache(max_entries=1024)),
+            ("memory + sqlite", prompts, LLMResponseCache(max_entries=8, sqlite_path=f"{tmp}/llm.db")),
+            ("variants, exact", variants, LLMResponseCache(max_entries=1024)),
+            ("variants, normalized", variants, LLMResponseCache(max_entries=1024, normalize=True)),
+        ]
+        for name, inputs, store in cases:
+            view = store.for_model("stub", 0.8)
+            elapsed, calls = _run(inputs, view, args.latency)
+            stats = store.stats()
+            print(format_row(name, {
+                "seconds": elapsed,
+                "model_calls": calls,
+                "hit_rate": stats["hits"] / (stats["hits"] + stats["misses"]),
+                "saved_seconds": baseline - elapsed,
+            }))
+
+
+if __name__ == "__main__":
+    main()
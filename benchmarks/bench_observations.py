@@ -0,0 +1,50 @@
+# 用法：python -m benchmarks.bench_observations [--results 10] [--content-size 1500] [--runs 200]
+import argparse
+import time
+
+from benchmarks.common import format_row, latency_summary
+from benchmarks.stub_servers import search_payload
+
+
+def legacy_observation(payload: dict) -> str:
+    """
+    压缩之前写入 scratchpad 的内容：只取第一条结果的正文，再把整个 ToolNode 输出转成字符串。
+    """
+    from langchain_core.messages import ToolMessage
+
+    content = payload["choices"][0]["message"]["tool_calls"][1]["search_result"][0]["content"]
+    return str({"messages": [ToolMessage(content=content, name="web_search", tool_call_id="call_0")]})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="搜索结果压缩：观察结果的大小与处理耗时")
+    parser.add_argument("--query", default="杭州今天什么天气")
+    parser.add_argument("--results", type=int, default=10, help="每次搜索返回的结果条数")
+    parser.add_argument("--content-size", type=int, default=1500, help="每条结果正文的字符数")
+    parser.add_argument("--runs", type=int, default=200)
+    args = parser.parse_args()
+
+    from history import estimate_tokens
+    from observations import ObservationCompactor
+
+    payload = search_payload(args.query, args.results, args.content_size)
+    compactor = ObservationCompactor.from_config()
+    raw = "".join(entry["content"] for entry in payload["choices"][0]["message"]["tool_calls"][1]["search_result"])
+
+    latencies = []
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        compacted = compactor.compact(args.query, payload)
+        latencies.append(time.perf_counter() - start)
+
+    legacy = legacy_observation(payload)
+    print(format_row("all results (raw)", {"chars": len(raw), "tokens": estimate_tokens(raw), "links": 0}))
+    print(format_row("legacy observation", {"chars": len(legacy), "tokens": estimate_tokens(legacy),
+                                             "links": legacy.count("https://")}))
+    print(format_row("compacted observation", {"chars": len(compacted), "tokens": estimate_tokens(compacted),
+                                                "links": compacted.count("https://")}))
+    print(format_row("compact()", latency_summary(latencies)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+# 用法：python -m benchmarks.bench_pipelined_beautify [--runs 3] [--token-latency 0.01] [--answer-size 300]
+import argparse
+import contextlib
+import io
+import os
+import time
+
+os.environ.setdefault("ZHIPUAI_API_KEY", "stub.stub")
+
+from benchmarks.common import format_row, latency_summary
+from benchmarks.stub_servers import StubSearchServer
+from benchmarks.stubs import StubChatModel, install_stub_llm, use_stub_search
+from config import Config
+
+
+def main():
+    parser = argparse.ArgumentParser(description="串行 beautify 与流水线 beautify 的端到端延迟对比")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.3, help="替身模型首 token 前的延迟（秒）")
+    parser.add_argument("--token-latency", type=float, default=0.01, help="替身模型每个 token 的延迟（秒）")
+    parser.add_argument("--answer-size", type=int, default=300)
+    args = parser.parse_args()
+
+    with StubSearchServer(latency=0.05) as server:
+        use_stub_search(server.url)
+        install_stub_llm(StubChatModel(latency=args.latency, token_latency=args.token_latency,
+                                       answer_size=args.answer_size, cache=False))
+        import workflow
+        app = workflow.create_workflow()
+
+        for mode in ("sequential", "pipelined"):
+            Config.BEAUTIFY = dict(Config.BEAUTIFY, pipelined=mode == "pipelined")
+            latencies = []
+            with contextlib.redirect_stdout(io.StringIO()):
+                for i in range(args.runs):
+                    start = time.perf_counter()
+                    result = app.invoke({
+                        "input": f"第{i}个问题：{mode} 杭州今天什么天气？",
+                        "chat_history": [],
+                        "agent_outcome": None,
+                        "intermediate_steps": [],
+                    })
+                    latencies.append(time.perf_counter() - start)
+            row = latency_summary(latencies)
+            row["output_chars"] = len(result["agent_outcome"].return_values["output"])
+            print(format_row(mode, row))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+# 用法：python -m benchmarks.bench_prefetch [--requests 20] [--glm-latency 0.2] [--search-latency 0.2]
+import argparse
+import os
+import time
+
+from benchmarks.stub_servers import STUB_API_KEY, StubSearchServer
+
+os.environ.setdefault("ZHIPUAI_API_KEY", STUB_API_KEY)
+
+from benchmarks.common import format_row, latency_summary
+
+# 前两类问题会被预取，最后一类按规则跳过（替身模型对所有问题都会先搜索一次）
+QUESTIONS = ("第{i}次提问：杭州今天什么天气？", "帮我找一找近期的离婚相关案件，第{i}页", "第{i}句：你好，今天心情不错")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="推测性预取：每个请求的延迟、命中率、节省的时间与浪费的搜索")
+    parser.add_argument("--requests", type=int, default=21)
+    parser.add_argument("--glm-latency", type=float, default=0.2)
+    parser.add_argument("--search-latency", type=float, default=0.2)
+    args = parser.parse_args()
+
+    from config import Config
+
+    Config.RATE_LIMITS = {}
+    Config.SEARCH_CACHE["enabled"] = False
+
+    import prefetch
+    from benchmarks.stubs import StubChatModel, install_stub_llm, use_stub_search
+    from workflow import create_workflow
+
+    search = StubSearchServer(latency=args.search_latency).start()
+    use_stub_search(search.url)
+    install_stub_llm(StubChatModel(latency=args.glm_latency))
+    app = create_workflow(False)
+
+    for enabled in (False, True):
+        Config.PREFETCH["enabled"] = enabled
+        prefetch._prefetcher = None
+        searches = search.requests
+        latencies = []
+        for i in range(args.requests):
+            question = QUESTIONS[i % len(QUESTIONS)].format(i=i)
+            start = time.perf_counter()
+            app.invoke({"input": question, "chat_history": [], "intermediate_steps": []})
+            latencies.append(time.perf_counter() - start)
+        stats = prefetch.get_prefetcher().stats() if enabled else {}
+        speculated = stats.get("hit", 0) + stats.get("miss", 0) + stats.get("failed", 0)
+        print(format_row("prefetch on" if enabled else "prefetch off", {
+            **latency_summary(latencies),
+            "searches": (search.requests - searches) / args.requests,
+            "hit_rate": stats["hit"] / speculated if speculated else 0.0,
+            "wasted": stats.get("miss", 0) + stats.get("failed", 0),
+            "skipped": stats.get("skipped", 0),
+            "saved_ms_per_hit": stats["saved_seconds"] * 1000 / stats["hit"] if stats.get("hit") else 0.0,
+        }))
+    search.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+# 用法：python -m benchmarks.bench_rate_limiter [--seconds 8] [--threads 32] [--server-rate 20]
+import argparse
+import statistics
+import threading
+import time
+
+from benchmarks.common import format_row
+from benchmarks.stub_servers import StubSearchServer
+from rate_limiter import AdaptiveRateLimiter
+from search_client import SearchClient
+
+
+def _overload(client: SearchClient, seconds: float, threads: int) -> int:
+    deadline = time.monotonic() + seconds
+    failures = [0]
+
+    def worker(n):
+        i = 0
+        while time.monotonic() < deadline:
+            if client.search(f"worker {n} query {i}").status_code != 200:
+                failures[0] += 1
+            i += 1
+
+    pool = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return failures[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="过载时客户端限速器的稳态吞吐基准")
+    parser.add_argument("--seconds", type=float, default=8)
+    parser.add_argument("--threads", type=int, default=32, help="持续发请求的线程数（施加的负载）")
+    parser.add_argument("--server-rate", type=float, default=20, help="替身服务端每秒允许的请求数")
+    args = parser.parse_args()
+
+    cases = [
+        ("no limiter", None),
+        # 初始速率故意配置为服务端上限的两倍，由 AIMD 自行收敛
+        ("adaptive limiter", AdaptiveRateLimiter(rate=args.server_rate * 2, burst=args.server_rate,
+                                                  concurrency=8, increase_step=0.2)),
+    ]
+    for name, limiter in cases:
+        with StubSearchServer(latency=0.01, rate_limit=args.server_rate) as server:
+            client = SearchClient(api_key="stub", url=server.url, pool_size=args.threads,
+                                  backoff_base=0.05, limiter=limiter)
+            start = time.monotonic()
+            failures = _overload(client, args.seconds, args.threads)
+            client.close()
+            # 跳过第一秒的预热，按秒统计成功数
+            windows = [0] * int(args.seconds)
+            for t in server.served:
+                second = int(t - start)
+                if 0 < second < len(windows):
+                    windows[second] += 1
+            steady = windows[1:] or [0]
+            print(format_row(name, {
+                "ok_per_s_mean": statistics.fmean(steady),
+                "ok_per_s_min": float(min(steady)),
+                "ok_per_s_stdev": statistics.pstdev(steady),
+                "http_429": server.throttled,
+                "attempts_per_ok": server.requests / max(1, len(server.served)),
+                "failed_calls": failures,
+            }))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# 用法：python -m benchmarks.bench_routing [--hops 20000]
+import argparse
+import time
+
+from benchmarks.common import format_row
+
+
+def legacy_should_continue(data: dict) -> str:
+    """
+    改用声明式路由之前每一跳执行的判断：每次导入、逐个 isinstance，并记录调试日志。
+    """
+    from langchain.agents.output_parsers.tools import ToolAgentAction
+    from langchain_core.agents import AgentFinish
+
+    from workflow import logger
+
+    agent_outcome = data["agent_outcome"]
+    action = agent_outcome[0] if isinstance(agent_outcome, list) else agent_outcome
+    if isinstance(action, AgentFinish):
+        logger.debug("Agent 完成，进入美化节点")
+        return "beautify"
+    elif isinstance(action, ToolAgentAction):
+        logger.debug("Agent 需要调用工具: %s, 输入: %s", action.tool, action.tool_input)
+        return "continue"
+    return "end"
+
+
+def _per_hop_us(route, states, hops: int) -> dict:
+    start = time.perf_counter()
+    for i in range(hops):
+        route(states[i % len(states)])
+    return {"us_per_hop": (time.perf_counter() - start) / hops * 1e6}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="图的编译耗时与每一跳的路由开销")
+    parser.add_argument("--hops", type=int, default=20000)
+    args = parser.parse_args()
+
+    from langchain.agents.output_parsers.tools import ToolAgentAction
+    from langchain_core.agents import AgentFinish
+
+    import workflow
+    from config import Config
+    from graph_builder import ROUTERS, _compile_route, _successors, load_spec, validate
+    from scratchpad import ScratchStep
+
+    start = time.perf_counter()
+    workflow.create_workflow(False)
+    print(format_row("validate + compile", {"ms": (time.perf_counter() - start) * 1000}))
+
+    spec = load_spec()
+    start = time.perf_counter()
+    for _ in range(100):
+        validate(spec)
+    print(format_row("validate", {"ms": (time.perf_counter() - start) * 10}))
+
+    action = ToolAgentAction(tool="web_search", tool_input={"query": "杭州"}, log="", message_log=[],
+                             tool_call_id="call_0")
+    step = ScratchStep(turn=0, tool="web_search", tool_input={"query": "杭州"}, tool_call_id="call_0", result_ref="r")
+    states = [
+        {"agent_outcome": [action], "intermediate_steps": [step]},
+        {"agent_outcome": AgentFinish(return_values={"output": "完成"}, log=""), "intermediate_steps": [step]},
+    ]
+    # 离开循环时的 agent_loops 指标不计入路由本身的开销
+    Config.METRICS["enabled"] = False
+    edge = spec["edges"]["agent"]
+    route = _compile_route("agent", edge, ROUTERS[edge["router"]], _successors(spec))
+    print(format_row("legacy should_continue", _per_hop_us(legacy_should_continue, states, args.hops)))
+    print(format_row("compiled route table", _per_hop_us(route, states, args.hops)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# 用法：python -m benchmarks.bench_search_client [--requests 400] [--concurrency 16] [--latency 0.02]
+import argparse
+import asyncio
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from benchmarks.common import format_row, latency_summary
+from benchmarks.stub_servers import StubSearchServer
+from search_client import SearchClient
+
+
+def _bare_post(url: str, query: str) -> requests.Response:
+    # 改造前 tools.web_search 的请求方式：每次新建连接
+    data = {
+        "request_id": str(uuid.uuid4()),
+        "tool": "web-search-pro",
+        "stream": False,
+        "messages": [{"role": "user", "content": query}],
+    }
+    return requests.post(url, json=data, headers={"Authorization": "stub"}, timeout=300)
+
+
+def _run_threads(fn, total: int, concurrency: int):
+    latencies = []
+
+    def timed(i):
+        start = time.perf_counter()
+        resp = fn(f"query {i}")
+        latencies.append(time.perf_counter() - start)
+        assert resp.status_code == 200, resp.status_code
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(timed, range(total)))
+    return latencies, time.perf_counter() - start
+
+
+async def _run_async(client: SearchClient, total: int, concurrency: int):
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def timed(i):
+        async with semaphore:
+            start = time.perf_counter()
+            resp = await client.asearch(f"query {i}")
+            latencies.append(time.perf_counter() - start)
+            assert resp.status_code == 200, resp.status_code
+
+    start = time.perf_counter()
+    await asyncio.gather(*(timed(i) for i in range(total)))
+    return latencies, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="联网搜索客户端的连接复用与延迟基准")
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.02, help="替身服务端每次请求的耗时（秒）")
+    args = parser.parse_args()
+
+    cases = {
+        "bare requests.post": lambda server: (lambda q: _bare_post(server.url, q)),
+        "SearchClient.search": None,
+        "SearchClient.asearch": None,
+    }
+    for name in cases:
+        with StubSearchServer(latency=args.latency) as server:
+            client = SearchClient(api_key="stub", url=server.url, pool_size=args.concurrency)
+            if name == "bare requests.post":
+                latencies, elapsed = _run_threads(cases[name](server), args.requests, args.concurrency)
+            elif name == "SearchClient.search":
+                latencies, elapsed = _run_threads(client.search, args.requests, args.concurrency)
+            else:
+                latencies, elapsed = asyncio.run(_run_async(client, args.requests, args.concurrency))
+            client.close()
+            row = latency_summary(latencies)
+            row["qps"] = args.requests / elapsed
+            row["connections"] = server.connections
+            print(format_row(name, row))
+
+
+if __name__ == "__main__":
+    main()
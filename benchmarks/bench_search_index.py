@@ -0,0 +1,120 @@
+# 用法：python -m benchmarks.bench_search_index [--sizes 1000,10000,50000] [--lookups 200] [--batch 64]
+import argparse
+import itertools
+import os
+import random
+import time
+
+from benchmarks.stub_servers import STUB_API_KEY, StubSearchServer
+
+os.environ.setdefault("ZHIPUAI_API_KEY", STUB_API_KEY)
+
+from benchmarks.common import format_row, latency_summary
+
+CITIES = ("杭州", "北京", "上海", "广州", "深圳", "成都", "武汉", "南京", "西安", "重庆", "苏州", "天津", "长沙", "郑州",
+          "青岛", "厦门", "宁波", "合肥", "昆明", "大连")
+SUBJECTS = ("天气", "房价", "美食推荐", "地铁线路", "限行规定", "旅游景点", "离婚案件", "劳动仲裁案例", "人口数量", "最新新闻")
+# 第一种问法写入索引，其余问法作为同一个问题的改写去检索：前几种只差疑问词与套话，
+# 后几种调换了词序或多了修饰词，散列嵌入只能部分匹配
+TEMPLATES = ("{city}{subject}是什么", "请问{city}的{subject}", "帮我查一下{city}有哪些{subject}", "{subject} {city}",
+             "{city}本地{subject}", "{city}最近的{subject}情况怎么样")
+
+
+def _offline_quality(index_factory):
+    """
+    一半的 (城市, 主题) 组合写入索引；已写入组合的改写应当命中原查询，未写入的组合不应命中任何结果。
+    """
+    combos = list(itertools.product(CITIES, SUBJECTS))
+    random.Random(0).shuffle(combos)
+    stored, novel = combos[:len(combos) // 2], combos[len(combos) // 2:]
+    index = index_factory()
+    index.extend([TEMPLATES[0].format(city=city, subject=subject) for city, subject in stored],
+                 [{"combo": [city, subject]} for city, subject in stored])
+    paraphrases = [(template.format(city=city, subject=subject), [city, subject])
+                   for city, subject in stored for template in TEMPLATES[1:]]
+    correct = sum(index.lookup(query) == {"combo": combo} for query, combo in paraphrases)
+    novel_queries = [template.format(city=city, subject=subject) for city, subject in novel for template in TEMPLATES]
+    false_hits = sum(index.lookup(query) is not None for query in novel_queries)
+    return {"stored": len(stored), "recall@1": correct / len(paraphrases),
+            "false_hit_rate": false_hits / len(novel_queries)}
+
+
+def _filled(index_factory, size: int):
+    index = index_factory()
+    rng = random.Random(size)
+    queries = [f"{rng.choice(CITIES)}{rng.choice(SUBJECTS)} 第{i}条 {rng.randrange(10 ** 6)}" for i in range(size)]
+    for start in range(0, size, 1000):
+        index.extend(queries[start:start + 1000], [{"i": i} for i in range(start, min(start + 1000, size))])
+    return index
+
+
+def _timing(index, queries, batch: int):
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        index.lookup(query)
+        latencies.append(time.perf_counter() - start)
+    start = time.perf_counter()
+    for offset in range(0, len(queries), batch):
+        index.search(queries[offset:offset + batch], k=5)
+    batched = time.perf_counter() - start
+    return {**latency_summary(latencies), "batched_qps": len(queries) / batched}
+
+
+def _network_calls(questions, search_latency: float):
+    """
+    经过 web_search 工具执行一组问题（关闭精确缓存），返回联网次数与每次调用的平均耗时。
+    """
+    from benchmarks.stubs import use_stub_search
+    from tools import _web_search
+
+    search = StubSearchServer(latency=search_latency).start()
+    use_stub_search(search.url)
+    start = time.perf_counter()
+    for question in questions:
+        _web_search(question)
+    elapsed = time.perf_counter() - start
+    search.stop()
+    return {"searches": search.requests, "mean_ms": elapsed / len(questions) * 1000}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="检索先于搜索：本地索引的召回率、误命中率、检索延迟与节省的联网次数")
+    parser.add_argument("--sizes", default="1000,10000,50000", help="索引条数，逗号分隔")
+    parser.add_argument("--lookups", type=int, default=200)
+    parser.add_argument("--batch", type=int, default=64, help="批量检索时每批的查询数")
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--min-similarity", type=float, default=0.9)
+    parser.add_argument("--search-latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    import search_index
+    from config import Config
+    from search_index import SearchIndex
+
+    def index_factory(max_entries: int = 1000):
+        return SearchIndex(dim=args.dim, max_entries=max_entries, min_similarity=args.min_similarity)
+
+    print(format_row("offline quality", _offline_quality(index_factory)))
+
+    rng = random.Random(1)
+    queries = [TEMPLATES[rng.randrange(len(TEMPLATES))].format(city=rng.choice(CITIES), subject=rng.choice(SUBJECTS))
+               for _ in range(args.lookups)]
+    for size in (int(size) for size in args.sizes.split(",")):
+        index = _filled(lambda: index_factory(size), size)
+        print(format_row(f"lookup {size} entries", _timing(index, queries, args.batch)))
+
+    # 端到端：每个问题以两种问法各问一次，开启索引时第二种问法不再联网
+    Config.RATE_LIMITS = {}
+    Config.SEARCH_CACHE["enabled"] = False
+    combos = list(itertools.product(CITIES[:5], SUBJECTS[:4]))
+    questions = [template.format(city=city, subject=subject) for template in TEMPLATES[:2] for city, subject in combos]
+    for enabled in (False, True):
+        Config.SEARCH_INDEX = dict(Config.SEARCH_INDEX, enabled=enabled, path=None)
+        search_index._index = None
+        print(format_row("index on" if enabled else "index off",
+                         {"questions": len(questions), **_network_calls(questions, args.search_latency)}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+# 用法：python -m benchmarks.bench_server [--clients 8] [--requests 20] [--glm-latency 0.05]
+import argparse
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple
+
+from benchmarks.stub_servers import STUB_API_KEY, StubGLMServer, StubSearchServer
+
+os.environ.setdefault("ZHIPUAI_API_KEY", STUB_API_KEY)
+
+from benchmarks.bench_startup import STAGES, measure
+from benchmarks.common import format_row, latency_summary
+
+
+async def request(port: int, path: str, payload: dict = None, conn=None) -> Tuple[int, bytes, tuple]:
+    """
+    发送一个 HTTP/1.1 请求并读取完整响应；conn 为 (reader, writer) 时复用 keep-alive 连接。
+    """
+    reader, writer = conn or await asyncio.open_connection("127.0.0.1", port)
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8") if payload is not None else b""
+    method = "POST" if payload is not None else "GET"
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: bench\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode().partition(":")
+        headers[name.strip().lower()] = value.strip()
+    if "content-length" in headers:
+        data = await reader.readexactly(int(headers["content-length"]))
+    else:
+        data = await reader.read()
+    if headers.get("connection") == "close":
+        writer.close()
+        return status, data, None
+    return status, data, (reader, writer)
+
+
+async def _client(port: int, client_id: int, requests: int, path: str, latencies: List[float], statuses: list):
+    conn = None
+    for i in range(requests):
+        start = time.perf_counter()
+        status, _, conn = await request(port, path, {"input": f"客户端{client_id}的第{i}个问题：杭州天气"}, conn)
+        statuses.append(status)
+        if status == 200:
+            latencies.append(time.perf_counter() - start)
+    if conn:
+        conn[1].close()
+
+
+async def load(server, clients: int, requests: int, path: str = "/invoke") -> dict:
+    latencies, statuses = [], []
+    start = time.perf_counter()
+    await asyncio.gather(*(_client(server.port, c, requests, path, latencies, statuses) for c in range(clients)))
+    elapsed = time.perf_counter() - start
+    return {
+        "throughput": len(latencies) / elapsed,
+        **latency_summary(latencies),
+        "rejected": sum(1 for status in statuses if status == 503),
+    }
+
+
+async def drain(server, clients: int) -> dict:
+    """
+    请求进行中时触发关闭：进行中的请求应全部完成，就绪探针与新连接应立即失效。
+    """
+    tasks = [asyncio.create_task(request(server.port, "/invoke", {"input": f"关闭前的第{i}个问题"}))
+             for i in range(clients)]
+    await asyncio.sleep(0.05)
+    start = time.perf_counter()
+    shutdown = asyncio.create_task(server.shutdown())
+    await asyncio.sleep(0)
+    try:
+        await request(server.port, "/ready")
+        refused = False
+    except OSError:
+        refused = True
+    results = await asyncio.gather(*tasks)
+    await shutdown
+    return {
+        "in_flight": clients,
+        "completed": sum(1 for status, _, _ in results if status == 200),
+        "new_connections_refused": refused,
+        "drain_ms": (time.perf_counter() - start) * 1000,
+    }
+
+
+async def run(args) -> None:
+    from config import Config
+    from server import WorkflowServer, warm_up
+
+    # 替身服务没有配额，关闭客户端限速
+    Config.RATE_LIMITS = {}
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=args.clients * 2))
+    glm = StubGLMServer(latency=args.glm_latency).start()
+    search = StubSearchServer(latency=args.search_latency).start()
+
+    from benchmarks.stubs import use_stub_search
+    import agents
+
+    use_stub_search(search.url)
+    model = agents.get_chat_model()
+    model.zhipuai_api_base = glm.url
+    model.zhipuai_api_key = STUB_API_KEY
+    app = warm_up()
+
+    server = WorkflowServer(app, port=0, max_concurrency=args.clients, queue_size=args.clients)
+    await server.start()
+    print(format_row("invoke", await load(server, args.clients, args.requests)))
+    print(format_row("stream", await load(server, args.clients, max(1, args.requests // 4), "/stream")))
+    await server.shutdown()
+
+    # 过载：执行名额与排队长度都很小，多余的请求应立即得到 503 而不是无限排队
+    server = WorkflowServer(app, port=0, max_concurrency=2, queue_size=2)
+    await server.start()
+    print(format_row("overload (2 + 2 queued)", await load(server, args.clients * 2, 2)))
+    await server.shutdown()
+
+    server = WorkflowServer(app, port=0, max_concurrency=args.clients, queue_size=args.clients)
+    await server.start()
+    print(format_row("graceful shutdown", await drain(server, args.clients)))
+
+    glm.stop()
+    search.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP 服务的负载测试：吞吐量、延迟、背压与优雅关闭")
+    parser.add_argument("--clients", type=int, default=8, help="并发客户端数，每个客户端复用一条 keep-alive 连接")
+    parser.add_argument("--requests", type=int, default=20, help="每个客户端发送的请求数")
+    parser.add_argument("--glm-latency", type=float, default=0.05)
+    parser.add_argument("--search-latency", type=float, default=0.05)
+    parser.add_argument("--cold-runs", type=int, default=3, help="对照：每次新起进程处理一个请求的次数")
+    args = parser.parse_args()
+
+    if args.cold_runs:
+        # 对照组：像 main.py 一样每个请求都启动进程、导入模块并编译图
+        print(format_row("cold process per request", measure(STAGES["first request"], args.cold_runs)))
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
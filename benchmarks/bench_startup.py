@@ -0,0 +1,88 @@
+# 用法：python -m benchmarks.bench_startup [--runs 5] [--top 10]
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from benchmarks.common import format_row
+from benchmarks.stub_servers import STUB_API_KEY
+
+# 每个阶段在全新的解释器中执行，分别测量耗时与峰值 RSS
+STAGES = {
+    "import config": "import config",
+    "import workflow": "import workflow",
+    "create_workflow()": "import workflow; workflow.create_workflow()",
+    "first request": """
+from benchmarks.stub_servers import StubSearchServer
+from benchmarks.stubs import StubChatModel, install_stub_llm, use_stub_search
+server = StubSearchServer().start()
+use_stub_search(server.url)
+install_stub_llm(StubChatModel(latency=0))
+import workflow
+workflow.create_workflow().invoke({"input": "杭州天气", "chat_history": [], "agent_outcome": None, "intermediate_steps": []})
+""",
+}
+
+_PROBE = """
+import json, resource, sys, time
+start = time.perf_counter()
+exec(compile(sys.argv[1], "<stage>", "exec"))
+print(json.dumps({"seconds": time.perf_counter() - start,
+                  "rss_mib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+                  "modules": len(sys.modules)}))
+"""
+
+
+def _env() -> dict:
+    return dict(os.environ, ZHIPUAI_API_KEY=os.environ.get("ZHIPUAI_API_KEY", STUB_API_KEY))
+
+
+def measure(code: str, runs: int) -> dict:
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-c", _PROBE, code], check=True, capture_output=True,
+                                text=True, env=_env()).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+    return {
+        "ms": statistics.median(sample["seconds"] for sample in samples) * 1000,
+        "rss_mib": statistics.median(sample["rss_mib"] for sample in samples),
+        "modules": samples[-1]["modules"],
+    }
+
+
+def import_profile(module: str, top: int):
+    """
+    用 python -X importtime 找出导入 module 时自身耗时最多的模块。
+    """
+    stderr = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], check=True,
+                            capture_output=True, text=True, env=_env()).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        rows.append((int(self_us), int(cumulative_us), name.strip()))
+    total = next((cumulative for _, cumulative, name in rows if name == module), 0)
+    return total, sorted(rows, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="冷启动耗时与内存：导入、构建图与第一次请求")
+    parser.add_argument("--runs", type=int, default=5, help="每个阶段重复启动的次数，取中位数")
+    parser.add_argument("--top", type=int, default=10, help="列出自身导入耗时最多的模块数")
+    parser.add_argument("--module", default="workflow", help="用 -X importtime 分析的模块")
+    args = parser.parse_args()
+
+    for name, code in STAGES.items():
+        print(format_row(name, measure(code, args.runs)))
+
+    total, rows = import_profile(args.module, args.top)
+    print(f"\n-X importtime: import {args.module} 累计 {total / 1000:.1f} ms，自身耗时最多的模块：")
+    for self_us, cumulative_us, name in rows:
+        print(f"  {self_us / 1000:8.1f} ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
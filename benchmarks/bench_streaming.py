@@ -0,0 +1,69 @@
+# 用法：python -m benchmarks.bench_streaming [--runs 5] [--latency 0.3] [--token-latency 0.01]
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import time
+
+os.environ.setdefault("ZHIPUAI_API_KEY", "stub.stub")
+
+from benchmarks.common import format_row, latency_summary
+from benchmarks.stub_servers import StubSearchServer
+from benchmarks.stubs import StubChatModel, install_stub_llm, use_stub_search
+
+
+def _inputs(i: int) -> dict:
+    return {
+        "input": f"第{i}个问题：杭州今天什么天气？",
+        "chat_history": [],
+        "agent_outcome": None,
+        "intermediate_steps": [],
+    }
+
+
+async def _stream_once(app, workflow, i: int):
+    start = time.perf_counter()
+    first_token = first_beautify = None
+    async for node, _ in workflow.astream_tokens(app, _inputs(i)):
+        now = time.perf_counter() - start
+        if first_token is None:
+            first_token = now
+        if node == "beautify" and first_beautify is None:
+            first_beautify = now
+    return first_token, first_beautify, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="流式输出的首 token 延迟（TTFT）基准")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.3, help="替身模型首 token 前的延迟（秒）")
+    parser.add_argument("--token-latency", type=float, default=0.01, help="替身模型每个 token 的延迟（秒）")
+    parser.add_argument("--answer-size", type=int, default=200)
+    args = parser.parse_args()
+
+    with StubSearchServer(latency=0.05) as server:
+        use_stub_search(server.url)
+        install_stub_llm(StubChatModel(latency=args.latency, token_latency=args.token_latency,
+                                       answer_size=args.answer_size))
+        import workflow
+        app = workflow.create_workflow()
+
+        blocking = []
+        streamed = []
+        with contextlib.redirect_stdout(io.StringIO()):
+            for i in range(args.runs):
+                start = time.perf_counter()
+                app.invoke(_inputs(i))
+                blocking.append(time.perf_counter() - start)
+            for i in range(args.runs):
+                streamed.append(asyncio.run(_stream_once(app, workflow, args.runs + i)))
+
+    print(format_row("invoke: first output", latency_summary(blocking)))
+    print(format_row("stream: first token", latency_summary([r[0] for r in streamed])))
+    print(format_row("stream: first beautify token", latency_summary([r[1] for r in streamed])))
+    print(format_row("stream: complete", latency_summary([r[2] for r in streamed])))
+
+
+if __name__ == "__main__":
+    main()
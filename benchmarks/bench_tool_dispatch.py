@@ -0,0 +1,88 @@
+# 用法：python -m benchmarks.bench_tool_dispatch [--calls 2000]
+import argparse
+import asyncio
+import time
+import uuid
+from typing import Callable
+
+from benchmarks.common import format_row
+
+
+def _echo(query: str) -> str:
+    return query
+
+
+async def _aecho(query: str) -> str:
+    return query
+
+
+def _build_echo():
+    from langchain_core.tools import StructuredTool
+
+    return StructuredTool.from_function(func=_echo, coroutine=_aecho, name="echo", description="原样返回 query。")
+
+
+def legacy_input(tool: str, query: str) -> dict:
+    """
+    改用调度器之前 execute_tools 为每次调用构造的 ToolNode 输入。
+    """
+    from langchain_core.messages import AIMessage
+
+    tool_call_id = str(uuid.uuid4())
+    return {
+        "messages": [
+            {"role": "user", "content": query},
+            AIMessage(content="", tool_calls=[{"id": tool_call_id, "name": tool, "args": {"query": query}}]),
+        ],
+    }
+
+
+def _per_call_us(func: Callable[[int], object], calls: int) -> dict:
+    func(0)
+    start = time.perf_counter()
+    for i in range(calls):
+        func(i)
+    return {"us_per_call": (time.perf_counter() - start) / calls * 1e6}
+
+
+async def _aper_call_us(func, calls: int) -> dict:
+    await func(0)
+    start = time.perf_counter()
+    for i in range(calls):
+        await func(i)
+    return {"us_per_call": (time.perf_counter() - start) / calls * 1e6}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="工具调用开销：ToolNode 消息往返与直接调度对比（不含工具本身的耗时）")
+    parser.add_argument("--calls", type=int, default=2000)
+    args = parser.parse_args()
+
+    from langgraph.prebuilt import ToolNode
+
+    from tools import ToolDispatcher
+
+    tool = _build_echo()
+    node = ToolNode([tool])
+    dispatcher = ToolDispatcher([tool])
+
+    print(format_row("ToolNode.invoke + str()", _per_call_us(
+        lambda i: str(node.invoke(legacy_input("echo", f"问题{i}"))), args.calls)))
+    print(format_row("ToolDispatcher.invoke", _per_call_us(
+        lambda i: dispatcher.invoke("echo", {"query": f"问题{i}"}, f"call_{i}"), args.calls)))
+
+    async def run_async():
+        async def legacy(i):
+            return str(await node.ainvoke(legacy_input("echo", f"问题{i}")))
+
+        async def direct(i):
+            return await dispatcher.ainvoke("echo", {"query": f"问题{i}"}, f"call_{i}")
+
+        print(format_row("ToolNode.ainvoke + str()", await _aper_call_us(legacy, args.calls)))
+        print(format_row("ToolDispatcher.ainvoke", await _aper_call_us(direct, args.calls)))
+
+    asyncio.run(run_async())
+
+
+if __name__ == "__main__":
+    main()
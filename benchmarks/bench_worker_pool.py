@@ -0,0 +1,83 @@
+# 用法：python -m benchmarks.bench_worker_pool [--requests 48] [--workers 1,2,4] [--concurrency 8]
+#       [--content-size 20000] [--answer-size 2000] [--glm-latency 0.02]
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from benchmarks.stub_servers import STUB_API_KEY, StubSearchServer
+
+os.environ.setdefault("ZHIPUAI_API_KEY", STUB_API_KEY)
+
+from benchmarks.common import format_row, latency_summary
+
+
+def _inputs(i: int) -> dict:
+    return {"input": f"第{i}个问题：杭州今天什么天气？", "chat_history": [], "agent_outcome": None,
+            "intermediate_steps": []}
+
+
+def _measure(submit, requests: int) -> dict:
+    # submit(i) 返回 Future；一次性全部提交，延迟含排队时间，吞吐量按墙钟时间计算
+    latencies = []
+    start = time.perf_counter()
+    futures = []
+    for i in range(requests):
+        future = submit(i)
+        future.add_done_callback(lambda _, submitted=time.perf_counter(): latencies.append(
+            time.perf_counter() - submitted))
+        futures.append(future)
+    for future in futures:
+        future.result()
+    elapsed = time.perf_counter() - start
+    return {**latency_summary(latencies), "throughput": requests / elapsed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="单进程多线程与 1~N 个工作进程执行同一组图：吞吐量与延迟")
+    parser.add_argument("--requests", type=int, default=48)
+    parser.add_argument("--workers", default="1,2,4", help="逗号分隔的工作进程数")
+    parser.add_argument("--concurrency", type=int, default=8, help="每个进程同时执行的图数")
+    parser.add_argument("--glm-latency", type=float, default=0.02)
+    parser.add_argument("--search-latency", type=float, default=0.02)
+    parser.add_argument("--results", type=int, default=10, help="每次搜索返回的结果数")
+    parser.add_argument("--content-size", type=int, default=20000, help="每条搜索结果的字符数，越大解析与渲染越耗 CPU")
+    parser.add_argument("--answer-size", type=int, default=2000)
+    args = parser.parse_args()
+
+    from benchmarks.stubs import StubChatModel, install_stub_llm, install_stubs, use_stub_search
+    from config import Config
+    from worker_pool import WorkerPool
+    from workflow import create_workflow
+
+    search = StubSearchServer(latency=args.search_latency, results=args.results,
+                              content_size=args.content_size).start()
+    stub_args = (search.url, args.glm_latency, False)
+    stub_options = {"answer_size": args.answer_size}
+    print(f"CPU 核数: {os.cpu_count()}，每个进程并发 {args.concurrency}")
+
+    # 基准：在当前进程内用同样的总并发执行；每个问题都不同，搜索缓存不会命中
+    workers_list = [int(n) for n in args.workers.split(",")]
+    Config.RATE_LIMITS = {}
+    use_stub_search(search.url)
+    install_stub_llm(StubChatModel(latency=args.glm_latency, **stub_options))
+    app = create_workflow(False)
+    app.invoke(_inputs(-1))
+    for workers in workers_list:
+        with ThreadPoolExecutor(max_workers=args.concurrency * workers) as executor:
+            row = _measure(lambda i: executor.submit(app.invoke, _inputs(i)), args.requests)
+        print(format_row(f"threads x{args.concurrency * workers}", row))
+
+    for workers in workers_list:
+        pool = WorkerPool(workers=workers, concurrency=args.concurrency, checkpointer=False,
+                          initializer=partial(install_stubs, **stub_options), initargs=stub_args)
+        with pool:
+            pool.invoke(_inputs(-1))
+            row = _measure(lambda i: pool.submit(_inputs(i)), args.requests)
+        print(format_row(f"workers={workers}", row))
+    search.stop()
+
+
+if __name__ == "__main__":
+    main()
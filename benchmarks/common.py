@@ -0,0 +1,33 @@
+import math
+import statistics
+from typing import Dict, Sequence
+
+
+def percentile(values: Sequence[float], p: float) -> float:
+    """
+    最近秩法计算百分位数，values 为空时返回 0。
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(p / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def latency_summary(latencies: Sequence[float]) -> Dict[str, float]:
+    """
+    把一组以秒为单位的耗时汇总为毫秒级的 p50/p95/p99。
+    """
+    return {
+        "count": len(latencies),
+        "mean_ms": statistics.fmean(latencies) * 1000 if latencies else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+def format_row(name: str, values: Dict[str, float]) -> str:
+    cells = ", ".join(f"{key}={value:.2f}" if isinstance(value, float) else f"{key}={value}"
+                      for key, value in values.items())
+    return f"{name:<28} {cells}"
@@ -0,0 +1,290 @@
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 替身服务不校验鉴权；ChatZhipuAI 会用它签发 JWT，密钥部分需要足够长
+STUB_API_KEY = "stub." + "s" * 32
+
+
+def search_payload(query: str, results: int, content_size: int) -> dict:
+    """
+    构造与 web-search-pro 返回格式一致的响应体。
+    """
+    search_result = [
+        {
+            "index": i,
+            "title": f"{query} - 结果 {i}",
+            "link": f"https://example.com/{i}",
+            "content": (f"{query} 的相关内容 {i}。" * (content_size // 10 + 1))[:content_size],
+            "media": "stub",
+            "refer": f"ref_{i}",
+        }
+        for i in range(results)
+    ]
+    return {
+        "choices": [{
+            "index": 0,
+            "finish_reason": "stop",
+            "message": {
+                "role": "tool",
+                "tool_calls": [
+                    {"id": "intent", "type": "search_intent",
+                     "search_intent": [{"category": "search", "query": query, "intent": "SEARCH_ALL"}]},
+                    {"id": "result", "type": "search_result", "search_result": search_result},
+                ],
+            },
+        }],
+    }
+
+
+class _QuietHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # 客户端提前断开连接（例如流式请求被取消）不是替身服务的错误
+        if not issubclass(sys.exc_info()[0], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class _StubServer:
+    """
+    在后台线程中运行的本地 HTTP 替身服务，统计连接数与请求数。
+    """
+
+    handler_class = BaseHTTPRequestHandler
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        stub = self
+
+        class Handler(self.handler_class):
+            protocol_version = "HTTP/1.1"
+            server_stub = stub
+
+            def setup(self):
+                super().setup()
+                with stub.lock:
+                    stub.connections += 1
+
+            def log_message(self, *args):
+                pass
+
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.requests = 0
+        self.httpd = _QuietHTTPServer((host, port), Handler)
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class _SearchHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        stub = self.server_stub
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        with stub.lock:
+            stub.requests += 1
+            throttled = not stub.admit()
+        if throttled:
+            self._reply(429, {"error": "rate limited"}, {"Retry-After": stub.retry_after})
+            return
+        time.sleep(stub.latency)
+        if stub.error_rate and random.random() < stub.error_rate:
+            self._reply(stub.error_status, {"error": "stub overloaded"})
+            return
+        query = body.get("messages", [{}])[-1].get("content", "")
+        self._reply(200, search_payload(query, stub.results, stub.content_size))
+        with stub.lock:
+            stub.served.append(time.monotonic())
+
+    def _reply(self, status: int, payload: dict, headers: dict = None):
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class StubSearchServer(_StubServer):
+    """
+    open.bigmodel.cn/api/paas/v4/tools 的本地替身。
+
+    latency 为每次请求的服务端耗时（秒），results/content_size 控制返回的结果条数与每条长度，
+    error_rate 为随机返回 error_status（默认 503）的比例；rate_limit 大于 0 时按每秒 rate_limit 个请求限流，
+    超出的请求返回 429 并带上 Retry-After。served 记录每个成功响应的时间。
+    """
+
+    handler_class = _SearchHandler
+
+    def __init__(self, latency: float = 0.0, results: int = 3, content_size: int = 200,
+                 error_rate: float = 0.0, rate_limit: float = 0.0, retry_after: str = "1", error_status: int = 503,
+                 **kwargs):
+        super().__init__(**kwargs)
+        self.latency = latency
+        self.results = results
+        self.content_size = content_size
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.rate_limit = rate_limit
+        self.retry_after = retry_after
+        self.throttled = 0
+        self.served = []
+        self._tokens = rate_limit
+        self._updated = time.monotonic()
+
+    def admit(self) -> bool:
+        """
+        服务端令牌桶，调用方需持有 self.lock。
+        """
+        if not self.rate_limit:
+            return True
+        now = time.monotonic()
+        self._tokens = min(self.rate_limit, self._tokens + (now - self._updated) * self.rate_limit)
+        self._updated = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return True
+        self.throttled += 1
+        return False
+
+    @property
+    def url(self) -> str:
+        return super().url + "/api/paas/v4/tools"
+
+
+def _usage(prompt_chars: int, completion_chars: int, chars_per_token: int) -> dict:
+    prompt = prompt_chars // chars_per_token
+    completion = -(-completion_chars // chars_per_token)
+    return {"prompt_tokens": prompt, "completion_tokens": completion, "total_tokens": prompt + completion}
+
+
+class _GLMHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        stub = self.server_stub
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        with stub.lock:
+            stub.requests += 1
+        messages = body.get("messages", [])
+        prompt_chars = sum(len(str(m.get("content") or "")) for m in messages)
+        message = stub.respond(messages, bool(body.get("tools")))
+        time.sleep(stub.latency)
+        if not body.get("stream"):
+            time.sleep(stub.token_latency * len(stub.tokens(message.get("content", ""))))
+            self._reply({
+                "id": f"stub-{stub.requests}",
+                "model": body.get("model", ""),
+                "choices": [{"index": 0, "finish_reason": "tool_calls" if "tool_calls" in message else "stop",
+                             "message": message}],
+                "usage": _usage(prompt_chars, len(message.get("content", "")), stub.chars_per_token),
+            })
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        if "tool_calls" in message:
+            deltas = [{"role": "assistant", "content": "", "tool_calls": message["tool_calls"]}]
+        else:
+            deltas = [{"role": "assistant", "content": token} for token in stub.tokens(message["content"])]
+        for i, delta in enumerate(deltas):
+            if i:
+                time.sleep(stub.token_latency)
+            chunk = {"id": f"stub-{stub.requests}", "model": body.get("model", ""),
+                     "choices": [{"index": 0, "delta": delta}]}
+            if i == len(deltas) - 1:
+                # 与 GLM 一致：最后一个分块带 finish_reason 与 usage
+                chunk["choices"][0]["finish_reason"] = "tool_calls" if "tool_calls" in message else "stop"
+                chunk["usage"] = _usage(prompt_chars, len(message.get("content", "")), stub.chars_per_token)
+            self._write_chunk(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+        self._write_chunk(b"data: [DONE]\n\n")
+        self._write_chunk(b"")
+
+    def _write_chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def _reply(self, payload: dict):
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class StubGLMServer(_StubServer):
+    """
+    open.bigmodel.cn/api/paas/v4/chat/completions 的本地替身，支持普通响应与 SSE 流式响应。
+
+    行为与 benchmarks.stubs.StubChatModel 相同：请求带 tools 且已完成的工具轮数少于 tool_rounds 时，
+    返回 tool_calls 个 web_search 调用，否则返回约 answer_size 个字符的回答；不带 tools 时
+    原样复述用户消息中 "：\n" 之后的文本。latency 为首个 token 前的延迟，token_latency 为之后每个 token 的延迟。
+    """
+
+    handler_class = _GLMHandler
+
+    def __init__(self, latency: float = 0.0, token_latency: float = 0.0, tool_calls: int = 1,
+                 tool_rounds: int = 1, answer_size: int = 120, chars_per_token: int = 2, **kwargs):
+        super().__init__(**kwargs)
+        self.latency = latency
+        self.token_latency = token_latency
+        self.tool_calls = tool_calls
+        self.tool_rounds = tool_rounds
+        self.answer_size = answer_size
+        self.chars_per_token = chars_per_token
+
+    def tokens(self, text: str) -> list:
+        return [text[i:i + self.chars_per_token] for i in range(0, len(text), self.chars_per_token)]
+
+    def respond(self, messages: list, with_tools: bool) -> dict:
+        question = next((m.get("content") or "" for m in reversed(messages) if m.get("role") == "user"), "")
+        # ChatZhipuAI 发送历史时不带 assistant 的 tool_calls，按 tool 消息分组计算已完成的轮数
+        rounds = sum(1 for prev, m in zip(messages, messages[1:])
+                     if m.get("role") == "tool" and prev.get("role") != "tool")
+        if with_tools and rounds < self.tool_rounds and self.tool_calls > 0:
+            with self.lock:
+                serial = self.requests
+            return {"role": "assistant", "content": "", "tool_calls": [
+                {
+                    "id": f"call_{serial}_{i}",
+                    "type": "function",
+                    "index": i,
+                    "function": {
+                        "name": "web_search",
+                        "arguments": json.dumps({"query": question if i == 0 else f"{question} 补充{i}"},
+                                                ensure_ascii=False),
+                    },
+                }
+                for i in range(self.tool_calls)
+            ]}
+        if not with_tools:
+            return {"role": "assistant", "content": question.split("：\n", 1)[-1]}
+        prefix = "根据搜索结果，" if rounds else ""
+        sentence = f"{prefix}关于“{question[:20]}”的回答。"
+        return {"role": "assistant", "content": (sentence * (self.answer_size // len(sentence) + 1))[:self.answer_size]}
+
+    @property
+    def url(self) -> str:
+        return super().url + "/api/paas/v4/chat/completions"
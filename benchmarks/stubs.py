@@ -0,0 +1,131 @@
+import json
+import time
+from typing import Any, Iterator, List, Optional
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+
+class StubChatModel(BaseChatModel):
+    """
+    ChatZhipuAI 的离线替身。
+
+    latency 为首个 token 之前的延迟，token_latency 为之后每个 token 的延迟（秒）；
+    绑定了工具且已完成的工具轮数少于 tool_rounds 时，返回 tool_calls 个 web_search 调用，
+    否则返回约 answer_size 个字符、按句号分句的回答；没有绑定工具时（beautify 等改写类调用）
+    原样复述用户消息中的待处理文本，输出长度与输入相同。
+    """
+
+    latency: float = 0.05
+    token_latency: float = 0.0
+    tool_calls: int = 1
+    tool_rounds: int = 1
+    answer_size: int = 120
+    chars_per_token: int = 2
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub-chat"
+
+    @property
+    def _identifying_params(self) -> dict:
+        return {"latency": self.latency, "tool_calls": self.tool_calls, "answer_size": self.answer_size}
+
+    def _respond(self, messages: List[BaseMessage], **kwargs: Any) -> AIMessage:
+        self.calls += 1
+        question = next((m.content for m in reversed(messages) if isinstance(m, HumanMessage)), "")
+        rounds = sum(1 for m in messages if isinstance(m, AIMessage) and m.tool_calls)
+        if kwargs.get("tools") and rounds < self.tool_rounds and self.tool_calls > 0:
+            return AIMessage(content="", tool_calls=[
+                {
+                    "id": f"call_{self.calls}_{i}",
+                    "name": "web_search",
+                    "args": {"query": question if i == 0 else f"{question} 补充{i}"},
+                }
+                for i in range(self.tool_calls)
+            ])
+        if not kwargs.get("tools"):
+            return AIMessage(content=question.split("：\n", 1)[-1])
+        prefix = "根据搜索结果，" if rounds else ""
+        sentence = f"{prefix}关于“{question[:20]}”的回答。"
+        return AIMessage(content=(sentence * (self.answer_size // len(sentence) + 1))[:self.answer_size])
+
+    def _tokens(self, text: str) -> List[str]:
+        return [text[i:i + self.chars_per_token] for i in range(0, len(text), self.chars_per_token)]
+
+    def _usage(self, messages: List[BaseMessage], message: AIMessage) -> dict:
+        # 与 GLM 返回的 usage 字段格式一致，按字符数粗略折算
+        prompt = sum(len(str(m.content)) for m in messages) // self.chars_per_token
+        completion = len(self._tokens(message.content)) + 10 * len(message.tool_calls)
+        return {"prompt_tokens": prompt, "completion_tokens": completion, "total_tokens": prompt + completion}
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        message = self._respond(messages, **kwargs)
+        time.sleep(self.latency + self.token_latency * len(self._tokens(message.content)))
+        return ChatResult(generations=[ChatGeneration(message=message)],
+                          llm_output={"token_usage": self._usage(messages, message)})
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Any = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        message = self._respond(messages, **kwargs)
+        time.sleep(self.latency)
+        if message.tool_calls:
+            chunk = AIMessageChunk(content="", tool_call_chunks=[
+                {"id": call["id"], "name": call["name"], "args": json.dumps(call["args"], ensure_ascii=False),
+                 "index": i}
+                for i, call in enumerate(message.tool_calls)
+            ])
+            yield ChatGenerationChunk(message=chunk, generation_info={"token_usage": self._usage(messages, message)})
+            return
+        tokens = self._tokens(message.content)
+        for i, token in enumerate(tokens):
+            time.sleep(self.token_latency)
+            # 与 ChatZhipuAI 一样，用量放在最后一个分块的 generation_info 中
+            info = {"token_usage": self._usage(messages, message)} if i == len(tokens) - 1 else None
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token), generation_info=info)
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+
+def install_stub_llm(model: BaseChatModel) -> None:
+    """
+    用替身模型替换共享的 GLM 模型，agent 与美化 Agent 随之改用替身。
+    """
+    import agents
+    from metrics import token_usage_handler
+
+    if not model.callbacks:
+        model.callbacks = [token_usage_handler]
+    agents.set_chat_model(model)
+
+
+def use_stub_search(url: str) -> None:
+    """
+    让 web_search 请求本地替身服务，并清空共享的搜索客户端与缓存。
+    """
+    import search_cache
+    import search_client
+    from config import Config
+
+    Config.SEARCH_CONFIG = dict(Config.SEARCH_CONFIG, url=url)
+    search_client._client = None
+    search_cache._cache = None
+
+
+def install_stubs(search_url: str, latency: float = 0.05, rate_limits: bool = False, **model_options: Any) -> None:
+    """
+    工作进程的 initializer：在进程内安装替身模型并指向替身搜索服务，rate_limits 为 False 时关闭客户端限速。
+    """
+    import os
+
+    from config import Config
+
+    os.environ.setdefault("ZHIPUAI_API_KEY", "stub.stub")
+    if not rate_limits:
+        Config.RATE_LIMITS = {}
+    use_stub_search(search_url)
+    install_stub_llm(StubChatModel(latency=latency, **model_options))
@@ -0,0 +1,164 @@
+import json
+from typing import Dict, List, Optional, Sequence
+from uuid import UUID
+
+from langchain_core.agents import AgentAction, AgentFinish
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from langchain_core.runnables import RunnableConfig
+
+import metrics
+from config import Config
+from scratchpad import ScratchStep
+from search_cache import normalize_query
+
+# 预算的四项资源，依次检查，先用尽的一项作为原因
+RESOURCES = ("iterations", "tokens", "seconds", "duplicates")
+_LABELS = {
+    "iterations": "工具调用轮数",
+    "tokens": "token 用量",
+    "seconds": "执行时间",
+    "duplicates": "重复查询次数",
+}
+# 回答中引用最近几次工具结果
+_MAX_OBSERVATIONS = 3
+# 预算用尽时 agent 给出的 AgentFinish 在 return_values 中带上这个键（值为用尽的资源），路由器据此走 budget 路由；
+# 不另设子类，检查点与 langchain 的序列化都只认识内置的 AgentFinish
+EXHAUSTED = "budget_exhausted"
+
+
+def merge_usage(left: Dict[str, float], right: Optional[Dict[str, float]]) -> Dict[str, float]:
+    """
+    budget 的 reducer：把本步的用量累加到本次执行的合计上；传入 None 表示开始新一轮，清零。
+    """
+    if right is None:
+        return {}
+    if not right:
+        return left
+    merged = dict(left)
+    for key, value in right.items():
+        merged[key] = merged.get(key, 0) + value
+    return merged
+
+
+class UsageCollector(BaseCallbackHandler):
+    """
+    单次节点执行内的 token 计数，随 config 传给 agent；命中 LLM 缓存的调用没有用量信息，不计入。
+    """
+
+    def __init__(self):
+        self.tokens = 0
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs) -> None:
+        usage = metrics.token_usage(response)
+        if usage:
+            self.tokens += usage.get("total_tokens") or (
+                (usage.get("prompt_tokens") or 0) + (usage.get("completion_tokens") or 0))
+
+
+def _query_key(tool: str, tool_input) -> str:
+    if not isinstance(tool_input, dict):
+        tool_input = {"input": tool_input}
+    normalized = {key: normalize_query(value) if isinstance(value, str) else value
+                  for key, value in tool_input.items()}
+    return tool + "\x00" + json.dumps(normalized, ensure_ascii=False, sort_keys=True, default=str)
+
+
+def find_duplicates(previous: Sequence[ScratchStep], actions: Sequence[AgentAction]) -> List[Optional[int]]:
+    """
+    找出本轮中与之前（含本轮更早的调用）重复的工具调用：查询语句规范化后相同即视为重复。
+
+    返回与 actions 等长的列表，重复的位置为之前结果的来源：非负数为本轮中的下标，
+    负数 -1 - i 为 previous[i]；不重复的位置为 None。
+    """
+    seen = {}
+    for index, step in enumerate(previous):
+        seen.setdefault(_query_key(step.tool, step.tool_input), -1 - index)
+    duplicates = []
+    for index, action in enumerate(actions):
+        key = _query_key(action.tool, action.tool_input) if isinstance(action, AgentAction) else None
+        duplicates.append(seen.get(key) if key is not None else None)
+        if key is not None:
+            seen.setdefault(key, index)
+    return duplicates
+
+
+def best_answer(reason: str, steps: Sequence[ScratchStep], observations: Dict[str, str]) -> str:
+    """
+    不再调用模型，用最近几次不重复的工具结果拼出回答。
+    """
+    refs = []
+    for step in reversed(steps):
+        if step.result_ref in observations and step.result_ref not in refs:
+            refs.append(step.result_ref)
+        if len(refs) == _MAX_OBSERVATIONS:
+            break
+    label = _LABELS.get(reason, reason)
+    if not refs:
+        return f"已达到{label}上限，暂时无法给出完整的回答。"
+    found = "\n\n".join(observations[ref] for ref in reversed(refs))
+    return f"已达到{label}上限，以下是目前检索到的信息：\n\n{found}"
+
+
+class Budget:
+    """
+    单次执行（一轮问答）的预算，四项资源任意一项用尽时不再调用工具：
+
+    - iterations：agent 与 action 之间的循环轮数
+    - tokens：agent 调用模型消耗的 token 总数
+    - seconds：agent 与 action 节点的累计耗时，从检查点恢复的执行不计入中断的时间
+    - duplicates：规范化后与之前相同的查询次数
+
+    上限为 None 时不限制该项。默认值取 Config.BUDGET，可以在 config["configurable"]["budget"] 中按请求覆盖。
+    """
+
+    def __init__(
+            self,
+            max_iterations: Optional[int] = 5,
+            max_tokens: Optional[int] = 20000,
+            max_seconds: Optional[float] = 60,
+            max_duplicate_queries: Optional[int] = 2,
+    ):
+        self.limits = {
+            "iterations": max_iterations,
+            "tokens": max_tokens,
+            "seconds": max_seconds,
+            "duplicates": max_duplicate_queries,
+        }
+
+    @classmethod
+    def from_config(cls, config: Optional[RunnableConfig] = None) -> "Budget":
+        overrides = ((config or {}).get("configurable") or {}).get("budget") or {}
+        return cls(**{**Config.BUDGET, **overrides})
+
+    def exhausted(self, usage: Dict[str, float]) -> Optional[str]:
+        """
+        返回第一项用尽的资源，都还有余量时返回 None。
+        """
+        for resource in RESOURCES:
+            limit = self.limits[resource]
+            if limit is not None and usage.get(resource, 0) >= limit:
+                return resource
+        return None
+
+    def finish(self, reason: str, steps: Sequence[ScratchStep], observations: Dict[str, str]) -> AgentFinish:
+        """
+        用已有的工具结果作答，不再调用模型。
+        """
+        if metrics.enabled():
+            metrics.budget_exhausted.inc(reason=reason)
+        return AgentFinish(
+            return_values={"output": best_answer(reason, steps, observations), EXHAUSTED: reason},
+            log=f"预算用尽：{reason}",
+        )
+
+    def observe(self, usage: Dict[str, float]) -> None:
+        """
+        执行离开循环时记录各项资源的使用比例。
+        """
+        if not metrics.enabled():
+            return
+        for resource in RESOURCES:
+            limit = self.limits[resource]
+            if limit:
+                metrics.budget_used.observe(usage.get(resource, 0) / limit, resource=resource)
@@ -0,0 +1,95 @@
+import asyncio
+import functools
+import sqlite3
+import threading
+from typing import Any, AsyncIterator, Dict, Optional, Sequence, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import ChannelVersions, Checkpoint, CheckpointMetadata, CheckpointTuple
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+from config import Config
+
+
+class ThreadedSqliteSaver(SqliteSaver):
+    """
+    SqliteSaver 只实现了同步接口；图通过 ainvoke/astream 运行时，异步接口在默认线程池中
+    调用同步实现，不阻塞事件循环，同步与异步执行共用同一个连接。
+    """
+
+    def setup(self) -> None:
+        if self.is_setup:
+            return
+        # WAL 模式下 synchronous=NORMAL 每次提交不再等待 fsync，进程崩溃不会丢失已提交的检查点
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        super().setup()
+
+    async def _run(self, func, *args, **kwargs):
+        return await asyncio.get_running_loop().run_in_executor(None, functools.partial(func, *args, **kwargs))
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await self._run(self.get_tuple, config)
+
+    async def alist(
+            self,
+            config: Optional[RunnableConfig],
+            *,
+            filter: Optional[Dict[str, Any]] = None,
+            before: Optional[RunnableConfig] = None,
+            limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        items = await self._run(lambda: list(self.list(config, filter=filter, before=before, limit=limit)))
+        for item in items:
+            yield item
+
+    async def aput(
+            self,
+            config: RunnableConfig,
+            checkpoint: Checkpoint,
+            metadata: CheckpointMetadata,
+            new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await self._run(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+            self,
+            config: RunnableConfig,
+            writes: Sequence[Tuple[str, Any]],
+            task_id: str,
+    ) -> None:
+        await self._run(self.put_writes, config, writes, task_id)
+
+    def close(self) -> None:
+        with self.lock:
+            self.conn.close()
+
+
+def open_checkpointer(path: str, serializer: str = "jsonplus") -> ThreadedSqliteSaver:
+    """
+    打开 SQLite 检查点存储；serializer 为 "codec" 时状态按 codec.py 的紧凑格式保存。
+    """
+    if serializer not in ("jsonplus", "codec"):
+        raise ValueError(f"未知的检查点序列化方式: {serializer}")
+    serde = None
+    if serializer == "codec":
+        from codec import serializer as codec_serializer
+
+        serde = codec_serializer()
+    return ThreadedSqliteSaver(sqlite3.connect(path, check_same_thread=False), serde=serde)
+
+
+_checkpointer: Optional[ThreadedSqliteSaver] = None
+_checkpointer_lock = threading.Lock()
+
+
+def get_checkpointer() -> ThreadedSqliteSaver:
+    """
+    返回进程内共享的检查点存储，数据库路径为 Config.CHECKPOINT["sqlite_path"]。
+    """
+    global _checkpointer
+    if _checkpointer is None:
+        with _checkpointer_lock:
+            if _checkpointer is None:
+                _checkpointer = open_checkpointer(Config.CHECKPOINT["sqlite_path"],
+                                                  Config.CHECKPOINT.get("serializer", "jsonplus"))
+    return _checkpointer
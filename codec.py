@@ -0,0 +1,325 @@
+import functools
+import hashlib
+import struct
+import threading
+import time
+import typing
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple
+
+import msgpack
+from langchain_core.agents import AgentAction, AgentFinish
+from langchain_core.messages import (
+    AIMessage, AIMessageChunk, BaseMessage, ChatMessage, FunctionMessage, HumanMessage, SystemMessage, ToolMessage,
+)
+
+# 帧格式：MAGIC（2 字节）+ 版本（1 字节）+ 标志（1 字节）+ msgpack 正文。
+# 修改任何对象的编码方式都需要提升 VERSION，解码时拒绝不认识的版本
+MAGIC = b"LS"
+VERSION = 1
+# 编码器的第一帧带上这个标志，解码器遇到时清空字符串表与内容块，多个流首尾相接也能正确解码
+_RESET = 0x01
+
+# 扩展类型编号；_FOREIGN 包装 langgraph JsonPlusSerializer 的 msgpack 编码，用于本模块不认识的对象
+_STR_DEF, _STR_REF, _BLOB, _BLOB_REF, _TUPLE = 16, 17, 18, 19, 20
+_ACTION, _TOOL_ACTION, _FINISH, _MESSAGE, _STEP, _FOREIGN = 21, 22, 23, 24, 25, 26
+
+_MESSAGE_TYPES: Dict[str, type] = {
+    cls.model_fields["type"].default: cls
+    for cls in (HumanMessage, AIMessage, SystemMessage, ToolMessage, ChatMessage, FunctionMessage, AIMessageChunk)
+}
+_DIGEST_BYTES = 12
+
+
+class CodecError(ValueError):
+    """
+    数据不是本模块编码的帧，或者版本不受支持、引用了之前没有出现过的字符串或内容块。
+    """
+
+
+def _digest(data: bytes) -> bytes:
+    return hashlib.sha1(data).digest()[:_DIGEST_BYTES]
+
+
+@functools.lru_cache(maxsize=None)
+def _tool_action_class():
+    # langchain.agents 导入较重，只在遇到 ToolAgentAction 时导入
+    from langchain.agents.output_parsers.tools import ToolAgentAction
+
+    return ToolAgentAction
+
+
+class StateEncoder:
+    """
+    把 AgentState（或它的任意部分，例如节点返回的增量、检查点）编码为紧凑的二进制帧。
+
+    - 工具名与消息类型进入字符串表，第一次出现时写出原文，之后只写编号
+    - 嵌套字典中的字符串值（observations 中的搜索原文）、消息内容与最终回答不少于 blob_min_chars 个字符时
+      按内容寻址，第一次出现时写出原文，之后只写 12 字节的摘要
+    - AgentAction、AgentFinish、消息与 ScratchStep 按字段编码，不写类路径；元组保持为元组
+
+    字典、列表与字符串由 msgpack 的 C 实现直接编码，只有上述对象回调到 Python。
+    字符串表与内容块在同一个编码器的多次 encode 之间共享，后续的帧只能按顺序交给同一个 StateDecoder；
+    需要单独解码的帧（例如检查点）每次使用新的编码器，见 encode()。encode 失败时撤销这一帧新登记的
+    字符串与内容块，编码器仍与只收到成功帧的解码器保持一致。不是线程安全的。
+    """
+
+    def __init__(self, blob_min_chars: int = 256, max_interned: int = 4096):
+        self.blob_min_chars = blob_min_chars
+        self.max_interned = max_interned
+        # 字符串 -> 已经构造好的引用，重复出现时不再构造 ExtType
+        self._strings: Dict[str, msgpack.ExtType] = {}
+        # 已写出原文的内容块摘要，按登记顺序保存，失败时从末尾撤销
+        self._blobs: Dict[bytes, None] = {}
+        self._started = False
+
+    def encode(self, value: Any) -> bytes:
+        flags = 0 if self._started else _RESET
+        strings, blobs = len(self._strings), len(self._blobs)
+        try:
+            frame = MAGIC + bytes((VERSION, flags)) + self._packb(self._texts(value))
+        except BaseException:
+            # 失败的帧不会被写出，它登记的字符串与内容块也不能被之后的帧引用
+            while len(self._strings) > strings:
+                self._strings.popitem()
+            while len(self._blobs) > blobs:
+                self._blobs.popitem()
+            raise
+        self._started = True
+        return frame
+
+    def _packb(self, value: Any) -> bytes:
+        # 每次新建 Packer：_default 中编码嵌套字段时会重入
+        return msgpack.packb(value, default=self._default, use_bin_type=True, strict_types=True)
+
+    def _name(self, value: str) -> Any:
+        ref = self._strings.get(value)
+        if ref is not None:
+            return ref
+        index = len(self._strings)
+        if index >= self.max_interned:
+            return value
+        self._strings[value] = msgpack.ExtType(_STR_REF, index.to_bytes(1 if index < 256 else 2, "big"))
+        return msgpack.ExtType(_STR_DEF, value.encode("utf-8"))
+
+    def _text(self, value: Any) -> Any:
+        if type(value) is not str or len(value) < self.blob_min_chars:
+            return value
+        data = value.encode("utf-8")
+        digest = _digest(data)
+        if digest in self._blobs:
+            return msgpack.ExtType(_BLOB_REF, digest)
+        self._blobs[digest] = None
+        return msgpack.ExtType(_BLOB, digest + data)
+
+    def _texts(self, value: Any) -> Any:
+        # 只沿嵌套的字典向下：状态、检查点的 channel_values 与 observations 都是字典
+        if isinstance(value, dict):
+            return {key: self._texts(item) for key, item in value.items()}
+        return self._text(value)
+
+    def _ext(self, code: int, fields: list) -> msgpack.ExtType:
+        # 字段在这里按顺序编码，字符串表的编号与解码时的出现顺序一致
+        return msgpack.ExtType(code, self._packb(fields))
+
+    def _default(self, value: Any) -> Any:
+        cls = type(value)
+        if cls is tuple:
+            return self._ext(_TUPLE, list(value))
+        if isinstance(value, BaseMessage) and value.type in _MESSAGE_TYPES:
+            extra = value.model_dump(exclude_defaults=True, exclude={"type", "content"})
+            return self._ext(_MESSAGE, [self._name(value.type), self._text(value.content), extra])
+        if cls is AgentFinish:
+            return self._ext(_FINISH, [self._texts(value.return_values), value.log])
+        if cls is AgentAction:
+            return self._ext(_ACTION, [self._name(value.tool), value.tool_input, value.log])
+        if cls.__name__ == "ToolAgentAction" and cls is _tool_action_class():
+            return self._ext(_TOOL_ACTION, [self._name(value.tool), value.tool_input, value.log,
+                                            list(value.message_log), value.tool_call_id])
+        if cls.__name__ == "ScratchStep" and cls is _scratch_step():
+            return self._ext(_STEP, [value.turn, self._name(value.tool), value.tool_input, value.tool_call_id,
+                                     value.result_ref])
+        # langgraph 返回的 AddableValuesDict 等子类按普通的字典与列表编码
+        if isinstance(value, dict):
+            return dict(value)
+        if isinstance(value, list):
+            return list(value)
+        from langgraph.checkpoint.serde.jsonplus import _msgpack_enc
+
+        # 其他对象（langgraph 的 Send 等）交给 langgraph 的序列化，同样无法编码时抛出 TypeError
+        return msgpack.ExtType(_FOREIGN, _msgpack_enc(value))
+
+
+@functools.lru_cache(maxsize=None)
+def _scratch_step():
+    from scratchpad import ScratchStep
+
+    return ScratchStep
+
+
+class StateDecoder:
+    """
+    StateEncoder 的逆过程；同一个编码器产生的多帧需要按顺序交给同一个解码器。不是线程安全的。
+    """
+
+    def __init__(self):
+        self._strings: List[str] = []
+        self._blobs: Dict[bytes, str] = {}
+
+    def decode(self, data: bytes) -> Any:
+        if len(data) < 4 or data[:2] != MAGIC:
+            raise CodecError("不是状态编码的帧")
+        if data[2] != VERSION:
+            raise CodecError(f"不支持的版本 {data[2]}，当前版本为 {VERSION}")
+        if data[3] & _RESET:
+            self._strings.clear()
+            self._blobs.clear()
+        return self._unpack(data[4:])
+
+    def _unpack(self, data: bytes) -> Any:
+        return msgpack.unpackb(data, ext_hook=self._ext, strict_map_key=False, raw=False, use_list=True)
+
+    def _ext(self, code: int, data: bytes) -> Any:
+        try:
+            if code == _STR_DEF:
+                value = data.decode("utf-8")
+                self._strings.append(value)
+                return value
+            if code == _STR_REF:
+                return self._strings[int.from_bytes(data, "big")]
+            if code == _BLOB:
+                value = self._blobs[data[:_DIGEST_BYTES]] = data[_DIGEST_BYTES:].decode("utf-8")
+                return value
+            if code == _BLOB_REF:
+                return self._blobs[data]
+        except (IndexError, KeyError):
+            raise CodecError("引用了之前的帧中定义的字符串或内容块，帧需要按编码顺序解码")
+        if code == _FOREIGN:
+            from langgraph.checkpoint.serde.jsonplus import _msgpack_ext_hook
+
+            return msgpack.unpackb(data, ext_hook=_msgpack_ext_hook, strict_map_key=False)
+        fields = self._unpack(data)
+        if code == _TUPLE:
+            return tuple(fields)
+        if code == _MESSAGE:
+            kind, content, extra = fields
+            return _MESSAGE_TYPES[kind](content=content, **extra)
+        if code == _FINISH:
+            return AgentFinish(return_values=fields[0], log=fields[1])
+        if code == _ACTION:
+            return AgentAction(tool=fields[0], tool_input=fields[1], log=fields[2])
+        if code == _TOOL_ACTION:
+            tool, tool_input, log, message_log, tool_call_id = fields
+            return _tool_action_class()(tool=tool, tool_input=tool_input, log=log, message_log=message_log,
+                                        tool_call_id=tool_call_id)
+        if code == _STEP:
+            return _scratch_step()(*fields)
+        return msgpack.ExtType(code, data)
+
+
+def encode(value: Any, blob_min_chars: int = 256) -> bytes:
+    """
+    编码为可以单独解码的一帧。
+    """
+    return StateEncoder(blob_min_chars).encode(value)
+
+
+def decode(data: bytes) -> Any:
+    return StateDecoder().decode(data)
+
+
+@functools.lru_cache(maxsize=None)
+def _reducers(schema: type) -> Dict[str, Tuple[Callable, Callable]]:
+    # 字段名 -> (reducer, 初始值)；与 langgraph 相同，带 reducer 的字段从类型的空值开始合并
+    reducers = {}
+    for key, hint in typing.get_type_hints(schema, include_extras=True).items():
+        reducer = next((meta for meta in getattr(hint, "__metadata__", ()) if callable(meta)), None)
+        if reducer is not None:
+            reducers[key] = (reducer, typing.get_origin(hint.__origin__) or hint.__origin__)
+    return reducers
+
+
+def apply_update(state: Dict[str, Any], update: Dict[str, Any], schema: Optional[type] = None) -> Dict[str, Any]:
+    """
+    按状态定义中的 reducer 把节点返回的增量合并进状态，返回新的状态；没有 reducer 的字段直接覆盖。
+    schema 默认为 workflow.AgentState。
+    """
+    if schema is None:
+        from workflow import AgentState
+
+        schema = AgentState
+    reducers = _reducers(schema)
+    merged = dict(state)
+    for key, value in update.items():
+        if key in reducers:
+            reducer, initial = reducers[key]
+            merged[key] = reducer(merged[key] if key in merged else initial(), value)
+        else:
+            merged[key] = value
+    return merged
+
+
+def serializer():
+    """
+    返回给 langgraph 检查点存储使用的序列化器：状态按本模块的格式编码，
+    仍然可以读取 JsonPlusSerializer 写入的旧检查点。
+    """
+    from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+    class StateSerializer(JsonPlusSerializer):
+        def dumps_typed(self, obj: Any) -> Tuple[str, bytes]:
+            if isinstance(obj, (bytes, bytearray)):
+                return super().dumps_typed(obj)
+            try:
+                return "state", encode(obj)
+            except (TypeError, UnicodeEncodeError):
+                return super().dumps_typed(obj)
+
+        def loads_typed(self, data: Tuple[str, bytes]) -> Any:
+            if data[0] == "state":
+                return decode(data[1])
+            return super().loads_typed(data)
+
+    return StateSerializer()
+
+
+class StateJournal:
+    """
+    追加写入的二进制日志：每条记录为 (时间戳, 节点名, 节点返回的增量)，每帧前有 4 字节的长度。
+
+    记录以字典编码，用同一个 StateEncoder 沿增量中的字典向下，重复的搜索原文只写一次摘要，
+    工具名与消息类型进入字符串表；字典的键与节点名每帧按原文写出。
+    """
+
+    def __init__(self, path: str, blob_min_chars: int = 256):
+        self.path = path
+        self._encoder = StateEncoder(blob_min_chars)
+        self._file: BinaryIO = open(path, "ab")
+        self._lock = threading.Lock()
+
+    def append(self, node: str, update: Any) -> None:
+        with self._lock:
+            frame = self._encoder.encode({"ts": time.time(), "node": node, "update": update})
+            self._file.write(struct.pack(">I", len(frame)) + frame)
+            self._file.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+
+def read_journal(path: str) -> Iterator[Tuple[float, str, Any]]:
+    """
+    按写入顺序读出 StateJournal 的记录。
+    """
+    decoder = StateDecoder()
+    with open(path, "rb") as f:
+        while True:
+            header = f.read(4)
+            if len(header) < 4:
+                return
+            record = decoder.decode(f.read(struct.unpack(">I", header)[0]))
+            if isinstance(record, list):
+                # 早期版本按 [时间戳, 节点名, 增量] 的列表写入
+                yield tuple(record)
+            else:
+                yield record["ts"], record["node"], record["update"]
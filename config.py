@@ -1,5 +1,6 @@
-from langchain_core.prompts import MessagesPlaceholder
-from langgraph.graph import END
+# 配置模块被所有模块导入，这里不引入 langchain / langgraph，避免拖慢启动
+# 与 langgraph.graph.END 相同，表示结束流程
+END = "__end__"
 
 
 class Config:
@@ -10,39 +11,255 @@ class Config:
     MODEL_CONFIG = {
         "temperature": 0.8,
         "model": "glm-4-flash",
+        # GLM 返回 429 时的最大重试次数，重试节奏由限速器控制
+        "max_retries": 2,
+        # 共享 HTTP 客户端的超时（秒）与连接池大小
+        "connect_timeout": 5,
+        "read_timeout": 60,
+        "pool_size": 16,
+    }
+
+    # 客户端限速：每个端点一个令牌桶（rate 为每秒请求数，burst 为桶容量）加并发上限（concurrency），
+    # 遇到 429 时速率减半、成功后逐步恢复（AIMD），GLM 与联网搜索分别限速
+    RATE_LIMITS = {
+        "glm": {"rate": 5, "burst": 5, "concurrency": 8},
+        "search": {"rate": 5, "burst": 5, "concurrency": 8},
+    }
+
+    # LLM 响应缓存：内存 LRU 层 + 可选的 SQLite 持久层（sqlite_path）。
+    # normalize 为 True 时，仅空白、大小写、全半角不同的 prompt 复用同一结果；
+    # deterministic_only 为 True 时，temperature 高于 0.01 的模型不使用缓存：
+    # 采样生成的回答每次都应不同，复用缓存会让相同的问题总是得到同一个回答
+    LLM_CACHE = {
+        "enabled": True,
+        "max_entries": 512,
+        "sqlite_path": None,
+        "normalize": False,
+        "deterministic_only": True,
     }
 
     # 工具配置
     TOOLS = ["web_search"]
 
+    # 联网搜索配置：连接池大小、连接/读取超时（秒）与 429/5xx 的退避重试
+    SEARCH_CONFIG = {
+        "url": "https://open.bigmodel.cn/api/paas/v4/tools",
+        "tool": "web-search-pro",
+        "connect_timeout": 5,
+        "read_timeout": 60,
+        "pool_size": 16,
+        "max_retries": 3,
+        "backoff_base": 0.5,
+        "backoff_max": 8,
+    }
+
+    # 联网搜索结果缓存：ttl 为过期时间（秒），max_entries 为 LRU 容量，
+    # sqlite_path 不为空时额外写入磁盘，进程重启后仍然有效
+    SEARCH_CACHE = {
+        "enabled": True,
+        "ttl": 600,
+        "max_entries": 1024,
+        "sqlite_path": None,
+    }
+
+    # 检索先于搜索：过去的搜索结果按查询的嵌入建立本地索引（search_index.SearchIndex），
+    # 与新查询的余弦相似度不低于 min_similarity 且仍然新鲜的结果直接复用，不再联网。
+    # 新鲜度按查询类型判断：freshness 中第一个 pattern 匹配查询的规则给出结果的最长可用时间（秒），
+    # 都不匹配时为 default_max_age。日期、数字与地名（search_index.PLACES，places 可以补充）不同的查询不会复用。
+    # embedder 为 search_index.EMBEDDERS 中的名字，默认是纯 CPU 的散列嵌入；
+    # path 不为空时向量以内存映射的矩阵保存在该目录中，进程重启后仍然有效
+    SEARCH_INDEX = {
+        "enabled": False,
+        "embedder": "hashing",
+        "dim": 256,
+        "max_entries": 10000,
+        "min_similarity": 0.9,
+        "default_max_age": 86400,
+        "freshness": {
+            "weather": {"pattern": r"天气|气温|下雨|降雨|台风|weather", "max_age": 3600},
+            "news": {"pattern": r"新闻|最新|今天|今日|实时|股价|汇率|news", "max_age": 6 * 3600},
+            "legal": {"pattern": r"案件|案例|判决|裁定|法院|法律|法规", "max_age": 30 * 86400},
+        },
+        "places": [],
+        "path": None,
+    }
+
+    # 搜索结果压缩：解析全部结果，去重并按相关度排序，最多保留 max_results 条，每条保留标题、链接
+    # 与最相关的 max_passages 个句子（每句至多 passage_chars 个字符），总量估算不超过 max_tokens 个 token
+    OBSERVATIONS = {
+        "max_tokens": 800,
+        "max_results": 5,
+        "max_passages": 3,
+        "passage_chars": 200,
+        "chars_per_token": 1.5,
+    }
+
+    # 同一轮中并发执行工具调用的最大线程数
+    TOOL_CONCURRENCY = 4
+
+    # agent_scratchpad 渲染策略：最近 keep_recent 条工具结果保留原文，更早的截断到 max_chars 个字符；
+    # summarizer 为 scratchpad.register_summarizer 注册的名字时，更早的结果改为交给该函数摘要
+    SCRATCHPAD = {
+        "keep_recent": 4,
+        "max_chars": 300,
+        "summarizer": None,
+    }
+
     # Prompt 模板配置
     PROMPT_TEMPLATES = {
         "agent_prompt": [
             ("system", "你是一个有用的助手。当你无法回答问题时，请调用工具来获取信息。"),
-            MessagesPlaceholder(variable_name="chat_history"),
+            ("placeholder", "{chat_history}"),
             ("user", "{input}"),
-            MessagesPlaceholder(variable_name="agent_scratchpad"),
+            ("placeholder", "{agent_scratchpad}"),
         ],
         "beautify_prompt": [
             ("system", "你是一个文笔优化助手，负责对文本进行润色和美化，使其更加流畅和优雅。"),
             ("user", "请对以下文本进行文笔优化：\n{text}"),
         ],
+        # 路由判断不需要工具时使用的精简 prompt，不带工具 schema 与 scratchpad
+        "direct_prompt": [
+            ("system", "你是一个有用的助手，请简洁、准确地回答。"),
+            ("placeholder", "{chat_history}"),
+            ("user", "{input}"),
+        ],
+        "summary_prompt": [
+            ("system", "你负责压缩对话历史。请把已有摘要与新的对话合并为一段简短的摘要，保留事实、链接与用户的偏好。"),
+            ("user", "已有摘要：\n{summary}\n\n新的对话：\n{conversation}"),
+        ],
     }
 
-    # Workflow 顺序配置
-    WORKFLOW_ORDER = [
-        "agent",  # 第一步：运行主 Agent
-        "action",  # 第二步：执行工具
-        "beautify",  # 第三步：美化输出
-    ]
+    # 美化配置：pipelined 为 True 时，agent 生成最终回答的同时按句子（chunk_by="sentence"）
+    # 或段落（"paragraph"）分块并发润色，不再等待完整回答后串行调用 beautify
+    BEAUTIFY = {
+        "pipelined": False,
+        "chunk_by": "sentence",
+        "min_chunk_chars": 20,
+        "max_concurrency": 4,
+    }
 
-    # 条件判断配置
-    CONDITIONAL_EDGES = {
-        "agent": {
-            "continue": "action",  # 如果 Agent 需要调用工具，跳转到 action
-            "beautify": "beautify",  # 如果 Agent 完成，跳转到 beautify
-            "end": END,  # 如果未知情况，结束流程
+    # 节点追踪：enabled 为 True 时按 level 输出日志，每个节点一条 span（耗时与状态大小），
+    # json 为 True 时每条日志是一行 JSON，sink 为日志文件路径，为空时输出到 stderr
+    TRACING = {
+        "enabled": False,
+        "level": "INFO",
+        "json": True,
+        "sink": None,
+        # 不为空时，每个节点返回的状态增量以 codec.py 的格式追加写入该文件，用 codec.read_journal() 读取
+        "journal": None,
+    }
+
+    # 运行指标：节点耗时、token 用量、搜索耗时与响应大小、agent 循环次数，
+    # port 不为空时 main.py 会在 host:port/metrics 上以 Prometheus 文本格式暴露
+    METRICS = {
+        "enabled": True,
+        "host": "127.0.0.1",
+        "port": None,
+    }
+
+    # 会话检查点：enabled 为 True 时 create_workflow() 默认把每一步的状态写入 sqlite_path，
+    # 以 thread_id 区分会话，多轮对话的历史保存在服务端，中断的执行可以从最后完成的节点继续
+    CHECKPOINT = {
+        "enabled": False,
+        "sqlite_path": "checkpoints.sqlite",
+        # "codec" 用 codec.py 的紧凑二进制格式保存检查点，"jsonplus" 为 langgraph 默认的序列化；
+        # 两种格式写入的检查点都可以被 "codec" 读取
+        "serializer": "jsonplus",
+    }
+
+    # 每轮发送给 GLM 的对话历史：strategy 为 "window"（最近 max_messages 条）、
+    # "tokens"（估算不超过 max_tokens 个 token）或 "summary"（更早的消息滚动摘要）
+    HISTORY = {
+        "strategy": "window",
+        "max_messages": 10,
+        "max_tokens": 2000,
+        "chars_per_token": 1.5,
+    }
+
+    # HTTP 服务（server.py）：最多同时执行 max_concurrency 个图，另有 queue_size 个请求排队，
+    # 超出时返回 503；关闭时最多等待 drain_timeout 秒让进行中的请求完成
+    SERVER = {
+        "host": "127.0.0.1",
+        "port": 8000,
+        "max_concurrency": 16,
+        "queue_size": 64,
+        "request_timeout": 120,
+        "drain_timeout": 30,
+    }
+
+    # 推测性预取：enabled 为 True 时，每轮第一次调用 agent 的同时按原始问题发起一次 tool 调用，
+    # 只有本地规则给问题的得分不低于 min_score 时才预取；agent 请求的查询与问题的重合度不低于
+    # min_similarity 时直接使用预取的结果，max_workers 为预取线程数
+    PREFETCH = {
+        "enabled": False,
+        "tool": "web_search",
+        "min_score": 0.5,
+        "min_similarity": 0.6,
+        "max_workers": 4,
+        "max_pending": 256,
+    }
+
+    # 单次执行的预算：agent 与 action 的循环轮数、agent 的 token 用量、累计耗时（秒）与重复查询次数，
+    # 任意一项用尽时不再调用工具，用已经取得的结果作答并走 budget 路由；为 None 时不限制该项，
+    # 也可以在 config["configurable"]["budget"] 中按请求覆盖
+    BUDGET = {
+        "max_iterations": 5,
+        "max_tokens": 20000,
+        "max_seconds": 60,
+        "max_duplicate_queries": 2,
+    }
+
+    # 多进程执行（worker_pool.py，server.py --workers）：workers 个工作进程（None 为 CPU 核数）各自持有预热好的图，
+    # 每个进程同时执行 concurrency 个图；heartbeat_timeout 秒没有心跳的进程会被结束并重启
+    WORKER_POOL = {
+        "workers": None,
+        "shape": "beautify",
+        "concurrency": 8,
+        "heartbeat_interval": 1.0,
+        "heartbeat_timeout": 30.0,
+        "startup_timeout": 60.0,
+    }
+
+    # 自适应路由：enabled 为 True 时按本地特征选择更便宜的路径。问题需要联网的得分（与预取相同的规则）
+    # 低于 tool_score 时第一轮直接用 direct_prompt 作答；回答不超过 min_chars 个字符，或 skip_well_formed
+    # 为 True 且回答已经通顺（以句末标点结尾、没有重复的标点与句子、每句不超过 max_sentence_chars 个字符）时跳过 beautify
+    ROUTING = {
+        "enabled": False,
+        "tool_score": 0.25,
+        "direct_prompt": "direct_prompt",
+        "min_chars": 40,
+        "skip_well_formed": True,
+        "max_sentence_chars": 80,
+    }
+
+    # 图的声明，由 graph_builder 校验并编译；file 不为空时改为从该 TOML 文件读取同样结构的声明。
+    # nodes：节点名 -> {"kind": 节点类型, ...该类型的参数}，可用的类型有
+    #   agent（参数 prompt 与 tools，tools 为空时使用全部已启用的工具）、tools（执行工具调用）、
+    #   rewrite（参数 prompt，改写上一个节点的输出）
+    # edges：节点 -> 下一个节点，或条件边 {"router": 路由器, "routes": {路由结果: 节点}}；
+    #   图中的每个环都要有一条设置了 max_loops 的条件边，循环达到上限时按 on_limit 路由；
+    #   max_loops 是结构上的硬上限，每次执行的预算见 BUDGET
+    GRAPH = {
+        "file": None,
+        "entry": "agent",  # 第一步：运行主 Agent
+        "nodes": {
+            "agent": {"kind": "agent", "prompt": "agent_prompt"},
+            "action": {"kind": "tools"},  # 执行工具
+            "beautify": {"kind": "rewrite", "prompt": "beautify_prompt"},  # 美化输出
+        },
+        "edges": {
+            "agent": {
+                "router": "agent_outcome",
+                "routes": {
+                    "continue": "action",  # 如果 Agent 需要调用工具，跳转到 action
+                    "finish": "beautify",  # 如果 Agent 完成，跳转到 beautify
+                    "budget": "beautify",  # 如果预算用尽，用已有的结果作答，同样经过 beautify
+                    "end": END,  # 如果未知情况，结束流程
+                },
+                "max_loops": 8,
+                "on_limit": "end",
+            },
+            "action": "agent",  # 执行工具后，返回 agent
+            "beautify": END,  # 美化输出后，结束流程
         },
-        "action": "agent",  # 执行工具后，返回 agent
-        "beautify": END,  # 美化输出后，结束流程
     }
@@ -0,0 +1,168 @@
+import asyncio
+import json
+import threading
+import time
+import weakref
+from typing import Any, Dict, List, Optional
+
+import httpx
+import jwt
+from langchain_core.messages import (
+    AIMessage,
+    AIMessageChunk,
+    BaseMessage,
+    ChatMessage,
+    HumanMessage,
+    SystemMessage,
+    ToolMessage,
+)
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from config import Config
+
+# 鉴权 token 的有效期（秒），见 https://open.bigmodel.cn/dev/api#nosdk
+_TOKEN_TTL = 3 * 60
+
+_client: Optional[httpx.Client] = None
+_client_lock = threading.Lock()
+# httpx.AsyncClient 的连接绑定在创建它的事件循环上，每个事件循环各用一个
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = \
+    weakref.WeakKeyDictionary()
+
+
+def _client_options() -> dict:
+    options = Config.MODEL_CONFIG
+    return {
+        "timeout": httpx.Timeout(options["read_timeout"], connect=options["connect_timeout"]),
+        "limits": httpx.Limits(max_connections=options["pool_size"],
+                               max_keepalive_connections=options["pool_size"]),
+    }
+
+
+def get_http_client() -> httpx.Client:
+    """
+    返回进程内共享的同步 httpx 客户端，GLM 请求复用长连接，不再每次新建客户端。
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = httpx.Client(**_client_options())
+    return _client
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """
+    返回当前事件循环共享的异步 httpx 客户端。
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = _async_clients[loop] = httpx.AsyncClient(**_client_options())
+    return client
+
+
+def auth_headers(api_key: str) -> Dict[str, str]:
+    """
+    按智谱开放平台的规则用 api_key（id.secret）签发 JWT，返回请求头。
+    """
+    try:
+        key_id, secret = api_key.split(".")
+    except ValueError as e:
+        raise ValueError("ZHIPUAI_API_KEY 的格式应为 id.secret") from e
+    now = int(time.time() * 1000)
+    token = jwt.encode({"api_key": key_id, "exp": now + _TOKEN_TTL * 1000, "timestamp": now}, secret,
+                       algorithm="HS256", headers={"alg": "HS256", "sign_type": "SIGN"})
+    return {"Authorization": token, "Accept": "application/json"}
+
+
+def _clamp(value: Optional[float]) -> Optional[float]:
+    # GLM 只接受 (0, 1) 开区间内的 temperature 与 top_p
+    return None if value is None else max(0.01, min(0.99, value))
+
+
+def message_dict(message: BaseMessage) -> Dict[str, Any]:
+    if isinstance(message, ChatMessage):
+        return {"role": message.role, "content": message.content}
+    if isinstance(message, SystemMessage):
+        return {"role": "system", "content": message.content}
+    if isinstance(message, HumanMessage):
+        return {"role": "user", "content": message.content}
+    if isinstance(message, AIMessage):
+        return {"role": "assistant", "content": message.content}
+    if isinstance(message, ToolMessage):
+        return {"role": "tool", "content": message.content, "tool_call_id": message.tool_call_id,
+                "name": message.name or message.additional_kwargs.get("name")}
+    raise TypeError(f"不支持的消息类型: {type(message).__name__}")
+
+
+def chat_payload(model: str, temperature: Optional[float], max_tokens: Optional[int], messages: List[BaseMessage],
+                 stop: Optional[List[str]], stream: bool, **kwargs: Any) -> Dict[str, Any]:
+    """
+    构造 /chat/completions 的请求体，kwargs 为 bind_tools 等绑定的参数（tools、tool_choice）。
+    """
+    payload = {"model": model, "temperature": temperature, **kwargs,
+               "messages": [message_dict(m) for m in messages], "stream": stream}
+    if max_tokens is not None:
+        payload.setdefault("max_tokens", max_tokens)
+    if stop is not None:
+        payload["stop"] = stop
+    for name in ("temperature", "top_p"):
+        if payload.get(name) is not None:
+            payload[name] = _clamp(payload[name])
+    return payload
+
+
+def _message(data: Dict[str, Any]) -> BaseMessage:
+    role, content = data.get("role"), data.get("content") or ""
+    if role == "assistant":
+        # additional_kwargs 中 OpenAI 格式的 tool_calls 由 AIMessage 解析为 tool_calls
+        tool_calls = data.get("tool_calls")
+        return AIMessage(content=content, additional_kwargs={"tool_calls": tool_calls} if tool_calls else {})
+    if role == "user":
+        return HumanMessage(content=content)
+    if role == "system":
+        return SystemMessage(content=content)
+    if role == "tool":
+        return ToolMessage(content=content, tool_call_id=data.get("tool_call_id") or "")
+    return ChatMessage(role=role or "assistant", content=content)
+
+
+def chat_result(response: Dict[str, Any], model: str) -> ChatResult:
+    """
+    把非流式响应转换为 ChatResult，用量放在 llm_output["token_usage"] 中。
+    """
+    generations = [ChatGeneration(message=_message(choice["message"]),
+                                  generation_info={"finish_reason": choice.get("finish_reason")})
+                   for choice in response["choices"]]
+    return ChatResult(generations=generations,
+                      llm_output={"token_usage": response.get("usage", {}), "model_name": model})
+
+
+def chat_chunk(data: str) -> Optional[ChatGenerationChunk]:
+    """
+    解析一个 SSE 数据块，没有 choices 时返回 None；最后一块的 generation_info 带有结束原因与用量。
+    """
+    chunk = json.loads(data)
+    if not chunk.get("choices"):
+        return None
+    choice = chunk["choices"][0]
+    delta = choice.get("delta") or {}
+    tool_calls = delta.get("tool_calls")
+    message = AIMessageChunk(content=delta.get("content") or "",
+                             additional_kwargs={"tool_calls": tool_calls} if tool_calls else {})
+    finish_reason = choice.get("finish_reason")
+    generation_info = {
+        "finish_reason": finish_reason,
+        "token_usage": chunk.get("usage"),
+        "model_name": chunk.get("model", ""),
+    } if finish_reason is not None else None
+    return ChatGenerationChunk(message=message, generation_info=generation_info)
+
+
+def close() -> None:
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
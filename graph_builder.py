@@ -0,0 +1,215 @@
+import tomllib
+from typing import Any, Callable, Dict, FrozenSet, List, NamedTuple, Optional, Set
+
+import metrics
+from config import Config, END
+from tracing import get_logger
+
+logger = get_logger("graph")
+
+
+class GraphConfigError(ValueError):
+    """
+    图的声明不合法，problems 列出全部问题。
+    """
+
+    def __init__(self, problems: List[str]):
+        super().__init__("图的声明不合法：\n" + "\n".join(f"- {problem}" for problem in problems))
+        self.problems = problems
+
+
+class NodeKind(NamedTuple):
+    # factory(节点名, 节点声明) 返回可以交给 StateGraph.add_node 的函数或 Runnable
+    factory: Callable[[str, dict], Any]
+    # validate(节点声明) 返回问题列表，在构建任何节点之前调用
+    validate: Optional[Callable[[dict], List[str]]] = None
+
+
+class Router(NamedTuple):
+    # resolve(state) 返回路由结果，routes 为它可能返回的全部结果
+    resolve: Callable[[dict], str]
+    routes: FrozenSet[str]
+    # loops(state) 返回已经完成的循环次数，提供时该路由器所在的环可以设置 max_loops
+    loops: Optional[Callable[[dict], int]] = None
+
+
+NODE_KINDS: Dict[str, NodeKind] = {}
+ROUTERS: Dict[str, Router] = {}
+
+
+def register_node_kind(kind: str, factory: Callable[[str, dict], Any],
+                       validate: Optional[Callable[[dict], List[str]]] = None) -> None:
+    NODE_KINDS[kind] = NodeKind(factory, validate)
+
+
+def register_router(name: str, resolve: Callable[[dict], str], routes, loops=None) -> None:
+    ROUTERS[name] = Router(resolve, frozenset(routes), loops)
+
+
+def load_spec(spec: Optional[dict] = None) -> dict:
+    """
+    返回图的声明：默认取 Config.GRAPH，其中 file 不为空时从该 TOML 文件读取。
+    """
+    spec = Config.GRAPH if spec is None else spec
+    if spec.get("file"):
+        with open(spec["file"], "rb") as f:
+            return tomllib.load(f)
+    return spec
+
+
+def _targets(edge) -> List[str]:
+    return list(edge["routes"].values()) if isinstance(edge, dict) else [edge]
+
+
+def _successors(spec: dict) -> Dict[str, Set[str]]:
+    return {source: set(_targets(edge)) for source, edge in spec.get("edges", {}).items()}
+
+
+def _reachable(successors: Dict[str, Set[str]], start: str) -> Set[str]:
+    seen = set()
+    stack = [start]
+    while stack:
+        node = stack.pop()
+        for target in successors.get(node, ()):
+            if target not in seen:
+                seen.add(target)
+                stack.append(target)
+    return seen
+
+
+def _cycles(successors: Dict[str, Set[str]], nodes) -> List[Set[str]]:
+    """
+    返回包含环的强连通分量。
+    """
+    reach = {node: _reachable(successors, node) for node in nodes}
+    components = []
+    assigned = set()
+    for node in nodes:
+        if node in assigned or node not in reach[node]:
+            continue
+        component = {other for other in nodes if other in reach[node] and node in reach[other]}
+        assigned |= component
+        components.append(component)
+    return components
+
+
+def validate(spec: dict) -> None:
+    """
+    编译前检查图的声明：节点类型与参数、边的目标、路由结果是否都有去处、
+    入口能否到达每个节点、每个节点能否到达结束，以及每个环是否设置了循环上限。
+    """
+    problems = []
+    nodes = spec.get("nodes", {})
+    edges = spec.get("edges", {})
+    entry = spec.get("entry")
+    if entry not in nodes:
+        problems.append(f"入口 {entry!r} 不是已声明的节点")
+
+    for name, node in nodes.items():
+        kind = NODE_KINDS.get(node.get("kind"))
+        if kind is None:
+            problems.append(f"节点 {name} 的类型 {node.get('kind')!r} 未注册，可用的类型：{sorted(NODE_KINDS)}")
+        elif kind.validate is not None:
+            problems.extend(f"节点 {name}：{problem}" for problem in kind.validate(node))
+        if name not in edges:
+            problems.append(f"节点 {name} 没有出边")
+
+    for source, edge in edges.items():
+        if source not in nodes:
+            problems.append(f"边的起点 {source} 不是已声明的节点")
+        if isinstance(edge, dict) and not isinstance(edge.get("routes"), dict):
+            problems.append(f"{source} 的条件边缺少 routes")
+            continue
+        for target in _targets(edge):
+            if target != END and target not in nodes:
+                problems.append(f"{source} 的目标 {target} 不是已声明的节点")
+        if not isinstance(edge, dict):
+            continue
+        router = ROUTERS.get(edge.get("router"))
+        if router is None:
+            problems.append(f"{source} 的路由器 {edge.get('router')!r} 未注册，可用的路由器：{sorted(ROUTERS)}")
+            continue
+        missing = router.routes - set(edge["routes"])
+        if missing:
+            problems.append(f"{source} 的路由器 {edge['router']} 可能返回 {sorted(missing)}，routes 中没有对应的目标")
+        if edge.get("max_loops") is not None:
+            if router.loops is None:
+                problems.append(f"{source} 的路由器 {edge['router']} 不统计循环次数，不能设置 max_loops")
+            if not isinstance(edge["max_loops"], int) or edge["max_loops"] < 1:
+                problems.append(f"{source} 的 max_loops 必须是正整数")
+            if edge.get("on_limit") not in edge["routes"]:
+                problems.append(f"{source} 的 on_limit {edge.get('on_limit')!r} 不在 routes 中")
+
+    if problems:
+        raise GraphConfigError(problems)
+
+    successors = _successors(spec)
+    unreachable = set(nodes) - _reachable(successors, entry) - {entry}
+    if unreachable:
+        problems.append(f"从入口无法到达的节点：{sorted(unreachable)}")
+    for name in nodes:
+        if END not in _reachable(successors, name):
+            problems.append(f"节点 {name} 无法到达结束")
+    for component in _cycles(successors, list(nodes)):
+        capped = any(
+            isinstance(edges[source], dict) and edges[source].get("max_loops") is not None
+            and any(target in component for target in _targets(edges[source]))
+            for source in component
+        )
+        if not capped:
+            problems.append(f"环 {sorted(component)} 中没有设置 max_loops 的路由，可能无限循环")
+    if problems:
+        raise GraphConfigError(problems)
+
+
+def _compile_route(source: str, edge: dict, router: Router, successors: Dict[str, Set[str]]) -> Callable:
+    """
+    把路由声明编译为查表：路由结果直接映射到目标节点，并预先算出哪些结果会回到 source 形成循环。
+    """
+    table = dict(edge["routes"])
+    cyclic = frozenset(key for key, target in table.items()
+                       if target != END and (target == source or source in _reachable(successors, target)))
+    cap = edge.get("max_loops")
+    limit_target = table[edge["on_limit"]] if cap is not None else None
+    resolve = router.resolve
+    loops = router.loops
+
+    def route(state: dict) -> str:
+        key = resolve(state)
+        if key in cyclic:
+            if cap is None or loops(state) < cap:
+                return table[key]
+            logger.warning("%s 已循环 %s 次，达到上限，转到 %s", source, cap, limit_target)
+            target = limit_target
+        else:
+            target = table[key]
+        # 离开循环时记录本次执行经过了几轮
+        if loops is not None and metrics.enabled():
+            metrics.agent_loops.observe(loops(state))
+        return target
+
+    route.__name__ = f"route_{source}"
+    return route
+
+
+def compile_graph(state_schema, spec: Optional[dict] = None, checkpointer=None):
+    """
+    按声明构建并编译 StateGraph，先完整校验，再构建节点与路由表。
+    """
+    from langgraph.graph import StateGraph
+
+    spec = load_spec(spec)
+    validate(spec)
+    successors = _successors(spec)
+
+    graph = StateGraph(state_schema)
+    for name, node in spec["nodes"].items():
+        graph.add_node(name, NODE_KINDS[node["kind"]].factory(name, node))
+    graph.set_entry_point(spec["entry"])
+    for source, edge in spec["edges"].items():
+        if isinstance(edge, dict):
+            route = _compile_route(source, edge, ROUTERS[edge["router"]], successors)
+            graph.add_conditional_edges(source, route, sorted(set(edge["routes"].values())))
+        else:
+            graph.add_edge(source, edge)
+    return graph.compile(checkpointer=checkpointer)
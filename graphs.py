@@ -0,0 +1,145 @@
+import threading
+from typing import Annotated, Any, Dict, TypedDict
+
+from config import Config, END
+from graph_builder import compile_graph, register_node_kind
+from tracing import configure as configure_tracing, traced
+from workflow import AgentState, create_workflow, resolve_checkpointer
+
+
+def merge_messages(left: list, right: list) -> list:
+    """
+    messages 的 reducer，与 langgraph 的 add_messages 相同；langgraph 在第一次合并时才导入。
+    """
+    from langgraph.graph.message import add_messages
+
+    return add_messages(left, right)
+
+
+class ChatState(TypedDict):
+    messages: Annotated[list, merge_messages]
+
+
+def _chat_node(name: str, spec: dict):
+    @traced(name)
+    def node(state: ChatState) -> dict:
+        from agents import get_chat_model
+
+        return {"messages": [get_chat_model().invoke(state["messages"])]}
+
+    return node
+
+
+register_node_kind("chat", _chat_node)
+
+# 单节点聊天（原 llm1.py）
+CHAT_GRAPH = {
+    "entry": "chatbot",
+    "nodes": {"chatbot": {"kind": "chat"}},
+    "edges": {"chatbot": END},
+}
+
+# agent 与工具循环，给出回答后直接结束（原 llm1_tool1.py）
+AGENT_GRAPH = {
+    "entry": "agent",
+    "nodes": {
+        "agent": {"kind": "agent", "prompt": "agent_prompt"},
+        "action": {"kind": "tools"},
+    },
+    "edges": {
+        "agent": {
+            "router": "agent_outcome",
+            "routes": {"continue": "action", "finish": END, "budget": END, "end": END},
+            "max_loops": 8,
+            "on_limit": "end",
+        },
+        "action": "agent",
+    },
+}
+
+# 形态名 -> (状态, 图的声明)；beautify 即 Config.GRAPH 声明的 agent -> action -> beautify 工作流（原 llm2.py）
+SHAPES: Dict[str, Any] = {
+    "chat": (ChatState, CHAT_GRAPH),
+    "agent": (AgentState, AGENT_GRAPH),
+}
+
+_graphs: Dict[Any, Any] = {}
+_lock = threading.Lock()
+
+
+def create_graph(shape: str = "beautify", checkpointer=None):
+    """
+    返回某种形态的编译好的图：chat、agent 或 beautify。
+
+    每种形态（按检查点存储区分）只编译一次；所有形态共享 agents 中的模型、Agent、工具、
+    搜索客户端与缓存，同一进程中的多个图复用同一组连接池。导入本模块不会创建任何客户端。
+    checkpointer 的含义与 workflow.create_workflow 相同。
+    """
+    if shape == "beautify":
+        return create_workflow(checkpointer)
+    if shape not in SHAPES:
+        raise ValueError(f"未知的图形态: {shape}，可用的形态：{['beautify', *SHAPES]}")
+    configure_tracing()
+    if checkpointer is None:
+        checkpointer = Config.CHECKPOINT["enabled"]
+    key = (shape, checkpointer)
+    app = _graphs.get(key)
+    if app is None:
+        with _lock:
+            app = _graphs.get(key)
+            if app is None:
+                state_schema, spec = SHAPES[shape]
+                app = _graphs[key] = compile_graph(state_schema, spec, resolve_checkpointer(checkpointer))
+    return app
+
+
+def create_chat_graph(checkpointer=None):
+    return create_graph("chat", checkpointer)
+
+
+def create_agent_graph(checkpointer=None):
+    return create_graph("agent", checkpointer)
+
+
+def create_beautify_graph(checkpointer=None):
+    return create_graph("beautify", checkpointer)
+
+
+def warm_up(shape: str = "beautify", checkpointer=None):
+    """
+    构建编译好的图以及它用到的模型、Agent、工具与搜索客户端，第一个请求不再承担导入与构建的开销。
+    """
+    import agents
+
+    app = create_graph(shape, checkpointer)
+    agents.get_chat_model()
+    if shape != "chat":
+        from search_client import get_search_client
+        from tools import get_tool_dispatcher
+
+        agents.get_agent_runnable()
+        get_tool_dispatcher()
+        get_search_client()
+        if Config.ROUTING["enabled"]:
+            agents.get_direct_agent(Config.ROUTING["direct_prompt"])
+    if shape == "beautify":
+        agents.get_beautify_agent()
+    return app
+
+
+def agent_inputs(question: str) -> dict:
+    """
+    agent 与 beautify 形态单轮执行的输入。
+    """
+    return {"input": question, "chat_history": [], "agent_outcome": None, "intermediate_steps": []}
+
+
+def final_output(result: dict) -> str:
+    """
+    取出 agent 与 beautify 形态执行结果中的最终回答（润色后的回答或 agent 的最终回答），
+    server.py 与 batch.py 共用；没有最终回答时返回 agent_outcome 的文本形式。
+    """
+    from langchain_core.agents import AgentFinish
+
+    outcome = result["agent_outcome"]
+    return outcome.return_values["output"] if isinstance(outcome, AgentFinish) else str(outcome)
@@ -0,0 +1,116 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, List, Optional, Sequence
+
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage, convert_to_messages
+
+from config import Config
+
+# 滚动摘要的缓存：(上一段摘要, 新折叠的消息块) -> 新摘要，每轮只有新折叠的块需要调用模型
+_summaries: "OrderedDict[str, str]" = OrderedDict()
+_summaries_lock = threading.Lock()
+_MAX_SUMMARIES = 256
+
+
+def estimate_tokens(text: str, chars_per_token: float = 1.5) -> int:
+    """
+    按字符数粗略估算 token 数，GLM 对中文大约每 1.5 个字符一个 token。
+    """
+    return int(len(text) / chars_per_token) + 1
+
+
+def _render(messages: Sequence[BaseMessage]) -> str:
+    return "\n".join(f"{message.type}: {message.content}" for message in messages)
+
+
+def llm_summarizer(summary: str, messages: Sequence[BaseMessage]) -> str:
+    """
+    用共享模型把已有摘要与新折叠的对话合并为新的摘要。
+    """
+    from agents import get_summary_agent
+
+    return get_summary_agent().invoke({"summary": summary or "（无）", "conversation": _render(messages)}).content
+
+
+class HistoryPolicy:
+    """
+    控制每一轮发送给 GLM 的 chat_history，会话中保存的完整历史不受影响。
+
+    - window：只保留最近 max_messages 条消息
+    - tokens：从最新的消息往前保留，估算的 token 总数不超过 max_tokens
+    - summary：最近的消息保留原文，更早的消息每 max_messages 条折叠为一块，
+      逐块滚动合并进一条摘要消息；已折叠的块不会重复摘要
+    """
+
+    def __init__(
+            self,
+            strategy: str = "window",
+            max_messages: int = 10,
+            max_tokens: int = 2000,
+            chars_per_token: float = 1.5,
+            summarizer: Optional[Callable[[str, Sequence[BaseMessage]], str]] = None,
+    ):
+        if strategy not in ("window", "tokens", "summary"):
+            raise ValueError(f"未知的历史策略: {strategy}")
+        self.strategy = strategy
+        self.max_messages = max_messages
+        self.max_tokens = max_tokens
+        self.chars_per_token = chars_per_token
+        self.summarizer = summarizer or llm_summarizer
+
+    @classmethod
+    def from_config(cls) -> "HistoryPolicy":
+        return cls(**Config.HISTORY)
+
+    def apply(self, history: Sequence) -> List[BaseMessage]:
+        messages = convert_to_messages(history) if history else []
+        if self.strategy == "tokens":
+            return self._by_tokens(messages)
+        if len(messages) <= self.max_messages:
+            return messages
+        if self.strategy == "window":
+            return _from_human(messages[-self.max_messages:])
+        return self._summarize(messages)
+
+    def _by_tokens(self, messages: List[BaseMessage]) -> List[BaseMessage]:
+        total = 0
+        start = len(messages)
+        while start > 0:
+            total += estimate_tokens(str(messages[start - 1].content), self.chars_per_token)
+            if total > self.max_tokens:
+                break
+            start -= 1
+        return _from_human(messages[start:])
+
+    def _summarize(self, messages: List[BaseMessage]) -> List[BaseMessage]:
+        # 折叠边界按块对齐，摘要的输入只在又积累满一块时才变化
+        block = self.max_messages
+        folded = (len(messages) - block) // block * block
+        if folded <= 0:
+            return messages
+        summary = ""
+        for start in range(0, folded, block):
+            summary = self._fold(summary, messages[start:start + block])
+        return [SystemMessage(content=f"此前对话的摘要：{summary}")] + _from_human(messages[folded:])
+
+    def _fold(self, summary: str, messages: Sequence[BaseMessage]) -> str:
+        key = hashlib.sha1((summary + "\x00" + _render(messages)).encode("utf-8")).hexdigest()
+        with _summaries_lock:
+            if key in _summaries:
+                _summaries.move_to_end(key)
+                return _summaries[key]
+        result = self.summarizer(summary, messages)
+        with _summaries_lock:
+            _summaries[key] = result
+            while len(_summaries) > _MAX_SUMMARIES:
+                _summaries.popitem(last=False)
+        return result
+
+
+def _from_human(messages: List[BaseMessage]) -> List[BaseMessage]:
+    # 截断后的历史从用户消息开始，避免把没有问题的回答单独发给模型
+    for index, message in enumerate(messages):
+        if isinstance(message, HumanMessage):
+            return messages[index:]
+    return []
@@ -1,39 +1,17 @@
-from typing import Annotated
-from typing_extensions import TypedDict
+from graphs import create_chat_graph
 
-from langchain_community.chat_models import ChatZhipuAI
-from langgraph.graph import StateGraph
-from langgraph.graph.message import add_messages
 
+# 单节点聊天图：模型与图都在 graphs 中按需创建，导入本文件不会构建客户端或发起请求
+def main():
+    graph = create_chat_graph()
+    initial_state = {
+        "messages": [
+            {"role": "user", "content": "嗨！"}
+        ]
+    }
+    result = graph.invoke(initial_state)
+    print(result["messages"][-1].content)
 
-class State(TypedDict):
-    messages: Annotated[list, add_messages]
 
-
-graph_builder = StateGraph(State)
-
-chat_zhipu = ChatZhipuAI(
-    api_key="",  # 这里填自己的api_key
-    model="glm-4-flash",
-    temperature=0.8,
-)
-
-
-def chatbot(state: State):
-    response = chat_zhipu.invoke(state["messages"])
-    print("response:", response)
-    return {"messages": [response]}
-
-
-graph_builder.add_node("chatbot", chatbot)
-graph_builder.set_entry_point("chatbot")
-graph_builder.set_finish_point("chatbot")
-graph = graph_builder.compile()
-
-initial_state = {
-    "messages": [
-        {"role": "user", "content": "嗨！"}
-    ]
-}
-result = graph.invoke(initial_state)
-print(result["messages"][-1].content)
+if __name__ == "__main__":
+    main()
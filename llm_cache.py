@@ -0,0 +1,201 @@
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.messages import message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration, Generation
+
+from config import Config
+
+_SPACES = re.compile(r"\s+")
+# 中文字符与全角标点两侧的空白不影响语义
+_CJK_SPACES = re.compile(r"(?<=[\u3000-\u303f\u4e00-\u9fff\uff00-\uffef])\s+|\s+(?=[\u3000-\u303f\u4e00-\u9fff\uff00-\uffef])")
+
+# ZhipuAI 会把 temperature 截断到 [0.01, 0.99]，不高于下限即视为确定性输出
+DETERMINISTIC_TEMPERATURE = 0.01
+
+
+def normalize_prompt(prompt: str) -> str:
+    """
+    规范化渲染后的 prompt：全角转半角、统一大小写、去掉中文两侧的空白并合并其余空白，
+    用于等价 prompt 复用。
+    """
+    prompt = unicodedata.normalize("NFKC", prompt).lower()
+    return _SPACES.sub(" ", _CJK_SPACES.sub("", prompt)).strip()
+
+
+def _encode(value: RETURN_VAL_TYPE) -> str:
+    items = []
+    for generation in value:
+        if isinstance(generation, ChatGeneration):
+            items.append({"message": message_to_dict(generation.message),
+                          "generation_info": generation.generation_info})
+        else:
+            items.append({"text": generation.text, "generation_info": generation.generation_info})
+    return json.dumps(items, ensure_ascii=False)
+
+
+def _decode(raw: str) -> RETURN_VAL_TYPE:
+    value = []
+    for item in json.loads(raw):
+        if "message" in item:
+            message = messages_from_dict([item["message"]])[0]
+            value.append(ChatGeneration(message=message, generation_info=item["generation_info"]))
+        else:
+            value.append(Generation(text=item["text"], generation_info=item["generation_info"]))
+    return value
+
+
+class _SqliteTier:
+    """
+    LLM 响应缓存的持久层。
+    """
+
+    def __init__(self, path: str):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS llm_cache (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self.conn.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        with self.lock:
+            row = self.conn.execute("SELECT value FROM llm_cache WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def put(self, key: str, value: str) -> None:
+        with self.lock:
+            self.conn.execute("INSERT OR REPLACE INTO llm_cache (key, value) VALUES (?, ?)", (key, value))
+            self.conn.commit()
+
+    def clear(self) -> None:
+        with self.lock:
+            self.conn.execute("DELETE FROM llm_cache")
+            self.conn.commit()
+
+
+class LLMResponseCache:
+    """
+    两级 LLM 响应缓存：内存 LRU 层加可选的 SQLite 持久层。
+
+    键由模型命名空间、llm_string（包含绑定的工具 schema 等调用参数）和渲染后的 prompt 组成；
+    normalize 为 True 时 prompt 先经过 normalize_prompt，仅空白、大小写不同的请求共享结果。
+    """
+
+    def __init__(self, max_entries: int = 512, sqlite_path: Optional[str] = None, normalize: bool = False):
+        self.max_entries = max_entries
+        self.normalize = normalize
+        self._entries: "OrderedDict[str, RETURN_VAL_TYPE]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._store = _SqliteTier(sqlite_path) if sqlite_path else None
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+    def key(self, namespace: str, prompt: str, llm_string: str) -> str:
+        if self.normalize:
+            # LangChain 传入的 prompt 是转义过的 JSON，先还原中文再规范化
+            try:
+                prompt = json.dumps(json.loads(prompt), ensure_ascii=False, sort_keys=True)
+            except ValueError:
+                pass
+            prompt = normalize_prompt(prompt)
+        raw = "\x00".join((namespace, llm_string, prompt))
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[RETURN_VAL_TYPE]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+        if self._store is not None:
+            raw = self._store.get(key)
+            if raw is not None:
+                value = _decode(raw)
+                with self._lock:
+                    self._remember(key, value)
+                    self.hits += 1
+                return value
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, value: RETURN_VAL_TYPE) -> None:
+        with self._lock:
+            self._remember(key, value)
+        if self._store is not None:
+            self._store.put(key, _encode(value))
+
+    def _remember(self, key: str, value: RETURN_VAL_TYPE) -> None:
+        # 调用方需持有 self._lock
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+        if self._store is not None:
+            self._store.clear()
+
+    def for_model(self, model: str, temperature: float) -> "ModelCache":
+        return ModelCache(self, json.dumps({"model": model, "temperature": temperature}, sort_keys=True))
+
+
+class ModelCache(BaseCache):
+    """
+    绑定到某个模型配置的 LangChain 缓存视图，直接传给 ChatZhipuAI(cache=...)。
+
+    ChatZhipuAI 生成的 llm_string 不包含模型名和 temperature，因此由这里补充命名空间。
+    """
+
+    def __init__(self, store: LLMResponseCache, namespace: str):
+        self.store = store
+        self.namespace = namespace
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        return self.store.get(self.store.key(self.namespace, prompt, llm_string))
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        self.store.put(self.store.key(self.namespace, prompt, llm_string), return_val)
+
+    def clear(self, **kwargs: Any) -> None:
+        self.store.clear()
+
+
+_cache: Optional[LLMResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache(model: str, temperature: float) -> Optional[ModelCache]:
+    """
+    按 Config.LLM_CACHE 返回某个模型配置的缓存视图。
+
+    缓存关闭，或开启了 deterministic_only 且 temperature 高于确定性阈值时返回 None。
+    """
+    global _cache
+    options = Config.LLM_CACHE
+    if not options["enabled"]:
+        return None
+    if options["deterministic_only"] and temperature > DETERMINISTIC_TEMPERATURE:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = LLMResponseCache(
+                    max_entries=options["max_entries"],
+                    sqlite_path=options["sqlite_path"],
+                    normalize=options["normalize"],
+                )
+    return _cache.for_model(model, temperature)
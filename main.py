@@ -1,17 +1,53 @@
-from workflow import create_workflow
+import argparse
+import asyncio
+
+import metrics
+from config import Config
+from workflow import create_workflow, astream_tokens, session_config, turn_inputs
+
+parser = argparse.ArgumentParser(description="运行 agent -> action -> beautify 工作流")
+parser.add_argument("--stream", action="store_true", help="边生成边打印 agent 与 beautify 节点的输出")
+parser.add_argument("--input", default="帮我找一找近期的离婚相关案件，并给出对应的链接", help="本轮的问题")
+parser.add_argument("--thread-id", help="会话 ID：检查点保存在 SQLite 中，同一会话的多轮对话共享历史，中断后可继续执行")
+parser.add_argument("--metrics-port", type=int, default=Config.METRICS["port"],
+                    help="在该端口的 /metrics 上暴露 Prometheus 格式的运行指标")
+args = parser.parse_args()
+
+if args.metrics_port:
+    metrics.start_http_server(args.metrics_port)
 
 # 初始化工作流
-app = create_workflow()
+app = create_workflow(checkpointer=True if args.thread_id else None)
 
 # 运行图并获取结果
-inputs = {
-    "input": "帮我找一找近期的离婚相关案件，并给出对应的链接",
-    "chat_history": [],
-    "agent_outcome": None,
-    "intermediate_steps": []
-}
+if args.thread_id:
+    config = session_config(args.thread_id)
+    inputs = turn_inputs(app, config, args.input)
+else:
+    config = None
+    inputs = {
+        "input": args.input,
+        "chat_history": [],
+        "agent_outcome": None,
+        "intermediate_steps": []
+    }
+
+
+async def print_stream():
+    current_node = None
+    async for node, token in astream_tokens(app, inputs, config):
+        if node != current_node:
+            print(f"\n[{node}] ", end="", flush=True)
+            current_node = node
+        print(token, end="", flush=True)
+    print()
+
+
 print("\n=== 开始执行图 ===")
-print("初始输入:", inputs)
-result = app.invoke(inputs)
-print("执行结果:", result)
+print("初始输入:", inputs if inputs is not None else "（继续上一次中断的执行）")
+if args.stream:
+    asyncio.run(print_stream())
+else:
+    result = app.invoke(inputs, config)
+    print("执行结果:", result)
 print("\n=== 执行结束 ===")
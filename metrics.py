@@ -0,0 +1,271 @@
+import bisect
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+from config import Config
+
+# 默认的耗时分桶（秒），覆盖从缓存命中到多轮工具调用的范围
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+TOKEN_BUCKETS = (16, 64, 128, 256, 512, 1024, 2048, 4096, 8192)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+LOOP_BUCKETS = (0, 1, 2, 3, 4, 6, 8, 12)
+RATIO_BUCKETS = (0.1, 0.25, 0.5, 0.75, 0.9, 1, 1.5)
+
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    inner = ",".join(f'{k}="{_escape(v)}"' for k, v in labels)
+    return "{" + inner + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Counter:
+    """
+    单调递增计数器，按标签区分。
+    """
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[Tuple[str, str], ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = tuple((name, str(labels[name])) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: Any) -> float:
+        key = tuple((name, str(labels[name])) for name in self.labelnames)
+        return self._values.get(key, 0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            return [f"{self.name}{_format_labels(key)} {_format_value(value)}"
+                    for key, value in sorted(self._values.items())]
+
+
+class Histogram:
+    """
+    累积分桶直方图，输出 _bucket、_sum、_count 三组样本。
+    """
+
+    kind = "histogram"
+
+    def __init__(
+            self,
+            name: str,
+            documentation: str,
+            labelnames: Sequence[str] = (),
+            buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # 每组标签对应 [各桶计数..., +Inf 计数, sum]
+        self._values: Dict[Tuple[Tuple[str, str], ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = tuple((name, str(labels[name])) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def count(self, **labels: Any) -> int:
+        key = tuple((name, str(labels[name])) for name in self.labelnames)
+        series = self._values.get(key)
+        return int(sum(series[:-1])) if series else 0
+
+    def samples(self) -> List[str]:
+        lines = []
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._values.items())
+        for key, series in items:
+            cumulative = 0
+            for bound, hits in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += hits
+                le = "+Inf" if bound == float("inf") else _format_value(bound)
+                lines.append(f"{self.name}_bucket{_format_labels(key + (('le', le),))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    """
+    指标注册表，render() 输出 Prometheus 文本格式。
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        for name, documentation, samples in _runtime_gauges():
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.extend(f"{name}{_format_labels(labels)} {_format_value(value)}" for labels, value in samples)
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+node_seconds = registry.register(Histogram(
+    "langraph_node_duration_seconds", "每个图节点的执行耗时", ["node"]))
+llm_tokens = registry.register(Histogram(
+    "langraph_llm_tokens", "单次 GLM 调用的 token 数", ["node", "kind"], TOKEN_BUCKETS))
+llm_tokens_total = registry.register(Counter(
+    "langraph_llm_tokens_total", "GLM 调用累计 token 数", ["node", "kind"]))
+search_seconds = registry.register(Histogram(
+    "langraph_search_duration_seconds", "联网搜索 HTTP 调用耗时（含重试）", ["status"]))
+search_bytes = registry.register(Histogram(
+    "langraph_search_response_bytes", "联网搜索响应体大小", [], SIZE_BUCKETS))
+agent_loops = registry.register(Histogram(
+    "langraph_agent_loops", "每次执行中 agent 与 action 之间的循环次数", [], LOOP_BUCKETS))
+budget_exhausted = registry.register(Counter(
+    "langraph_budget_exhausted_total", "因预算用尽提前结束工具调用的次数", ["reason"]))
+prefetch_total = registry.register(Counter(
+    "langraph_prefetch_total", "推测性预取的结果：hit 被使用、miss 未被使用、failed 预取失败、skipped 按规则不预取",
+    ["outcome"]))
+prefetch_saved_seconds = registry.register(Histogram(
+    "langraph_prefetch_saved_seconds", "每次预取命中节省的工具调用等待时间"))
+budget_used = registry.register(Histogram(
+    "langraph_budget_used_ratio", "每次执行结束时各项预算的使用比例", ["resource"], RATIO_BUCKETS))
+route_total = registry.register(Counter(
+    "langraph_route_total", "自适应路由的决定：agent 阶段 tools/direct，beautify 阶段 beautify/short/well_formed",
+    ["stage", "route"]))
+worker_restarts = registry.register(Counter(
+    "langraph_worker_restarts_total", "工作进程被重启的次数：exited 进程退出、unresponsive 心跳超时", ["reason"]))
+
+
+def enabled() -> bool:
+    return Config.METRICS["enabled"]
+
+
+def _runtime_gauges() -> List[Tuple[str, str, List[Tuple[Tuple[Tuple[str, str], ...], float]]]]:
+    # 缓存与限速器的运行状态在抓取时读取，不在热路径上维护
+    import llm_cache
+    import rate_limiter
+    import search_cache
+
+    gauges = []
+    caches = [("search", search_cache._cache), ("llm", llm_cache._cache)]
+    if Config.SEARCH_INDEX["enabled"]:
+        # 未启用时不导入 search_index，抓取指标不需要加载 numpy
+        import search_index
+
+        caches.append(("search_index", search_index._index))
+    for stat in ("hits", "misses", "size"):
+        samples = [((("cache", name),), cache.stats()[stat]) for name, cache in caches if cache is not None]
+        if samples:
+            gauges.append((f"langraph_cache_{stat}", f"缓存 {stat}", samples))
+    limiters = sorted(rate_limiter._limiters.items())
+    for stat in ("rate", "throttled"):
+        samples = [((("endpoint", name),), limiter.stats()[stat]) for name, limiter in limiters]
+        if samples:
+            gauges.append((f"langraph_rate_limiter_{stat}", f"限速器 {stat}", samples))
+    return gauges
+
+
+def token_usage(response: LLMResult) -> Optional[dict]:
+    """
+    从 llm_output（非流式）或最后一个分块的 generation_info（流式）中读取 GLM 返回的 usage。
+    """
+    usage = (response.llm_output or {}).get("token_usage")
+    if not usage and response.generations and response.generations[0]:
+        usage = (response.generations[0][0].generation_info or {}).get("token_usage")
+    return usage
+
+
+class TokenUsageHandler(BaseCallbackHandler):
+    """
+    挂在模型上的回调：读取每次调用的 token 用量，按发起调用的图节点记录。命中 LLM 缓存的调用没有用量信息，不计入。
+    """
+
+    def __init__(self):
+        self._nodes: Dict[UUID, str] = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, metadata=None, **kwargs) -> None:
+        if enabled():
+            self._nodes[run_id] = (metadata or {}).get("langgraph_node", "")
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs) -> None:
+        node = self._nodes.pop(run_id, "")
+        if not enabled():
+            return
+        usage = token_usage(response)
+        if not usage:
+            return
+        for kind in ("prompt", "completion"):
+            tokens = usage.get(f"{kind}_tokens")
+            if tokens is not None:
+                llm_tokens.observe(tokens, node=node, kind=kind)
+                llm_tokens_total.inc(tokens, node=node, kind=kind)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs) -> None:
+        self._nodes.pop(run_id, None)
+
+
+token_usage_handler = TokenUsageHandler()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server: Optional[ThreadingHTTPServer] = None
+
+
+def start_http_server(port: Optional[int] = None, host: Optional[str] = None) -> ThreadingHTTPServer:
+    """
+    在后台线程中启动 /metrics 端点，参数缺省时使用 Config.METRICS；重复调用返回已启动的服务。
+    """
+    global _server
+    if _server is None:
+        port = Config.METRICS["port"] if port is None else port
+        host = host or Config.METRICS["host"]
+        _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        threading.Thread(target=_server.serve_forever, name="metrics", daemon=True).start()
+    return _server
@@ -0,0 +1,221 @@
+import math
+import re
+import unicodedata
+from collections import Counter
+from typing import Dict, List, NamedTuple, Sequence
+
+from config import Config
+from history import estimate_tokens
+
+# 英文与数字按词切分，中文按单字切分后再组成二元组
+_WORDS = re.compile(r"[a-z0-9]+|[\u4e00-\u9fff]+")
+# 句子的结束位置（中文句末标点、分号与换行之后），routing 与 beautify_pipeline 共用；
+# 切分搜索原文时另外在英文句号后的空白处切分，空白随之去掉
+SENTENCE_END = re.compile(r"(?<=[。！？!?；;\n])")
+_PASSAGE_END = re.compile(SENTENCE_END.pattern + r"|(?<=\.)\s")
+NOT_FOUND = "未找到相关信息"
+
+
+class SearchHit(NamedTuple):
+    rank: int
+    title: str
+    link: str
+    content: str
+    media: str
+
+
+def parse_results(payload: dict) -> List[SearchHit]:
+    """
+    取出 web-search-pro 响应中所有 search_result 条目，保留搜索引擎给出的顺序。
+    """
+    hits = []
+    for choice in payload.get("choices") or []:
+        for call in (choice.get("message") or {}).get("tool_calls") or []:
+            for entry in call.get("search_result") or []:
+                content = (entry.get("content") or "").strip()
+                if not content:
+                    continue
+                hits.append(SearchHit(
+                    rank=len(hits),
+                    title=(entry.get("title") or "").strip(),
+                    link=(entry.get("link") or "").strip(),
+                    content=content,
+                    media=(entry.get("media") or "").strip(),
+                ))
+    return hits
+
+
+def _normalize(text: str) -> str:
+    return unicodedata.normalize("NFKC", text).lower()
+
+
+def terms(text: str) -> List[str]:
+    """
+    切分检索词：英文与数字为整词，中文为相邻两字组成的二元组（单字时保留单字）。
+    """
+    result = []
+    for word in _WORDS.findall(_normalize(text)):
+        if word[0].isascii():
+            result.append(word)
+        elif len(word) == 1:
+            result.append(word)
+        else:
+            result.extend(word[i:i + 2] for i in range(len(word) - 1))
+    return result
+
+
+def _link_key(link: str) -> str:
+    link = _normalize(link).split("#", 1)[0].rstrip("/")
+    return link.split("://", 1)[-1].removeprefix("www.")
+
+
+def dedupe(hits: Sequence[SearchHit]) -> List[SearchHit]:
+    """
+    去掉链接相同或正文开头相同（转载、镜像）的结果，保留排名靠前的一条。
+    """
+    seen_links = set()
+    seen_contents = set()
+    unique = []
+    for hit in hits:
+        link = _link_key(hit.link) if hit.link else None
+        content = "".join(_normalize(hit.content).split())[:120]
+        if (link and link in seen_links) or content in seen_contents:
+            continue
+        if link:
+            seen_links.add(link)
+        seen_contents.add(content)
+        unique.append(hit)
+    return unique
+
+
+def rank(query: str, hits: Sequence[SearchHit], k1: float = 1.2, b: float = 0.75) -> List[SearchHit]:
+    """
+    按 BM25 计算结果与查询的相关度，标题中的词计两次；得分相同时保持搜索引擎的顺序。
+    """
+    query_terms = set(terms(query))
+    if not hits or not query_terms:
+        return list(hits)
+    documents = [Counter(terms(hit.title) * 2 + terms(hit.content)) for hit in hits]
+    average = sum(sum(doc.values()) for doc in documents) / len(documents) or 1
+    frequency = {term: sum(1 for doc in documents if term in doc) for term in query_terms}
+    scores = []
+    for hit, doc in zip(hits, documents):
+        length = sum(doc.values())
+        score = 0.0
+        for term in query_terms:
+            tf = doc.get(term, 0)
+            if tf:
+                idf = math.log(1 + (len(documents) - frequency[term] + 0.5) / (frequency[term] + 0.5))
+                score += idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * length / average))
+        scores.append((-score, hit.rank, hit))
+    return [hit for _, _, hit in sorted(scores)]
+
+
+def _passages(content: str, max_chars: int) -> List[str]:
+    passages = []
+    for sentence in _PASSAGE_END.split(content):
+        sentence = sentence.strip()
+        while len(sentence) > max_chars:
+            passages.append(sentence[:max_chars])
+            sentence = sentence[max_chars:]
+        if sentence:
+            passages.append(sentence)
+    return passages
+
+
+class ObservationCompactor:
+    """
+    把联网搜索的原始响应压缩为送入 prompt 的观察结果。
+
+    解析全部 search_result，去重并按与查询的相关度排序，最多保留 max_results 条；
+    每条保留标题、链接和与查询最相关的至多 max_passages 个句子（按原文顺序），
+    总量按估算的 token 数不超过 max_tokens：先保证每条结果的标题、链接与最佳句子，余量再补充其他句子。
+    """
+
+    def __init__(
+            self,
+            max_tokens: int = 800,
+            max_results: int = 5,
+            max_passages: int = 3,
+            passage_chars: int = 200,
+            chars_per_token: float = 1.5,
+    ):
+        self.max_tokens = max_tokens
+        self.max_results = max_results
+        self.max_passages = max_passages
+        self.passage_chars = passage_chars
+        self.chars_per_token = chars_per_token
+
+    @classmethod
+    def from_config(cls) -> "ObservationCompactor":
+        return cls(**Config.OBSERVATIONS)
+
+    def _tokens(self, text: str) -> int:
+        return estimate_tokens(text, self.chars_per_token)
+
+    def _candidates(self, query_terms: set, hit: SearchHit) -> List[tuple]:
+        # (得分, 句子位置, 句子)，按得分从高到低，同分时靠前的句子优先
+        scored = []
+        seen = set()
+        for position, passage in enumerate(_passages(hit.content, self.passage_chars)):
+            if passage in seen:
+                continue
+            seen.add(passage)
+            score = len(query_terms.intersection(terms(passage)))
+            scored.append((-score, position, passage))
+        return sorted(scored)[:self.max_passages]
+
+    def compact(self, query: str, payload: dict) -> str:
+        hits = rank(query, dedupe(parse_results(payload)))[:self.max_results]
+        if not hits:
+            return NOT_FOUND
+        query_terms = set(terms(query))
+        candidates = [self._candidates(query_terms, hit) for hit in hits]
+        selected: Dict[int, List[tuple]] = {i: [] for i in range(len(hits))}
+        budget = self.max_tokens
+        kept = []
+        # 第一遍：按相关度依次放入每条结果的标题、链接与最佳句子
+        for i, hit in enumerate(hits):
+            header = self._header(len(kept) + 1, hit)
+            first = candidates[i][0] if candidates[i] else None
+            cost = self._tokens(header) + (self._tokens(first[2]) if first else 0)
+            if cost > budget and kept:
+                break
+            budget -= cost
+            kept.append(i)
+            if first:
+                selected[i].append(first)
+        # 第二遍：剩余预算按结果的相关度顺序补充其他句子
+        for i in kept:
+            for candidate in candidates[i][1:]:
+                cost = self._tokens(candidate[2])
+                if cost > budget:
+                    continue
+                budget -= cost
+                selected[i].append(candidate)
+        return "\n\n".join(self._render(number, hits[i], selected[i]) for number, i in enumerate(kept, start=1))
+
+    def _header(self, number: int, hit: SearchHit) -> str:
+        lines = [f"[{number}] {hit.title or '（无标题）'}"]
+        if hit.link:
+            lines.append(f"链接：{hit.link}")
+        return "\n".join(lines)
+
+    def _render(self, number: int, hit: SearchHit, passages: Sequence[tuple]) -> str:
+        # 选中的句子按原文顺序拼接，不相邻的句子之间用省略号隔开
+        text = ""
+        previous = None
+        for _, position, passage in sorted(passages, key=lambda item: item[1]):
+            if previous is not None:
+                text += "…" if position != previous + 1 else ("" if not text[-1].isascii() else " ")
+            text += passage
+            previous = position
+        header = self._header(number, hit)
+        return f"{header}\n内容：{text}" if text else header
+
+
+def compact_search_results(query: str, payload: dict) -> str:
+    """
+    按 Config.OBSERVATIONS 压缩一次联网搜索的结果。
+    """
+    return ObservationCompactor.from_config().compact(query, payload)
@@ -0,0 +1,216 @@
+import asyncio
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Optional, Sequence
+
+from langchain_core.agents import AgentAction
+
+import metrics
+from config import Config
+from observations import terms
+from tracing import get_logger
+
+logger = get_logger("prefetch")
+
+# 本地规则：(权重, 模式)，命中的权重相加；需要联网的问题通常带有时间、时事类的词或明确的查找意图
+_SIGNALS = (
+    (0.5, re.compile(r"今天|今日|明天|昨天|最近|近期|最新|现在|目前|当前|本周|本月|今年|去年|\d{4}\s*年|today|latest|recent|now")),
+    (0.5, re.compile(r"天气|气温|下雨|新闻|案件|案例|判决|价格|股价|汇率|比分|赛程|航班|政策|法规|weather|news|price")),
+    (0.5, re.compile(r"查一查|查询|搜索|搜一搜|找一找|帮我找|帮我查|search|look up")),
+    (0.25, re.compile(r"什么|哪|谁|多少|几|怎么样|如何|吗|[?？]|what|when|where|who|how")),
+)
+# 改写、翻译、寒暄等不需要搜索的请求
+_NEGATIVE = re.compile(r"你好|谢谢|再见|翻译|润色|改写|优化|写一|帮我写|总结一下|计算|hello|thanks|translate")
+_MIN_CHARS = 4
+
+
+def speculation_score(question: str) -> float:
+    """
+    按本地规则估计这个问题需要联网搜索的可能性，取值 0~1，不调用模型。
+    """
+    text = question.lower()
+    if len(text.strip()) < _MIN_CHARS or _NEGATIVE.search(text):
+        return 0.0
+    return min(1.0, sum(weight for weight, pattern in _SIGNALS if pattern.search(text)))
+
+
+def similarity(question: str, query: str) -> float:
+    """
+    agent 的查询中有多少检索词出现在原始问题里；查询通常是问题的改写或子集。
+    """
+    query_terms = set(terms(query))
+    if not query_terms:
+        return 0.0
+    return len(query_terms & set(terms(question))) / len(query_terms)
+
+
+class Speculation:
+    """
+    一次推测性的工具调用，future 的结果为 ToolResult。
+    """
+
+    def __init__(self, question: str):
+        self.question = question
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+        self.future: Optional[Future] = None
+
+    def run(self, func, *args):
+        # 完成时间在返回结果之前记录，等待 future 的一方一定能读到
+        try:
+            return func(*args)
+        finally:
+            self.finished = time.perf_counter()
+
+
+class Prefetcher:
+    """
+    每轮第一次调用 agent 的同时按原始问题发起一次工具调用（默认 web_search）。
+
+    agent 返回后，与问题足够相似的第一个同名工具调用认领预取的结果，执行工具时直接使用，
+    不再等待一次完整的请求；没有被认领的预取，以及认领后因重复或预算用尽而不会执行的预取计为浪费。
+    max_pending 限制已认领但尚未执行的数量，只兜底执行中断的情况。
+    """
+
+    def __init__(
+            self,
+            tool: str = "web_search",
+            min_score: float = 0.5,
+            min_similarity: float = 0.6,
+            max_workers: int = 4,
+            max_pending: int = 256,
+    ):
+        self.tool = tool
+        self.min_score = min_score
+        self.min_similarity = min_similarity
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="prefetch")
+        self._claimed: "OrderedDict[str, Speculation]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.counts = {"skipped": 0, "hit": 0, "miss": 0, "failed": 0}
+        self.saved_seconds = 0.0
+
+    @classmethod
+    def from_config(cls) -> "Prefetcher":
+        options = dict(Config.PREFETCH)
+        options.pop("enabled", None)
+        return cls(**options)
+
+    def stats(self) -> Dict[str, float]:
+        return {**self.counts, "saved_seconds": self.saved_seconds}
+
+    def _count(self, outcome: str) -> None:
+        with self._lock:
+            self.counts[outcome] += 1
+        if metrics.enabled():
+            metrics.prefetch_total.inc(outcome=outcome)
+
+    def speculate(self, question: str, tools: Optional[Sequence[str]] = None) -> Optional[Speculation]:
+        """
+        问题的得分达到 min_score 且当前节点可以使用该工具时开始预取，否则返回 None。
+        """
+        if self.tool not in (tools or Config.TOOLS):
+            return None
+        if speculation_score(question) < self.min_score:
+            self._count("skipped")
+            return None
+        from tools import get_tool_dispatcher
+
+        dispatcher = get_tool_dispatcher()
+        logger.debug("预取: %s", question)
+        speculation = Speculation(question)
+        speculation.future = self._executor.submit(speculation.run, dispatcher.invoke, self.tool, question)
+        return speculation
+
+    def resolve(self, speculation: Speculation, agent_outcome) -> None:
+        """
+        agent 返回后调用：把预取交给与问题最先匹配的工具调用，没有匹配时计为浪费。
+        """
+        actions = agent_outcome if isinstance(agent_outcome, list) else [agent_outcome]
+        for action in actions:
+            if not isinstance(action, AgentAction) or action.tool != self.tool:
+                continue
+            tool_call_id = getattr(action, "tool_call_id", "")
+            query = action.tool_input.get("query", "") if isinstance(action.tool_input, dict) else action.tool_input
+            if tool_call_id and similarity(speculation.question, str(query)) >= self.min_similarity:
+                evicted = 0
+                with self._lock:
+                    self._claimed[tool_call_id] = speculation
+                    while len(self._claimed) > self.max_pending:
+                        self._claimed.popitem(last=False)
+                        evicted += 1
+                # 认领后一直没有执行（执行中断）的预取被挤出时计为浪费
+                for _ in range(evicted):
+                    self._count("miss")
+                return
+        self._count("miss")
+
+    def discard(self, actions: Sequence) -> None:
+        """
+        这些工具调用不会执行（重复的查询、预算用尽）时调用：丢弃它们认领的预取，计为浪费。
+        """
+        tool_call_ids = [getattr(action, "tool_call_id", "") for action in actions]
+        with self._lock:
+            discarded = [self._claimed.pop(tool_call_id) for tool_call_id in tool_call_ids
+                         if tool_call_id in self._claimed]
+        for speculation in discarded:
+            # 还在排队的预取不再执行，已经开始的照常完成，结果随之丢弃
+            speculation.future.cancel()
+            self._count("miss")
+
+    def _take(self, tool_call_id: str) -> Optional[Speculation]:
+        if not tool_call_id:
+            return None
+        with self._lock:
+            return self._claimed.pop(tool_call_id, None)
+
+    def _settle(self, speculation: Speculation, claimed_at: float, result) -> Optional[str]:
+        if not result.ok:
+            self._count("failed")
+            return None
+        # 不预取时请求从认领时开始，节省的时间是认领前已经运行的部分，最多为一次完整请求的耗时
+        saved = min(speculation.finished, claimed_at) - speculation.started
+        self._count("hit")
+        with self._lock:
+            self.saved_seconds += saved
+        if metrics.enabled():
+            metrics.prefetch_saved_seconds.observe(saved)
+        return result.content
+
+    def take(self, tool_call_id: str) -> Optional[str]:
+        """
+        返回该工具调用认领的预取结果，必要时等待预取完成；没有认领或预取失败时返回 None，由调用方正常执行。
+        """
+        speculation = self._take(tool_call_id)
+        if speculation is None:
+            return None
+        claimed_at = time.perf_counter()
+        return self._settle(speculation, claimed_at, speculation.future.result())
+
+    async def atake(self, tool_call_id: str) -> Optional[str]:
+        speculation = self._take(tool_call_id)
+        if speculation is None:
+            return None
+        claimed_at = time.perf_counter()
+        return self._settle(speculation, claimed_at, await asyncio.wrap_future(speculation.future))
+
+
+_prefetcher: Optional[Prefetcher] = None
+_prefetcher_lock = threading.Lock()
+
+
+def get_prefetcher() -> Optional[Prefetcher]:
+    """
+    返回进程内共享的 Prefetcher；Config.PREFETCH["enabled"] 为 False 时返回 None。
+    """
+    global _prefetcher
+    if not Config.PREFETCH["enabled"]:
+        return None
+    if _prefetcher is None:
+        with _prefetcher_lock:
+            if _prefetcher is None:
+                _prefetcher = Prefetcher.from_config()
+    return _prefetcher
@@ -0,0 +1,142 @@
+import asyncio
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Dict, Optional
+
+from config import Config
+
+# 异步等待并发名额时的轮询间隔（秒）
+_POLL_INTERVAL = 0.005
+
+
+class AdaptiveRateLimiter:
+    """
+    令牌桶限速加并发上限，按 AIMD 调整速率。
+
+    每次成功的请求把速率加 increase_step（不超过初始速率 max_rate），
+    遇到 429 时速率乘以 decrease_factor（不低于 min_rate），有 Retry-After 时在此期间暂停发放令牌。
+    """
+
+    def __init__(
+            self,
+            rate: float,
+            burst: float = 1,
+            concurrency: int = 4,
+            min_rate: float = 0.1,
+            increase_step: float = 0.1,
+            decrease_factor: float = 0.5,
+    ):
+        self.rate = rate
+        self.max_rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(concurrency)
+        self.throttled = 0
+
+    def _wait_time(self) -> float:
+        # 调用方需持有 self._lock；返回 0 表示已取得令牌
+        now = time.monotonic()
+        if now < self._blocked_until:
+            return self._blocked_until - now
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+    def acquire(self) -> None:
+        """
+        占用一个并发名额并等待令牌。
+        """
+        self._slots.acquire()
+        try:
+            while True:
+                with self._lock:
+                    wait = self._wait_time()
+                if wait == 0:
+                    return
+                time.sleep(wait)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    async def aacquire(self) -> None:
+        """
+        acquire 的异步版本：在事件循环中等待并发名额与令牌，不占用线程；等待期间被取消时不会留下名额。
+        """
+        # 名额可能被其他线程中的同步调用释放，事件循环无法收到通知，只能轮询
+        while not self._slots.acquire(blocking=False):
+            await asyncio.sleep(_POLL_INTERVAL)
+        try:
+            while True:
+                with self._lock:
+                    wait = self._wait_time()
+                if wait == 0:
+                    return
+                await asyncio.sleep(wait)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self) -> None:
+        self._slots.release()
+
+    @contextmanager
+    def slot(self):
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    @asynccontextmanager
+    async def aslot(self):
+        await self.aacquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def on_success(self) -> None:
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.increase_step)
+
+    def on_throttle(self, retry_after: Optional[str] = None) -> None:
+        with self._lock:
+            self.throttled += 1
+            self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+            self._tokens = 0
+            if retry_after:
+                try:
+                    self._blocked_until = max(self._blocked_until, time.monotonic() + float(retry_after))
+                except ValueError:
+                    pass
+
+    def stats(self) -> Dict[str, float]:
+        return {"rate": self.rate, "throttled": self.throttled}
+
+
+_limiters: Dict[str, AdaptiveRateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(endpoint: str) -> Optional[AdaptiveRateLimiter]:
+    """
+    返回 Config.RATE_LIMITS 中某个端点（"glm"、"search"）共享的限速器，未配置时返回 None。
+    """
+    options = Config.RATE_LIMITS.get(endpoint)
+    if not options:
+        return None
+    if endpoint not in _limiters:
+        with _limiters_lock:
+            if endpoint not in _limiters:
+                _limiters[endpoint] = AdaptiveRateLimiter(**options)
+    return _limiters[endpoint]
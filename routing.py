@@ -0,0 +1,89 @@
+import re
+from typing import Optional
+
+import metrics
+from config import Config
+from observations import SENTENCE_END
+from prefetch import speculation_score
+
+# 句末标点；以它们结尾的文本才算完整
+_TERMINAL = tuple("。！？!?.…”」）)")
+# 重复的标点、连续空白或中文之间多余的空格，通常是生成或拼接留下的痕迹
+_MALFORMED = re.compile(r"([，。！？、；：,!?;:])\1|\s{3,}|(?<=[一-鿿]) (?=[一-鿿])")
+
+
+def well_formed(text: str, max_sentence_chars: int = 80) -> bool:
+    """
+    按本地规则判断文本是否已经通顺：以句末标点结尾，没有重复标点与多余空白，
+    每句不超过 max_sentence_chars 个字符，且没有重复的句子。
+    """
+    text = text.strip()
+    if not text.endswith(_TERMINAL) or _MALFORMED.search(text):
+        return False
+    sentences = [sentence.strip() for sentence in SENTENCE_END.split(text) if sentence.strip()]
+    if any(len(sentence) > max_sentence_chars for sentence in sentences):
+        return False
+    return len(set(sentences)) == len(sentences)
+
+
+class RoutingPolicy:
+    """
+    按本地特征为每轮请求选择更便宜的路径，不调用模型。
+
+    - agent 节点：问题需要联网的得分（prefetch.speculation_score）低于 tool_score 时，
+      第一轮直接用 direct_prompt 作答，不带工具 schema 与 scratchpad（路由 direct，否则为 tools）
+    - beautify 节点：回答不超过 min_chars 个字符（short），或 skip_well_formed 为 True 且
+      回答已经通顺（well_formed）时不再润色，否则为 beautify
+
+    enabled 为 False 时总是走完整的路径，也不记录指标。
+    """
+
+    def __init__(
+            self,
+            enabled: bool = False,
+            tool_score: float = 0.25,
+            direct_prompt: str = "direct_prompt",
+            min_chars: int = 40,
+            skip_well_formed: bool = True,
+            max_sentence_chars: int = 80,
+    ):
+        self.enabled = enabled
+        self.tool_score = tool_score
+        self.direct_prompt = direct_prompt
+        self.min_chars = min_chars
+        self.skip_well_formed = skip_well_formed
+        self.max_sentence_chars = max_sentence_chars
+
+    @classmethod
+    def from_config(cls) -> "RoutingPolicy":
+        return cls(**Config.ROUTING)
+
+    def route_question(self, question: str) -> Optional[str]:
+        """
+        返回 "direct" 或 "tools"；未启用时返回 None。
+        """
+        if not self.enabled:
+            return None
+        route = "direct" if speculation_score(question) < self.tool_score else "tools"
+        _count("agent", route)
+        return route
+
+    def route_output(self, text: str) -> Optional[str]:
+        """
+        返回 "short"、"well_formed" 或 "beautify"；未启用时返回 None。
+        """
+        if not self.enabled:
+            return None
+        if len(text.strip()) <= self.min_chars:
+            route = "short"
+        elif self.skip_well_formed and well_formed(text, self.max_sentence_chars):
+            route = "well_formed"
+        else:
+            route = "beautify"
+        _count("beautify", route)
+        return route
+
+
+def _count(stage: str, route: str) -> None:
+    if metrics.enabled():
+        metrics.route_total.inc(stage=stage, route=route)
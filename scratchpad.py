@@ -0,0 +1,178 @@
+import hashlib
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from langchain_core.agents import AgentAction
+from langchain_core.messages import AIMessage
+
+from config import Config
+
+
+# 单次工具调用的紧凑记录，工具结果只保存引用，原文统一存放在 observations 中
+class ScratchStep(NamedTuple):
+    turn: int
+    tool: str
+    tool_input: dict
+    tool_call_id: str
+    result_ref: str
+
+
+def make_result_ref(observation: str) -> str:
+    """
+    按内容生成结果引用，相同的搜索结果只存一份。
+    """
+    return hashlib.sha1(observation.encode("utf-8")).hexdigest()[:16]
+
+
+def as_steps(items: Sequence) -> List[ScratchStep]:
+    """
+    JsonPlus 检查点把 NamedTuple 还原为普通列表，从检查点继续执行时先把记录转换回 ScratchStep。
+    """
+    if all(type(item) is ScratchStep for item in items):
+        return list(items)
+    return [item if type(item) is ScratchStep else ScratchStep(*item) for item in items]
+
+
+def merge_steps(left: List[ScratchStep], right: Optional[List[ScratchStep]]) -> List[ScratchStep]:
+    """
+    intermediate_steps 的 reducer：追加本步新增的记录；传入 None 表示开始新一轮，清空上一轮的记录。
+    """
+    if right is None:
+        return []
+    return as_steps(left) + as_steps(right)
+
+
+def merge_observations(left: Dict[str, str], right: Optional[Dict[str, str]]) -> Dict[str, str]:
+    """
+    observations 的 reducer：只合并本步新增的结果；传入 None 时清空。
+    """
+    if right is None:
+        return {}
+    if not right:
+        return left
+    merged = dict(left)
+    merged.update(right)
+    return merged
+
+
+def record_steps(
+        previous: Sequence[ScratchStep],
+        actions: Sequence[AgentAction],
+        outputs: Sequence[str],
+) -> Tuple[List[ScratchStep], Dict[str, str]]:
+    """
+    把一轮工具调用转换为增量记录，返回 (新增步骤, 新增结果)。
+    """
+    turn = previous[-1].turn + 1 if previous else 0
+    steps = []
+    observations = {}
+    for action, output in zip(actions, outputs):
+        ref = make_result_ref(output)
+        observations[ref] = output
+        tool_input = action.tool_input if isinstance(action.tool_input, dict) else {"input": action.tool_input}
+        steps.append(ScratchStep(
+            turn=turn,
+            tool=action.tool,
+            tool_input=tool_input,
+            tool_call_id=getattr(action, "tool_call_id", ""),
+            result_ref=ref,
+        ))
+    return steps, observations
+
+
+# 摘要名 -> 摘要函数(原文)，Config.SCRATCHPAD["summarizer"] 在这里查找
+SUMMARIZERS: Dict[str, Callable[[str], str]] = {}
+
+
+def register_summarizer(name: str, summarizer: Callable[[str], str]) -> None:
+    """
+    注册一个可以在 Config.SCRATCHPAD["summarizer"] 中使用的摘要函数，输入旧的工具结果，返回摘要。
+    """
+    SUMMARIZERS[name] = summarizer
+
+
+class ObservationPolicy:
+    """
+    控制旧的工具结果如何渲染进 agent_scratchpad。
+
+    最近 keep_recent 条结果保持原文；更早的结果交给 summarizer 摘要，
+    未提供 summarizer 时截断到 max_chars 个字符。
+    """
+
+    def __init__(
+            self,
+            keep_recent: int = 4,
+            max_chars: int = 300,
+            summarizer: Optional[Callable[[str], str]] = None,
+    ):
+        self.keep_recent = keep_recent
+        self.max_chars = max_chars
+        self.summarizer = summarizer
+
+    @classmethod
+    def from_config(cls) -> "ObservationPolicy":
+        options = dict(Config.SCRATCHPAD)
+        name = options.pop("summarizer", None)
+        if name is not None and name not in SUMMARIZERS:
+            raise ValueError(f"未知的摘要: {name}，可用的摘要：{sorted(SUMMARIZERS)}")
+        return cls(summarizer=SUMMARIZERS[name] if name is not None else None, **options)
+
+    def apply(self, age: int, text: str) -> str:
+        """
+        age 为 0 表示最新的一条结果。
+        """
+        if age < self.keep_recent:
+            return text
+        if self.summarizer is not None:
+            return self.summarizer(text)
+        if len(text) > self.max_chars:
+            return text[:self.max_chars] + "…（已截断）"
+        return text
+
+
+def _tool_call_message(steps: Sequence[ScratchStep]) -> AIMessage:
+    # 同一轮的多个工具调用共用一条 AI 消息，与模型原始输出保持一致
+    return AIMessage(
+        content="",
+        tool_calls=[
+            {"id": step.tool_call_id, "name": step.tool, "args": step.tool_input}
+            for step in steps
+        ],
+    )
+
+
+def render_steps(
+        steps: Sequence[ScratchStep],
+        observations: Dict[str, str],
+        policy: Optional[ObservationPolicy] = None,
+) -> List[Tuple[AgentAction, str]]:
+    """
+    把紧凑记录还原为 create_openai_tools_agent 需要的 (AgentAction, observation) 列表。
+    """
+    # langchain.agents 导入较慢，只在真正渲染工具调用时加载
+    from langchain.agents.output_parsers.tools import ToolAgentAction
+
+    policy = policy or ObservationPolicy.from_config()
+    rendered = []
+    total = len(steps)
+    start = 0
+    while start < total:
+        end = start
+        while end < total and steps[end].turn == steps[start].turn:
+            end += 1
+        turn_steps = steps[start:end]
+        message = _tool_call_message(turn_steps)
+        for index, step in enumerate(turn_steps, start=start):
+            observation = policy.apply(total - 1 - index, observations.get(step.result_ref, ""))
+            if step.tool_call_id:
+                action = ToolAgentAction(
+                    tool=step.tool,
+                    tool_input=step.tool_input,
+                    log="",
+                    message_log=[message],
+                    tool_call_id=step.tool_call_id,
+                )
+            else:
+                action = AgentAction(tool=step.tool, tool_input=step.tool_input, log="")
+            rendered.append((action, observation))
+        start = end
+    return rendered
@@ -0,0 +1,307 @@
+import asyncio
+import json
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from config import Config
+
+_SPACES = re.compile(r"\s+")
+_TRAILING_PUNCTUATION = "?？!！。.,，;；~～"
+
+
+def normalize_query(query: str) -> str:
+    """
+    规范化查询语句：全角转半角、统一大小写、合并空白并去掉句尾标点。
+    """
+    query = unicodedata.normalize("NFKC", query).lower()
+    query = _SPACES.sub(" ", query).strip()
+    return query.rstrip(_TRAILING_PUNCTUATION).strip()
+
+
+class _SqliteStore:
+    """
+    SearchCache 的磁盘层，进程重启后缓存仍然有效。
+
+    命中时只在内存中记下访问时间，下次写入时批量更新，读取不产生磁盘写入。
+    """
+
+    def __init__(self, path: str, max_entries: int):
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS search_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self.conn.commit()
+        self._touched: Dict[str, float] = {}
+
+    def get(self, key: str, now: float) -> Tuple[Optional[Any], float]:
+        """
+        读取未过期的结果；过期的行在下次写入时统一删除。
+        """
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT value, expires_at FROM search_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or row[1] <= now:
+                return None, 0.0
+            self._touched[key] = now
+        return json.loads(row[0]), row[1]
+
+    def _flush(self) -> None:
+        # 调用方需持有 self.lock
+        if self._touched:
+            self.conn.executemany(
+                "UPDATE search_cache SET accessed_at = ? WHERE key = ?",
+                [(accessed_at, key) for key, accessed_at in self._touched.items()],
+            )
+            self._touched.clear()
+
+    def put(self, key: str, value: Any, expires_at: float, now: float) -> int:
+        """
+        写入一条结果，返回因超出容量被淘汰的条数。
+        """
+        with self.lock:
+            self._flush()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO search_cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), expires_at, now),
+            )
+            self.conn.execute("DELETE FROM search_cache WHERE expires_at <= ?", (now,))
+            evicted = self.conn.execute(
+                "DELETE FROM search_cache WHERE key IN ("
+                "SELECT key FROM search_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            ).rowcount
+            self.conn.commit()
+            return evicted
+
+    def close(self) -> None:
+        with self.lock:
+            self._flush()
+            self.conn.commit()
+            self.conn.close()
+
+
+class SearchCache:
+    """
+    web_search 结果缓存。
+
+    以规范化后的 query 作为键，内存层按 LRU 淘汰、按 TTL 过期，可选 SQLite 磁盘层；
+    并发的相同查询只会发起一次请求（single-flight），其余调用等待同一个结果。
+    磁盘层的读写都在 self._lock 之外进行，异步调用时放到线程池中执行，不阻塞事件循环。
+    """
+
+    def __init__(self, ttl: float = 600, max_entries: int = 1024, sqlite_path: Optional[str] = None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._store = _SqliteStore(sqlite_path, max_entries) if sqlite_path else None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.coalesced = 0
+
+    @classmethod
+    def from_config(cls) -> "SearchCache":
+        options = dict(Config.SEARCH_CACHE)
+        options.pop("enabled", None)
+        return cls(**options)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "coalesced": self.coalesced,
+            "size": len(self._entries),
+        }
+
+    def _lookup(self, key: str) -> Optional[Any]:
+        # 调用方需持有 self._lock；只查内存层
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[1] > time.time():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            del self._entries[key]
+        return None
+
+    def _read(self, key: str) -> Tuple[Optional[Any], float]:
+        # 不持有 self._lock 时调用
+        if self._store is None:
+            return None, 0.0
+        return self._store.get(key, time.time())
+
+    async def _aread(self, key: str) -> Tuple[Optional[Any], float]:
+        if self._store is None:
+            return None, 0.0
+        return await asyncio.get_running_loop().run_in_executor(None, self._read, key)
+
+    def _write(self, key: str, value: Any, expires_at: float, now: float) -> None:
+        # 不持有 self._lock 时调用
+        evicted = self._store.put(key, value, expires_at, now)
+        if evicted:
+            with self._lock:
+                self.evictions += evicted
+
+    def _remember(self, key: str, value: Any, expires_at: float) -> None:
+        # 调用方需持有 self._lock
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            # 有磁盘层时内存淘汰的结果仍可从磁盘读回，只统计磁盘层的淘汰
+            if self._store is None:
+                self.evictions += 1
+
+    def get(self, query: str) -> Optional[Any]:
+        key = normalize_query(query)
+        with self._lock:
+            value = self._lookup(key)
+            if value is not None:
+                return value
+        value, expires_at = self._read(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._remember(key, value, expires_at)
+        return value
+
+    def put(self, query: str, value: Any) -> None:
+        key = normalize_query(query)
+        with self._lock:
+            write = self._put(key, value)
+        if write is not None:
+            self._write(key, value, *write)
+
+    def _put(self, key: str, value: Any) -> Optional[Tuple[float, float]]:
+        """
+        写入内存层，返回写入磁盘层所需的 (过期时间, 当前时间)；没有磁盘层时返回 None。
+
+        调用方需持有 self._lock，磁盘写入由调用方在释放锁之后进行。
+        """
+        now = time.time()
+        expires_at = now + self.ttl
+        self._remember(key, value, expires_at)
+        if self._store is None:
+            return None
+        return expires_at, now
+
+    def _claim(self, query: str) -> Tuple[str, Optional[Any], Optional[Future], bool]:
+        """
+        返回 (键, 缓存值, 进行中的请求, 是否由当前调用负责读取磁盘层并发起请求)。
+        """
+        key = normalize_query(query)
+        with self._lock:
+            value = self._lookup(key)
+            if value is not None:
+                return key, value, None, False
+            future = self._inflight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return key, None, future, False
+            future = Future()
+            self._inflight[key] = future
+            return key, None, future, True
+
+    def _settle(self, key: str, future: Future, value: Any = None, error: BaseException = None,
+                expires_at: Optional[float] = None) -> Optional[Tuple[float, float]]:
+        """
+        结束进行中的请求并唤醒等待的调用。
+
+        expires_at 不为空表示结果读自磁盘层；否则是新获取的结果，返回写入磁盘层所需的参数。
+        """
+        write = None
+        with self._lock:
+            if error is not None:
+                self.misses += 1
+            elif expires_at is not None:
+                self.hits += 1
+                self._remember(key, value, expires_at)
+            else:
+                self.misses += 1
+                write = self._put(key, value)
+            del self._inflight[key]
+        if error is None:
+            future.set_result(value)
+        else:
+            future.set_exception(error)
+        return write
+
+    def get_or_fetch(self, query: str, loader: Callable[[], Any]) -> Any:
+        """
+        命中缓存时直接返回，否则调用 loader 获取结果并写入缓存；loader 抛出的异常不会被缓存。
+        """
+        key, value, future, leader = self._claim(query)
+        if future is None:
+            return value
+        if not leader:
+            return future.result()
+        try:
+            value, expires_at = self._read(key)
+            if value is None:
+                value, expires_at = loader(), None
+        except BaseException as e:
+            self._settle(key, future, error=e)
+            raise
+        write = self._settle(key, future, value, expires_at=expires_at)
+        if write is not None:
+            self._write(key, value, *write)
+        return value
+
+    async def aget_or_fetch(self, query: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        get_or_fetch 的异步版本，与同步调用共享同一份缓存和进行中的请求。
+        """
+        key, value, future, leader = self._claim(query)
+        if future is None:
+            return value
+        if not leader:
+            return await asyncio.wrap_future(future)
+        try:
+            value, expires_at = await self._aread(key)
+            if value is None:
+                value, expires_at = await loader(), None
+        except BaseException as e:
+            self._settle(key, future, error=e)
+            raise
+        write = self._settle(key, future, value, expires_at=expires_at)
+        if write is not None:
+            await asyncio.get_running_loop().run_in_executor(None, self._write, key, value, *write)
+        return value
+
+    def close(self) -> None:
+        if self._store is not None:
+            self._store.close()
+
+
+_cache: Optional[SearchCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_search_cache() -> Optional[SearchCache]:
+    """
+    返回进程内共享的 SearchCache；Config.SEARCH_CACHE["enabled"] 为 False 时返回 None。
+    """
+    global _cache
+    if not Config.SEARCH_CACHE["enabled"]:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = SearchCache.from_config()
+    return _cache
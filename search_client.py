@@ -0,0 +1,141 @@
+import asyncio
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+from config import Config
+from rate_limiter import AdaptiveRateLimiter, get_limiter
+
+# 需要重试的状态码：限流与服务端错误
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class SearchClient:
+    """
+    web-search-pro 的共享 HTTP 客户端。
+
+    使用带长连接池的 requests.Session，连接超时与读取超时分开设置，
+    遇到 429/5xx 时按带抖动的指数退避重试，同时提供同步与异步两个入口。
+    传入 limiter 时每次请求都经过该限速器，429 会反馈给限速器以降低速率。
+    """
+
+    def __init__(
+            self,
+            api_key: str,
+            url: str = "https://open.bigmodel.cn/api/paas/v4/tools",
+            tool: str = "web-search-pro",
+            connect_timeout: float = 5,
+            read_timeout: float = 60,
+            pool_size: int = 16,
+            max_retries: int = 3,
+            backoff_base: float = 0.5,
+            backoff_max: float = 8,
+            limiter: Optional[AdaptiveRateLimiter] = None,
+    ):
+        self.api_key = api_key
+        self.url = url
+        self.tool = tool
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.limiter = limiter
+
+        # 重试由本类自己控制，HTTPAdapter 只负责连接复用
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({"Authorization": api_key})
+        # 异步入口使用的线程池，大小与连接池一致
+        self._executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="web-search")
+
+    @classmethod
+    def from_config(cls) -> "SearchClient":
+        return cls(api_key=Config.API_KEY, limiter=get_limiter("search"), **Config.SEARCH_CONFIG)
+
+    def _backoff(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        # full jitter：在 [0, 上限] 内随机等待，避免并发请求同时重试
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+        if retry_after:
+            try:
+                delay = max(delay, float(retry_after))
+            except ValueError:
+                pass
+        return delay
+
+    def _post(self, data: dict) -> requests.Response:
+        if self.limiter is None:
+            return self.session.post(self.url, json=data, timeout=self.timeout)
+        with self.limiter.slot():
+            resp = self.session.post(self.url, json=data, timeout=self.timeout)
+        if resp.status_code == 429:
+            self.limiter.on_throttle(resp.headers.get("Retry-After"))
+        elif resp.status_code < 500:
+            self.limiter.on_success()
+        return resp
+
+    def search(self, query: str) -> requests.Response:
+        """
+        同步发起一次搜索，返回最后一次 HTTP 响应。
+        """
+        data = {
+            "request_id": str(uuid.uuid4()),
+            "tool": self.tool,
+            "stream": False,
+            "messages": [{"role": "user", "content": query}],
+        }
+        start = time.perf_counter()
+        for attempt in range(self.max_retries + 1):
+            try:
+                resp = self._post(data)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == self.max_retries:
+                    if metrics.enabled():
+                        metrics.search_seconds.observe(time.perf_counter() - start, status=type(e).__name__)
+                    raise
+                time.sleep(self._backoff(attempt))
+                continue
+            if resp.status_code not in RETRY_STATUS or attempt == self.max_retries:
+                if metrics.enabled():
+                    metrics.search_seconds.observe(time.perf_counter() - start, status=resp.status_code)
+                    metrics.search_bytes.observe(len(resp.content))
+                return resp
+            time.sleep(self._backoff(attempt, resp.headers.get("Retry-After")))
+        raise RuntimeError("unreachable")
+
+    async def asearch(self, query: str) -> requests.Response:
+        """
+        异步入口：在专用线程池中执行同步的 requests 请求，与同步入口共享同一个连接池。
+
+        这不是原生的异步 I/O：每个进行中的请求占用线程池中的一个线程，并发上限为 pool_size。
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self.search, query)
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False)
+        self.session.close()
+
+
+_client: Optional[SearchClient] = None
+_client_lock = threading.Lock()
+
+
+def get_search_client() -> SearchClient:
+    """
+    返回进程内共享的 SearchClient，首次调用时按 Config 创建。
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = SearchClient.from_config()
+    return _client
@@ -0,0 +1,326 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config import Config
+from observations import terms
+from search_cache import normalize_query
+from tracing import get_logger
+
+logger = get_logger("search_index")
+
+# 疑问词、语气词与请求套话：同一个问题的不同问法主要差在这些字上，嵌入前去掉
+_FILLERS = re.compile(r"请问|帮我|帮忙|麻烦|告诉我|查一下|查一查|查查|找一找|搜一搜|搜索|查询|一下|是什么|有什么|有哪些|"
+                      r"什么|怎么样|怎么|如何|哪些|哪个|多少|是否|有没有|是不是|的|了|吗|呢|吧|啊|呀")
+
+# 数字与日期：阿拉伯数字，以及后面跟着日期或数量单位的中文数字
+_NUMBERS = r"\d+(?:\.\d+)?|[零〇一二两三四五六七八九十百千万]+(?=[年月日号天周点时岁个])"
+# 省级行政区与主要城市；问题中出现的地名必须与已有查询完全一致，Config.SEARCH_INDEX["places"] 可以补充
+PLACES = (
+    "北京", "天津", "上海", "重庆", "河北", "山西", "辽宁", "吉林", "黑龙江", "江苏", "浙江", "安徽", "福建", "江西", "山东",
+    "河南", "湖北", "湖南", "广东", "海南", "四川", "贵州", "云南", "陕西", "甘肃", "青海", "台湾", "内蒙古", "广西", "西藏",
+    "宁夏", "新疆", "香港", "澳门", "石家庄", "太原", "沈阳", "长春", "哈尔滨", "南京", "杭州", "合肥", "福州", "南昌", "济南",
+    "郑州", "武汉", "长沙", "广州", "海口", "成都", "贵阳", "昆明", "西安", "兰州", "西宁", "呼和浩特", "南宁", "拉萨", "银川",
+    "乌鲁木齐", "深圳", "苏州", "宁波", "青岛", "厦门", "大连", "无锡", "佛山", "东莞", "温州", "珠海", "三亚",
+)
+
+# 嵌入函数：一组文本 -> (文本数, 维数) 的 float32 矩阵，每行的 L2 范数为 1（没有可用特征时为 0）
+Embedder = Callable[[Sequence[str]], np.ndarray]
+
+
+class HashingEmbedder:
+    """
+    默认的纯 CPU 嵌入：去掉疑问词与语气词后，检索词（英文整词、中文二元组，见 observations.terms）
+    按 crc32 散列到 dim 维，带符号计数后归一化。不需要模型与网络，同一个词在任何进程中都落在同一维上。
+    """
+
+    def __init__(self, dim: int = 256):
+        self.dim = dim
+
+    def __call__(self, texts: Sequence[str]) -> np.ndarray:
+        rows, columns, signs = [], [], []
+        for row, text in enumerate(texts):
+            for term in terms(_FILLERS.sub("", text)):
+                h = zlib.crc32(term.encode("utf-8"))
+                rows.append(row)
+                columns.append(h % self.dim)
+                signs.append(1.0 if h & 0x80000000 else -1.0)
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        np.add.at(vectors, (rows, columns), signs)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        np.divide(vectors, norms, out=vectors, where=norms > 0)
+        return vectors
+
+
+# 嵌入名 -> 工厂函数(dim)，Config.SEARCH_INDEX["embedder"] 在这里查找
+EMBEDDERS: Dict[str, Callable[[int], Embedder]] = {
+    "hashing": HashingEmbedder,
+}
+
+
+def register_embedder(name: str, factory: Callable[[int], Embedder]) -> None:
+    """
+    注册一个可以在 Config.SEARCH_INDEX["embedder"] 中使用的嵌入，factory(dim) 返回嵌入函数。
+    """
+    EMBEDDERS[name] = factory
+
+
+def entity_pattern(places: Sequence[str] = ()) -> re.Pattern:
+    """
+    匹配数字、日期与地名的正则，长的地名优先，"内蒙古" 不会被拆成其他地名。
+    """
+    names = sorted(set(PLACES) | set(places), key=len, reverse=True)
+    return re.compile("|".join([_NUMBERS, *map(re.escape, names)]))
+
+
+class IndexHit(NamedTuple):
+    query: str
+    score: float
+    age: float
+    slot: int
+
+
+class _EntryStore:
+    """
+    SearchIndex 的磁盘层：向量保存在内存映射的 .npy 中，查询、时间与原始响应保存在 SQLite 中。
+    """
+
+    def __init__(self, path: str, capacity: int, dim: int):
+        os.makedirs(path, exist_ok=True)
+        vectors_path = os.path.join(path, "vectors.npy")
+        vectors = None
+        if os.path.exists(vectors_path):
+            vectors = np.load(vectors_path, mmap_mode="r+")
+            if vectors.shape != (capacity, dim):
+                logger.warning("索引向量的形状 %s 与配置 %s 不一致，重新建立索引", vectors.shape, (capacity, dim))
+                vectors = None
+        fresh = vectors is None
+        if fresh:
+            vectors = np.lib.format.open_memmap(vectors_path, mode="w+", dtype=np.float32, shape=(capacity, dim))
+        self.vectors = vectors
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(os.path.join(path, "entries.sqlite"), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        if fresh:
+            self.conn.execute("DROP TABLE IF EXISTS search_index")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS search_index ("
+            "slot INTEGER PRIMARY KEY, query TEXT NOT NULL, created_at REAL NOT NULL, payload TEXT NOT NULL)"
+        )
+        self.conn.commit()
+
+    def entries(self) -> List[tuple]:
+        with self.lock:
+            return self.conn.execute("SELECT slot, query, created_at FROM search_index").fetchall()
+
+    def put(self, slots: Sequence[int], queries: Sequence[str], created_at: Sequence[float],
+            payloads: Sequence[Any]) -> None:
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO search_index (slot, query, created_at, payload) VALUES (?, ?, ?, ?)",
+                [(slot, query, created, json.dumps(payload, ensure_ascii=False))
+                 for slot, query, created, payload in zip(slots, queries, created_at, payloads)],
+            )
+            self.conn.commit()
+        self.vectors.flush()
+
+    def payload(self, slot: int) -> Any:
+        with self.lock:
+            row = self.conn.execute("SELECT payload FROM search_index WHERE slot = ?", (slot,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def close(self) -> None:
+        with self.lock:
+            self.conn.close()
+        self.vectors.flush()
+
+
+class SearchIndex:
+    """
+    过去的 web_search 结果的本地向量索引：按查询语句的嵌入检索，足够相似且足够新的结果直接复用，不再联网。
+
+    最多保存 max_entries 条，满了以后覆盖最早写入的一条。新鲜度按查询类型判断：freshness 中第一个
+    pattern 匹配新查询的规则给出结果的最长可用时间（秒），都不匹配时为 default_max_age。
+    嵌入只衡量字面上的相似，日期、数字与地名（PLACES 与 places）不同的查询即使相似度很高也不会复用。
+    path 不为空时向量以内存映射的矩阵保存，进程重启后仍然有效。
+    """
+
+    def __init__(
+            self,
+            embedder: str = "hashing",
+            dim: int = 256,
+            max_entries: int = 10000,
+            min_similarity: float = 0.9,
+            default_max_age: float = 86400,
+            freshness: Optional[Dict[str, dict]] = None,
+            places: Sequence[str] = (),
+            path: Optional[str] = None,
+    ):
+        if embedder not in EMBEDDERS:
+            raise ValueError(f"未知的嵌入: {embedder}，可用的嵌入：{sorted(EMBEDDERS)}")
+        self.embed = EMBEDDERS[embedder](dim)
+        self.dim = dim
+        self.max_entries = max_entries
+        self.min_similarity = min_similarity
+        self.default_max_age = default_max_age
+        self.freshness = [(name, re.compile(rule["pattern"], re.IGNORECASE), rule["max_age"])
+                          for name, rule in (freshness or {}).items()]
+        self._entity_pattern = entity_pattern(places)
+        self._lock = threading.Lock()
+        self._queries: List[Optional[str]] = [None] * max_entries
+        self._entities: List[Optional[frozenset]] = [None] * max_entries
+        self._created = np.zeros(max_entries, dtype=np.float64)
+        self._payloads: List[Any] = [None] * max_entries
+        self._store = _EntryStore(path, max_entries, dim) if path else None
+        self._vectors = self._store.vectors if self._store is not None else np.zeros((max_entries, dim), np.float32)
+        self._size = 0
+        self._next = 0
+        if self._store is not None:
+            self._load()
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+
+    @classmethod
+    def from_config(cls) -> "SearchIndex":
+        options = dict(Config.SEARCH_INDEX)
+        options.pop("enabled", None)
+        return cls(**options)
+
+    def _load(self) -> None:
+        entries = sorted(self._store.entries(), key=lambda entry: entry[2])
+        for slot, query, created_at in entries:
+            self._queries[slot] = query
+            self._entities[slot] = self.entities(query)
+            self._created[slot] = created_at
+        self._size = len(entries)
+        # 下一次写入覆盖最早的一条
+        self._next = (entries[-1][0] + 1) % self.max_entries if entries else 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "stale": self.stale, "size": self._size}
+
+    def entities(self, query: str) -> frozenset:
+        """
+        查询中的数字、日期与地名，复用结果前必须与已有查询完全相同。
+        """
+        return frozenset(self._entity_pattern.findall(query))
+
+    def max_age(self, query: str) -> float:
+        for _, pattern, max_age in self.freshness:
+            if pattern.search(query):
+                return max_age
+        return self.default_max_age
+
+    def add(self, query: str, payload: Any, created_at: Optional[float] = None) -> None:
+        self.extend([query], [payload], None if created_at is None else [created_at])
+
+    def extend(self, queries: Sequence[str], payloads: Sequence[Any],
+               created_at: Optional[Sequence[float]] = None) -> None:
+        """
+        批量写入搜索结果，payload 为 web-search-pro 的原始响应。
+        """
+        queries = [normalize_query(query) for query in queries]
+        vectors = self.embed(queries)
+        created_at = list(created_at) if created_at is not None else [time.time()] * len(queries)
+        with self._lock:
+            slots = []
+            for vector, query, payload, created in zip(vectors, queries, payloads, created_at):
+                slot = self._next
+                self._vectors[slot] = vector
+                self._queries[slot] = query
+                self._entities[slot] = self.entities(query)
+                self._created[slot] = created
+                self._payloads[slot] = None if self._store is not None else payload
+                slots.append(slot)
+                self._next = (slot + 1) % self.max_entries
+                self._size = min(self._size + 1, self.max_entries)
+            if self._store is not None:
+                self._store.put(slots, queries, created_at, payloads)
+
+    def _match(self, normalized: Sequence[str], vectors: np.ndarray, now: float) -> List[List[Tuple[IndexHit, bool]]]:
+        # 调用方持有 self._lock。一次矩阵乘法算出全部相似度，只对超过阈值的少数候选比较实体、判断新鲜度并排序
+        size = self._size
+        if size == 0:
+            return [[] for _ in normalized]
+        scores = vectors @ self._vectors[:size].T
+        results = []
+        for row, query in enumerate(normalized):
+            slots = np.flatnonzero(scores[row] >= self.min_similarity)
+            slots = slots[np.argsort(-scores[row, slots], kind="stable")]
+            max_age = self.max_age(query)
+            entities = self.entities(query)
+            matches = []
+            for slot in slots.tolist():
+                if self._entities[slot] != entities:
+                    continue
+                age = now - float(self._created[slot])
+                matches.append((IndexHit(self._queries[slot], float(scores[row, slot]), age, slot), age <= max_age))
+            results.append(matches)
+        return results
+
+    def search(self, queries: Sequence[str], k: int = 1, now: Optional[float] = None) -> List[List[IndexHit]]:
+        """
+        批量检索：每个查询返回至多 k 条相似度不低于 min_similarity、且按该查询的类型仍然新鲜的结果，按相似度降序。
+        """
+        now = time.time() if now is None else now
+        normalized = [normalize_query(query) for query in queries]
+        vectors = self.embed(normalized)
+        with self._lock:
+            results = self._match(normalized, vectors, now)
+        return [[hit for hit, fresh in matches if fresh][:k] for matches in results]
+
+    def lookup(self, query: str) -> Optional[Any]:
+        """
+        返回最相似的新鲜结果的原始响应，没有时返回 None；只有过期的相似结果时计为 stale。
+        """
+        normalized = [normalize_query(query)]
+        vectors = self.embed(normalized)
+        with self._lock:
+            matches = self._match(normalized, vectors, time.time())[0]
+            hits = [hit for hit, fresh in matches if fresh]
+            if not hits:
+                if matches:
+                    self.stale += 1
+                else:
+                    self.misses += 1
+                return None
+            hit = hits[0]
+            self.hits += 1
+            # 选中槽位与读取结果在同一次持有锁期间完成，并发的 extend 不会在这之间覆盖这个槽位
+            if self._store is not None:
+                payload = self._store.payload(hit.slot)
+            else:
+                payload = self._payloads[hit.slot]
+        logger.debug("索引命中: %s -> %s（相似度 %.3f，%.0f 秒前）", query, hit.query, hit.score, hit.age)
+        return payload
+
+    def close(self) -> None:
+        if self._store is not None:
+            self._store.close()
+
+
+_index: Optional[SearchIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_search_index() -> Optional[SearchIndex]:
+    """
+    返回进程内共享的 SearchIndex；Config.SEARCH_INDEX["enabled"] 为 False 时返回 None。
+    """
+    global _index
+    if not Config.SEARCH_INDEX["enabled"]:
+        return None
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = SearchIndex.from_config()
+    return _index
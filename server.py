@@ -0,0 +1,400 @@
+import argparse
+import asyncio
+import json
+import signal
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
+
+import metrics
+from config import Config
+from tracing import get_logger
+from worker_pool import WorkerPool
+
+logger = get_logger("server")
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable",
+            504: "Gateway Timeout"}
+_MAX_BODY = 1 << 20
+# 请求体中 chat_history 每条消息的 role -> 消息类型
+_ROLES = {"user": HumanMessage, "human": HumanMessage, "assistant": AIMessage, "ai": AIMessage,
+          "system": SystemMessage}
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def parse_chat_history(items: Any) -> List[BaseMessage]:
+    """
+    校验请求体中的 chat_history（[{"role": "user" | "assistant" | "system", "content": "..."}]）并转换为消息列表。
+    """
+    if not isinstance(items, list):
+        raise HTTPError(400, "chat_history 必须是数组")
+    messages = []
+    for i, item in enumerate(items):
+        if not isinstance(item, dict) or item.get("role") not in _ROLES or not isinstance(item.get("content"), str):
+            raise HTTPError(400, f"chat_history[{i}] 需要 role（user、assistant 或 system）与字符串 content")
+        messages.append(_ROLES[item["role"]](content=item["content"]))
+    return messages
+
+
+def warm_up():
+    """
+    启动时构建编译好的图以及模型、Agent、工具与搜索客户端，第一个请求不再承担导入与构建的开销。
+    """
+    import graphs
+
+    return graphs.warm_up()
+
+
+class WorkflowServer:
+    """
+    基于 asyncio 的 HTTP/SSE 服务，所有请求共享同一个编译好的图；app 也可以是 WorkerPool，图在工作进程中执行。
+
+    - POST /invoke：{"input": ..., "chat_history": [{"role": ..., "content": ...}]}，返回 {"output": ...}
+    - POST /stream：同样的请求体，以 SSE 逐个推送 {"node": ..., "token": ...}，最后推送 event: end；
+      执行出错或超时时先推送 event: error
+
+    图带有检查点时请求体改为 {"input": ..., "thread_id": ...}，历史保存在服务端；
+    未提供 thread_id 时新建会话，/invoke 在响应中、/stream 在 X-Thread-Id 头中返回会话 ID。
+    - GET /ready：就绪探针，启动完成且未在关闭时返回 200
+    - GET /metrics：Prometheus 文本格式的运行指标
+
+    同时执行的图不超过 max_concurrency 个，其余请求排队；排队数达到 queue_size 时立即返回 503。
+    shutdown() 停止接收新连接并等待已接收的请求完成，最多等待 drain_timeout 秒。
+    """
+
+    def __init__(
+            self,
+            app,
+            host: str = "127.0.0.1",
+            port: int = 8000,
+            max_concurrency: int = 16,
+            queue_size: int = 64,
+            request_timeout: float = 120,
+            drain_timeout: float = 30,
+    ):
+        self.app = app
+        self.pooled = isinstance(app, WorkerPool)
+        self.host = host
+        self.port = port
+        self.max_concurrency = max_concurrency
+        self.queue_size = queue_size
+        self.request_timeout = request_timeout
+        self.drain_timeout = drain_timeout
+        self.running = 0
+        self.queued = 0
+        self.rejected = 0
+        self.draining = False
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._server: Optional[asyncio.base_events.Server] = None
+        self._requests: set = set()
+        self._writers: set = set()
+        self._idle: Optional[asyncio.Event] = None
+
+    @classmethod
+    def from_config(cls, app, **overrides) -> "WorkflowServer":
+        return cls(app, **{**Config.SERVER, **overrides})
+
+    @property
+    def ready(self) -> bool:
+        return self._server is not None and not self.draining
+
+    async def start(self) -> None:
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info("服务已启动: http://%s:%s", self.host, self.port)
+
+    async def shutdown(self) -> None:
+        """
+        优雅关闭：就绪探针立即变为 503，不再接收新连接，等待进行中的请求完成后退出。
+        """
+        if self.draining:
+            return
+        self.draining = True
+        self._server.close()
+        try:
+            await asyncio.wait_for(self._idle.wait(), self.drain_timeout)
+        except asyncio.TimeoutError:
+            logger.warning("等待进行中的请求超时，仍有 %s 个未完成", len(self._requests))
+            for task in list(self._requests):
+                task.cancel()
+        # 关闭空闲的 keep-alive 连接
+        for writer in list(self._writers):
+            writer.close()
+        await self._server.wait_closed()
+        if self.pooled:
+            await asyncio.get_running_loop().run_in_executor(None, self.app.close, self.drain_timeout)
+
+    def stats(self) -> Dict[str, int]:
+        return {"running": self.running, "queued": self.queued, "rejected": self.rejected}
+
+    # --- HTTP ---
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Optional[Tuple[str, str, dict, bytes]]:
+        request_line = await reader.readline()
+        if not request_line.strip():
+            return None
+        method, target, _ = request_line.decode("latin-1").split(" ", 2)
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        length = int(headers.get("content-length", 0))
+        if length > _MAX_BODY:
+            raise HTTPError(413, "请求体过大")
+        body = await reader.readexactly(length) if length else b""
+        return method, target.split("?", 1)[0], headers, body
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self._writers.add(writer)
+        try:
+            while not self.draining:
+                try:
+                    request = await self._read_request(reader)
+                except HTTPError as e:
+                    await self._send_json(writer, e.status, {"error": str(e)}, keep_alive=False)
+                    return
+                except (ValueError, asyncio.IncompleteReadError):
+                    return
+                if request is None:
+                    return
+                method, path, headers, body = request
+                keep_alive = headers.get("connection", "").lower() != "close" and not self.draining
+                task = asyncio.current_task()
+                self._requests.add(task)
+                self._idle.clear()
+                try:
+                    keep_alive = await self._dispatch(writer, method, path, body, keep_alive)
+                finally:
+                    self._requests.discard(task)
+                    if not self._requests:
+                        self._idle.set()
+                if not keep_alive:
+                    return
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        except Exception:
+            logger.exception("处理连接时出错")
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+    async def _dispatch(self, writer: asyncio.StreamWriter, method: str, path: str, body: bytes,
+                        keep_alive: bool) -> bool:
+        try:
+            if path == "/ready":
+                status = 200 if self.ready else 503
+                await self._send_json(writer, status, {"ready": self.ready, **self.stats()}, keep_alive)
+                return keep_alive
+            if path == "/metrics":
+                await self._send(writer, 200, metrics.registry.render().encode("utf-8"),
+                                 "text/plain; version=0.0.4; charset=utf-8", keep_alive)
+                return keep_alive
+            if path not in ("/invoke", "/stream"):
+                raise HTTPError(404, "未知路径")
+            if method != "POST":
+                raise HTTPError(405, "只支持 POST")
+            inputs, thread_id = self._parse_inputs(body)
+            async with self._admit():
+                config = None
+                if thread_id is not None:
+                    from workflow import aturn_inputs, session_config
+
+                    config = session_config(thread_id)
+                    # 工作进程池在执行前自行读取会话状态
+                    if not self.pooled:
+                        inputs = await aturn_inputs(self.app, config, inputs["input"])
+                if path == "/invoke":
+                    from graphs import final_output
+
+                    result = await asyncio.wait_for(self.app.ainvoke(inputs, config), self.request_timeout)
+                    payload = {"output": final_output(result)}
+                    if thread_id is not None:
+                        payload["thread_id"] = thread_id
+                    await self._send_json(writer, 200, payload, keep_alive)
+                    return keep_alive
+                await self._stream(writer, inputs, config, thread_id)
+                return False
+        except HTTPError as e:
+            headers = {"Retry-After": "1"} if e.status == 503 else None
+            await self._send_json(writer, e.status, {"error": str(e)}, keep_alive, headers)
+            return keep_alive
+        except asyncio.TimeoutError:
+            await self._send_json(writer, 504, {"error": "执行超时"}, keep_alive)
+            return keep_alive
+        except ConnectionError:
+            raise
+        except Exception:
+            # 模型、路由或检查点的异常不会断开连接，客户端收到 500
+            logger.exception("执行 %s 时出错", path)
+            await self._send_json(writer, 500, {"error": "服务内部错误"}, keep_alive)
+            return keep_alive
+
+    def _parse_inputs(self, body: bytes) -> Tuple[dict, Optional[str]]:
+        try:
+            payload = json.loads(body or b"{}")
+        except ValueError:
+            raise HTTPError(400, "请求体不是合法的 JSON")
+        if not isinstance(payload, dict) or not isinstance(payload.get("input"), str):
+            raise HTTPError(400, "缺少 input 字段")
+        thread_id = None
+        if (self.app.sessions if self.pooled else self.app.checkpointer is not None):
+            thread_id = str(payload.get("thread_id") or uuid.uuid4().hex)
+        inputs = {
+            "input": payload["input"],
+            "chat_history": parse_chat_history(payload.get("chat_history", [])),
+            "agent_outcome": None,
+            "intermediate_steps": [],
+        }
+        return inputs, thread_id
+
+    def _admit(self):
+        """
+        背压：正在执行与排队的请求总数超过上限时拒绝，否则排队等待执行名额。
+        """
+        if self.draining:
+            raise HTTPError(503, "服务正在关闭")
+        if self.queued >= self.queue_size and self._slots.locked():
+            self.rejected += 1
+            raise HTTPError(503, "请求过多，请稍后重试")
+        return _Admission(self)
+
+    async def _stream(self, writer: asyncio.StreamWriter, inputs: Optional[dict], config: Optional[dict],
+                      thread_id: Optional[str]) -> None:
+        if self.pooled:
+            tokens = self.app.astream_tokens(inputs, config)
+        else:
+            from workflow import astream_tokens
+
+            tokens = astream_tokens(self.app, inputs, config)
+
+        async def pump():
+            async for node, token in tokens:
+                event = json.dumps({"node": node, "token": token}, ensure_ascii=False)
+                writer.write(f"data: {event}\n\n".encode("utf-8"))
+                await writer.drain()
+
+        session = f"X-Thread-Id: {thread_id}\r\n" if thread_id is not None else ""
+        writer.write(("HTTP/1.1 200 OK\r\nContent-Type: text/event-stream; charset=utf-8\r\n"
+                      f"Cache-Control: no-cache\r\nConnection: close\r\n{session}\r\n").encode("latin-1"))
+        try:
+            await asyncio.wait_for(pump(), self.request_timeout)
+        except asyncio.TimeoutError:
+            writer.write("event: error\ndata: {\"error\": \"执行超时\"}\n\n".encode("utf-8"))
+        except ConnectionError:
+            raise
+        except Exception:
+            # 响应头已经发出，错误以 SSE 事件告知客户端
+            logger.exception("流式执行时出错")
+            writer.write("event: error\ndata: {\"error\": \"服务内部错误\"}\n\n".encode("utf-8"))
+        writer.write(b"event: end\ndata: {}\n\n")
+        await writer.drain()
+
+    async def _send_json(self, writer: asyncio.StreamWriter, status: int, payload: dict, keep_alive: bool,
+                         headers: Optional[dict] = None) -> None:
+        await self._send(writer, status, json.dumps(payload, ensure_ascii=False).encode("utf-8"),
+                         "application/json; charset=utf-8", keep_alive, headers)
+
+    async def _send(self, writer: asyncio.StreamWriter, status: int, body: bytes, content_type: str,
+                    keep_alive: bool, headers: Optional[dict] = None) -> None:
+        lines = [
+            f"HTTP/1.1 {status} {_REASONS.get(status, '')}",
+            f"Content-Type: {content_type}",
+            f"Content-Length: {len(body)}",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}",
+            *(f"{name}: {value}" for name, value in (headers or {}).items()),
+        ]
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+
+
+class _Admission:
+    """
+    排队等待执行名额，并维护 queued/running 计数。
+    """
+
+    def __init__(self, server: WorkflowServer):
+        self.server = server
+
+    async def __aenter__(self):
+        self.server.queued += 1
+        try:
+            await self.server._slots.acquire()
+        finally:
+            self.server.queued -= 1
+        self.server.running += 1
+
+    async def __aexit__(self, *exc):
+        self.server.running -= 1
+        self.server._slots.release()
+
+
+async def serve(server: WorkflowServer) -> None:
+    """
+    启动服务并在收到 SIGINT/SIGTERM 时优雅关闭。
+    """
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    await server.start()
+    print(f"服务已启动: http://{server.host}:{server.port}", flush=True)
+    await stop.wait()
+    print("正在关闭，等待进行中的请求完成……", flush=True)
+    await server.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="以 HTTP/SSE 服务的形式运行工作流")
+    parser.add_argument("--host", default=Config.SERVER["host"])
+    parser.add_argument("--port", type=int, default=Config.SERVER["port"])
+    parser.add_argument("--max-concurrency", type=int, default=Config.SERVER["max_concurrency"])
+    parser.add_argument("--queue-size", type=int, default=Config.SERVER["queue_size"])
+    parser.add_argument("--sessions", action="store_true", default=Config.CHECKPOINT["enabled"],
+                        help="以 thread_id 区分会话，检查点与对话历史保存在 Config.CHECKPOINT 的 SQLite 中")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="大于 0 时在这么多个工作进程中执行图（见 Config.WORKER_POOL），0 为在服务进程内执行")
+    parser.add_argument("--stub", action="store_true", help="使用本地替身模型与替身搜索服务，离线运行")
+    args = parser.parse_args()
+    Config.CHECKPOINT["enabled"] = args.sessions
+
+    initializer, initargs = None, ()
+    if args.stub:
+        from benchmarks.stub_servers import StubSearchServer
+        from benchmarks.stubs import install_stubs
+
+        # 工作进程中同样安装替身，限速配额与单进程时相同
+        initializer, initargs = install_stubs, (StubSearchServer(latency=0.05).start().url, 0.05, True)
+        if not args.workers:
+            install_stubs(*initargs)
+
+    if args.workers:
+        app = WorkerPool.from_config(workers=args.workers, initializer=initializer, initargs=initargs).start()
+    else:
+        app = warm_up()
+    server = WorkflowServer.from_config(app, host=args.host, port=args.port,
+                                        max_concurrency=args.max_concurrency, queue_size=args.queue_size)
+
+    async def run():
+        # 同步节点在默认线程池中运行，线程数需要跟上并发度
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=args.max_concurrency * 2))
+        await serve(server)
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from benchmarks.stub_servers import STUB_API_KEY, StubSearchServer
+
+os.environ.setdefault("ZHIPUAI_API_KEY", STUB_API_KEY)
+
+from config import Config
+
+
+@pytest.fixture(autouse=True)
+def offline_config(monkeypatch):
+    """
+    每个测试都在本地运行：关闭客户端限速与两级缓存，测试中对 Config 的修改在结束后还原。
+    """
+    for name in ("RATE_LIMITS", "LLM_CACHE", "SEARCH_CACHE", "SEARCH_INDEX", "BUDGET", "CHECKPOINT", "ROUTING",
+                 "PREFETCH", "BEAUTIFY", "SCRATCHPAD", "TRACING"):
+        monkeypatch.setattr(Config, name, dict(getattr(Config, name)))
+    Config.RATE_LIMITS = {}
+    Config.LLM_CACHE["enabled"] = False
+    Config.SEARCH_CACHE["enabled"] = False
+
+
+@pytest.fixture
+def search_server():
+    from benchmarks.stubs import use_stub_search
+
+    server = StubSearchServer().start()
+    use_stub_search(server.url)
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def stub_model():
+    """
+    返回一个安装替身模型的函数，参数与 StubChatModel 相同。
+    """
+    from benchmarks.stubs import StubChatModel, install_stub_llm
+
+    def install(**options):
+        model = StubChatModel(**{"latency": 0, **options})
+        install_stub_llm(model)
+        return model
+
+    return install
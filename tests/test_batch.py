@@ -0,0 +1,59 @@
+import asyncio
+import json
+
+from langchain_core.agents import AgentFinish
+
+from batch import run_batch
+
+
+class FlakyApp:
+    """
+    对指定的输入抛出异常，其余输入原样返回。
+    """
+
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.inputs = []
+
+    async def ainvoke(self, inputs):
+        self.inputs.append(inputs["input"])
+        if inputs["input"] in self.failing:
+            raise RuntimeError("GLM 返回了错误")
+        return {"agent_outcome": AgentFinish({"output": inputs["input"]}, "")}
+
+
+def _records(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_rerun_replaces_failed_rows(tmp_path):
+    input_path, output_path = tmp_path / "questions.jsonl", tmp_path / "results.jsonl"
+    input_path.write_text("".join(json.dumps({"id": key, "input": key}) + "\n" for key in "abc"), encoding="utf-8")
+
+    stats = asyncio.run(run_batch(FlakyApp(failing="bc"), str(input_path), str(output_path)))
+    assert (stats["succeeded"], stats["failed"]) == (1, 2)
+
+    # 第二次 b 仍然失败，c 成功；末尾还有一行崩溃时只写了一半的记录
+    with open(output_path, "a", encoding="utf-8") as f:
+        f.write('{"id": "c", "inp')
+    app = FlakyApp(failing="b")
+    stats = asyncio.run(run_batch(app, str(input_path), str(output_path)))
+    assert sorted(app.inputs) == ["b", "c"]
+    assert (stats["skipped"], stats["succeeded"], stats["failed"]) == (1, 1, 1)
+
+    app = FlakyApp()
+    asyncio.run(run_batch(app, str(input_path), str(output_path)))
+    assert app.inputs == ["b"]
+    records = _records(output_path)
+    assert sorted(record["id"] for record in records) == ["a", "b", "c"]
+    assert all("error" not in record for record in records)
+
+
+def test_failed_rows_for_removed_inputs_are_kept(tmp_path):
+    input_path, output_path = tmp_path / "questions.jsonl", tmp_path / "results.jsonl"
+    input_path.write_text(json.dumps({"id": "a", "input": "a"}) + "\n", encoding="utf-8")
+    output_path.write_text(json.dumps({"id": "z", "input": "z", "error": "RuntimeError: x"}) + "\n", encoding="utf-8")
+
+    asyncio.run(run_batch(FlakyApp(), str(input_path), str(output_path)))
+    assert [record["id"] for record in _records(output_path)] == ["z", "a"]
@@ -0,0 +1,30 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import beautify_pipeline
+
+
+def test_concurrent_first_use_creates_one_executor(monkeypatch):
+    created = []
+
+    class SlowExecutor(ThreadPoolExecutor):
+        def __init__(self, *args, **kwargs):
+            # 放大“检查为空”与“赋值”之间的窗口
+            time.sleep(0.05)
+            super().__init__(*args, **kwargs)
+            created.append(self)
+
+    monkeypatch.setattr(beautify_pipeline, "_executor", None)
+    monkeypatch.setattr(beautify_pipeline, "ThreadPoolExecutor", SlowExecutor)
+    executors = []
+    threads = [threading.Thread(target=lambda: executors.append(beautify_pipeline._get_executor()))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(created) == 1
+    assert all(executor is created[0] for executor in executors)
+    created[0].shutdown()
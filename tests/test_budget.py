@@ -0,0 +1,103 @@
+import pytest
+from langchain_core.agents import AgentFinish
+
+from budget import EXHAUSTED, Budget, best_answer
+from config import Config
+from scratchpad import ScratchStep
+
+QUESTION = "杭州今天什么天气？"
+
+
+def _run(config=None):
+    from workflow import create_workflow
+
+    app = create_workflow(False)
+    nodes = []
+    state = {}
+    for update in app.stream({"input": QUESTION, "chat_history": [], "intermediate_steps": []}, config,
+                             stream_mode="updates"):
+        [(node, delta)] = update.items()
+        nodes.append(node)
+        state[node] = delta
+    return nodes, state["beautify"]["agent_outcome"]
+
+
+@pytest.mark.parametrize("usage, reason", [
+    ({}, None),
+    ({"iterations": 5}, "iterations"),
+    ({"tokens": 20000}, "tokens"),
+    ({"seconds": 60.5}, "seconds"),
+    ({"duplicates": 2}, "duplicates"),
+    # 同时用尽时按 RESOURCES 的顺序取第一项
+    ({"seconds": 61, "tokens": 20001}, "tokens"),
+])
+def test_first_exhausted_resource(usage, reason):
+    assert Budget().exhausted(usage) == reason
+
+
+def test_none_disables_a_limit():
+    assert Budget(max_iterations=None).exhausted({"iterations": 10 ** 6}) is None
+
+
+def test_per_request_override():
+    Config.BUDGET.update(max_iterations=5, max_tokens=100)
+    budget = Budget.from_config({"configurable": {"budget": {"max_iterations": 1}}})
+    assert budget.limits["iterations"] == 1
+    assert budget.limits["tokens"] == 100
+    assert Budget.from_config({}).limits["iterations"] == 5
+
+
+def test_best_answer_uses_recent_distinct_observations():
+    steps = [ScratchStep(turn, "web_search", {"query": ref}, f"c{turn}", ref)
+             for turn, ref in enumerate(["r1", "r2", "r2", "r3", "r4"])]
+    observations = {ref: f"结果{ref}" for ref in ("r1", "r2", "r3", "r4")}
+    answer = best_answer("iterations", steps, observations)
+    assert answer.startswith("已达到工具调用轮数上限")
+    assert "结果r1" not in answer
+    assert answer.index("结果r2") < answer.index("结果r3") < answer.index("结果r4")
+    assert best_answer("tokens", [], {}) == "已达到token 用量上限，暂时无法给出完整的回答。"
+
+
+@pytest.mark.parametrize("limits, reason, loops", [
+    ({"max_iterations": 2}, "iterations", 2),
+    ({"max_tokens": 1}, "tokens", 0),
+    ({"max_duplicate_queries": 1}, "duplicates", 2),
+])
+def test_exhausted_budget_routes_to_beautify(search_server, stub_model, limits, reason, loops):
+    Config.BUDGET.update({"max_iterations": 10, "max_tokens": 10 ** 6, "max_seconds": 60,
+                          "max_duplicate_queries": 100, **limits})
+    # 模型每一轮都请求同一个查询，只会因为预算而停止
+    stub_model(tool_calls=1, tool_rounds=100)
+    nodes, outcome = _run()
+
+    assert nodes == ["agent", "action"] * loops + ["agent", "beautify"]
+    assert isinstance(outcome, AgentFinish)
+    assert outcome.return_values[EXHAUSTED] == reason
+    if loops:
+        # 用已经检索到的结果作答，重复的查询不再联网
+        assert "以下是目前检索到的信息" in outcome.return_values["output"]
+        assert QUESTION in outcome.return_values["output"]
+        assert search_server.requests == 1
+    else:
+        assert "暂时无法给出完整的回答" in outcome.return_values["output"]
+        assert search_server.requests == 0
+
+
+def test_seconds_budget(search_server, stub_model):
+    Config.BUDGET.update(max_iterations=10, max_tokens=10 ** 6, max_seconds=0.1, max_duplicate_queries=100)
+    search_server.latency = 0.15
+    stub_model(tool_calls=1, tool_rounds=100)
+    nodes, outcome = _run()
+
+    assert nodes == ["agent", "action", "agent", "beautify"]
+    assert outcome.return_values[EXHAUSTED] == "seconds"
+    assert QUESTION in outcome.return_values["output"]
+
+
+def test_per_request_budget_override_in_workflow(search_server, stub_model):
+    Config.BUDGET.update(max_iterations=10, max_tokens=10 ** 6, max_seconds=60, max_duplicate_queries=100)
+    stub_model(tool_calls=1, tool_rounds=100)
+    nodes, outcome = _run({"configurable": {"budget": {"max_iterations": 1}}})
+
+    assert nodes == ["agent", "action", "agent", "beautify"]
+    assert outcome.return_values[EXHAUSTED] == "iterations"
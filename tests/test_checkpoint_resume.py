@@ -0,0 +1,36 @@
+import pytest
+from langchain_core.agents import AgentFinish
+
+from config import Config
+from scratchpad import ScratchStep
+
+QUESTION = "杭州今天什么天气？"
+
+
+@pytest.mark.parametrize("serializer", ["jsonplus", "codec"])
+@pytest.mark.parametrize("interrupted_after", ["agent", "action"])
+def test_resume_from_sqlite_checkpoint(tmp_path, search_server, stub_model, serializer, interrupted_after):
+    from checkpoints import open_checkpointer
+    from workflow import create_workflow, session_config, turn_inputs
+
+    Config.BUDGET.update(max_duplicate_queries=100)
+    stub_model(tool_calls=2, tool_rounds=2)
+    path = str(tmp_path / "checkpoints.sqlite")
+    config = session_config("resume")
+
+    app = create_workflow(open_checkpointer(path, serializer))
+    app.invoke(turn_inputs(app, config, QUESTION), config, interrupt_after=[interrupted_after])
+    searches = search_server.requests
+
+    # 用新的连接重新打开检查点，模拟进程重启后继续执行
+    resumed = create_workflow(open_checkpointer(path, serializer))
+    assert resumed.get_state(config).next
+    assert turn_inputs(resumed, config, QUESTION) is None
+    state = resumed.invoke(None, config)
+
+    assert isinstance(state["agent_outcome"], AgentFinish)
+    assert [type(step) for step in state["intermediate_steps"]] == [ScratchStep] * 4
+    assert [step.turn for step in state["intermediate_steps"]] == [0, 0, 1, 1]
+    # 中断前已经完成的搜索不会重新执行；第二轮的查询与第一轮相同，直接复用结果
+    expected = 2 if interrupted_after == "agent" else 0
+    assert search_server.requests - searches == expected
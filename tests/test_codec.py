@@ -0,0 +1,77 @@
+import logging
+
+import pytest
+from langchain_core.agents import AgentAction
+
+import tracing
+from codec import StateDecoder, StateEncoder, read_journal
+
+TEXT = "杭州今天晴，气温 12 到 20 度。" * 4
+
+
+def test_failed_encode_does_not_desync_the_table():
+    encoder, decoder = StateEncoder(blob_min_chars=16), StateDecoder()
+    assert decoder.decode(encoder.encode({"step": AgentAction("web_search", "杭州", "")})) == {
+        "step": AgentAction("web_search", "杭州", "")}
+
+    # 新的工具名与搜索原文已经登记，随后遇到无法编码的对象，这一帧不会写出
+    with pytest.raises(TypeError):
+        encoder.encode({"step": AgentAction("news_search", "杭州", ""), "observation": TEXT, "bad": object()})
+
+    value = {"step": AgentAction("news_search", "杭州", ""), "observation": TEXT}
+    assert decoder.decode(encoder.encode(value)) == value
+    assert decoder.decode(encoder.encode(value)) == value
+
+
+def test_failed_first_encode_keeps_reset_flag():
+    encoder = StateEncoder()
+    with pytest.raises(TypeError):
+        encoder.encode({"bad": object()})
+    frame = encoder.encode({"ok": 1})
+    assert StateDecoder().decode(frame) == {"ok": 1}
+
+
+def test_journal_errors_do_not_fail_the_node(tmp_path, caplog):
+    path = str(tmp_path / "journal.bin")
+    tracing.configure({"enabled": False, "journal": path})
+
+    @tracing.traced("agent")
+    def node(data):
+        return data
+
+    try:
+        with caplog.at_level(logging.ERROR, logger="langraph_glm"):
+            assert node({"bad": object()})["bad"] is not None
+        assert node({"observation": TEXT}) == {"observation": TEXT}
+    finally:
+        tracing.configure({"enabled": False, "journal": None})
+
+    assert "写入状态日志失败" in caplog.text
+    assert [update for _, _, update in read_journal(path)] == [{"observation": TEXT}]
+
+
+def test_journal_writes_repeated_observations_once(tmp_path):
+    from codec import StateJournal
+
+    path = tmp_path / "journal.bin"
+    journal = StateJournal(str(path))
+    sizes = []
+    for i in range(3):
+        journal.append("action", {"observations": {f"r{i}": TEXT * 10}})
+        sizes.append(path.stat().st_size)
+    journal.close()
+
+    # 第一帧写出原文，之后只写 12 字节的摘要
+    assert sizes[0] > len((TEXT * 10).encode("utf-8"))
+    assert sizes[2] - sizes[1] < 100
+    assert [update for _, _, update in read_journal(str(path))] == [
+        {"observations": {f"r{i}": TEXT * 10}} for i in range(3)]
+
+
+def test_read_journal_accepts_list_records(tmp_path):
+    import struct
+
+    path = tmp_path / "journal.bin"
+    frame = StateEncoder().encode([1.0, "agent", {"x": 1}])
+    path.write_bytes(struct.pack(">I", len(frame)) + frame)
+    assert list(read_journal(str(path))) == [(1.0, "agent", {"x": 1})]
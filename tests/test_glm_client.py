@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+
+import glm_client
+from benchmarks.stub_servers import STUB_API_KEY, StubGLMServer
+from config import Config
+
+
+@pytest.fixture
+def glm():
+    server = StubGLMServer(tool_calls=2).start()
+    yield server
+    server.stop()
+
+
+def _model(glm, **options):
+    from agents import RateLimitedChatZhipuAI
+
+    return RateLimitedChatZhipuAI(model="glm-4-flash", api_key=STUB_API_KEY, api_base=glm.url, **options)
+
+
+def test_payload_clamps_sampling_parameters():
+    messages = [SystemMessage("系统"), HumanMessage("问题"), AIMessage("回答"), ToolMessage("结果", tool_call_id="c1")]
+    payload = glm_client.chat_payload("glm-4-flash", 1.0, None, messages, None, False, top_p=0)
+    assert payload["temperature"] == 0.99
+    assert payload["top_p"] == 0.01
+    assert "max_tokens" not in payload
+    assert [m["role"] for m in payload["messages"]] == ["system", "user", "assistant", "tool"]
+    assert payload["messages"][3]["tool_call_id"] == "c1"
+
+
+def test_auth_headers_reject_malformed_key():
+    with pytest.raises(ValueError):
+        glm_client.auth_headers("no-secret")
+
+
+def test_invoke_and_stream_through_shared_client(glm):
+    from tools import get_tools
+
+    Config.RATE_LIMITS = {"glm": {"rate": 100, "burst": 10, "concurrency": 2}}
+    model = _model(glm)
+    with_tools = model.bind_tools(get_tools())
+
+    message = with_tools.invoke([HumanMessage("杭州今天什么天气？")])
+    assert [call["name"] for call in message.tool_calls] == ["web_search", "web_search"]
+    assert message.tool_calls[0]["args"] == {"query": "杭州今天什么天气？"}
+
+    chunks = list(model.stream([HumanMessage("润色：\n你好世界")]))
+    assert "".join(chunk.content for chunk in chunks) == "你好世界"
+    assert chunks[-1].response_metadata["finish_reason"] == "stop"
+
+    async def ainvoke():
+        return await with_tools.ainvoke([HumanMessage("杭州今天什么天气？")])
+
+    assert len(asyncio.run(ainvoke()).tool_calls) == 2
+    assert glm.requests == 3
@@ -0,0 +1,16 @@
+import llm_cache
+from config import Config
+
+
+def test_sampling_temperature_bypasses_cache_by_default(monkeypatch):
+    monkeypatch.setattr(llm_cache, "_cache", None)
+    Config.LLM_CACHE["enabled"] = True
+    assert Config.LLM_CACHE["deterministic_only"]
+    assert llm_cache.get_llm_cache("glm-4-flash", Config.MODEL_CONFIG["temperature"]) is None
+    assert llm_cache.get_llm_cache("glm-4-flash", 0) is not None
+
+
+def test_sampling_temperature_can_opt_in(monkeypatch):
+    monkeypatch.setattr(llm_cache, "_cache", None)
+    Config.LLM_CACHE.update(enabled=True, deterministic_only=False)
+    assert llm_cache.get_llm_cache("glm-4-flash", 0.8) is not None
@@ -0,0 +1,80 @@
+import pytest
+from langchain.agents.output_parsers.tools import ToolAgentAction
+
+import prefetch
+from config import Config
+from scratchpad import ScratchStep
+
+QUESTION = "杭州今天什么天气？"
+
+
+@pytest.fixture
+def prefetcher(monkeypatch, search_server):
+    monkeypatch.setattr(prefetch, "_prefetcher", None)
+    Config.PREFETCH["enabled"] = True
+    yield prefetch.get_prefetcher()
+    prefetch._prefetcher._executor.shutdown()
+
+
+def _action(query, tool_call_id="call_0"):
+    return ToolAgentAction(tool="web_search", tool_input={"query": query}, log="", message_log=[],
+                           tool_call_id=tool_call_id)
+
+
+@pytest.mark.parametrize("question, skipped", [
+    ("杭州今天什么天气？", False),
+    ("你好", True),
+    ("帮我润色这段话", True),
+])
+def test_speculation_score(question, skipped):
+    assert (prefetch.speculation_score(question) < 0.5) is skipped
+
+
+def test_claim_and_take(prefetcher, search_server):
+    speculation = prefetcher.speculate(QUESTION)
+    prefetcher.resolve(speculation, [_action("北京的航班", "call_x"), _action("杭州今天的天气")])
+    assert list(prefetcher._claimed) == ["call_0"]
+
+    assert QUESTION in prefetcher.take("call_0")
+    assert prefetcher.take("call_0") is None
+    assert prefetcher.counts["hit"] == 1
+    assert search_server.requests == 1
+
+
+def test_unmatched_speculation_is_a_miss(prefetcher):
+    speculation = prefetcher.speculate(QUESTION)
+    prefetcher.resolve(speculation, [_action("北京的航班")])
+    assert not prefetcher._claimed
+    assert prefetcher.counts["miss"] == 1
+
+
+def test_workflow_takes_the_claimed_result(prefetcher, search_server, stub_model):
+    from workflow import create_workflow
+
+    stub_model(tool_calls=1)
+    create_workflow(False).invoke({"input": QUESTION, "chat_history": [], "intermediate_steps": []})
+    assert prefetcher.counts == {"skipped": 0, "hit": 1, "miss": 0, "failed": 0}
+    assert not prefetcher._claimed
+    assert search_server.requests == 1
+
+
+def test_duplicate_action_discards_its_claim(prefetcher):
+    from workflow import execute_tools
+
+    prefetcher.resolve(prefetcher.speculate(QUESTION), [_action(QUESTION, "call_1")])
+    previous = [ScratchStep(0, "web_search", {"query": QUESTION}, "call_0", "r0")]
+    execute_tools({"input": QUESTION, "agent_outcome": [_action(QUESTION, "call_1")], "intermediate_steps": previous,
+                   "observations": {"r0": "之前的结果"}})
+    assert not prefetcher._claimed
+    assert prefetcher.counts["miss"] == 1
+
+
+def test_exhausted_budget_discards_the_claim(prefetcher, search_server, stub_model):
+    from workflow import create_workflow
+
+    Config.BUDGET["max_tokens"] = 1
+    stub_model(tool_calls=1)
+    state = create_workflow(False).invoke({"input": QUESTION, "chat_history": [], "intermediate_steps": []})
+    assert state["intermediate_steps"] == []
+    assert not prefetcher._claimed
+    assert prefetcher.counts["miss"] == 1 and prefetcher.counts["hit"] == 0
@@ -0,0 +1,62 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from rate_limiter import AdaptiveRateLimiter
+
+
+def test_cancelled_wait_for_slot_does_not_leak_it():
+    limiter = AdaptiveRateLimiter(rate=100, burst=10, concurrency=1)
+
+    async def main():
+        limiter.acquire()
+        waiter = asyncio.create_task(limiter.aslot().__aenter__())
+        await asyncio.sleep(0.05)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        limiter.release()
+        await asyncio.sleep(0.05)
+
+    asyncio.run(main())
+    # 被取消的等待方没有在名额释放后再占用它
+    assert limiter._slots.acquire(blocking=False)
+
+
+def test_cancelled_wait_for_token_releases_slot():
+    limiter = AdaptiveRateLimiter(rate=0.5, burst=1, concurrency=1)
+    limiter.acquire()
+    limiter.release()
+
+    async def main():
+        # 令牌已经用完，下一个令牌要等 2 秒
+        waiter = asyncio.create_task(limiter.aacquire())
+        await asyncio.sleep(0.05)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+    asyncio.run(main())
+    assert limiter._slots.acquire(blocking=False)
+
+
+def test_async_waiters_do_not_hold_threads():
+    limiter = AdaptiveRateLimiter(rate=1000, burst=1000, concurrency=2)
+    threads = threading.active_count()
+    peak = []
+
+    async def worker():
+        async with limiter.aslot():
+            peak.append(threading.active_count())
+            await asyncio.sleep(0.01)
+
+    async def main():
+        await asyncio.gather(*(worker() for _ in range(50)))
+
+    start = time.monotonic()
+    asyncio.run(main())
+    assert max(peak) == threads
+    # 50 个请求、并发 2、每个 10 毫秒
+    assert time.monotonic() - start < 1.0
@@ -0,0 +1,51 @@
+import pytest
+
+from routing import RoutingPolicy, well_formed
+
+LONG_ANSWER = "杭州今天多云，气温十二到二十度。午后有阵雨，出门记得带伞。空气质量良好，适合户外活动。"
+
+
+@pytest.mark.parametrize("question, tool_score, route", [
+    ("你好", 0.25, "direct"),
+    ("帮我翻译这句话", 0.25, "direct"),
+    ("解释一下递归", 0.25, "direct"),
+    # 只有疑问词的问题得分 0.25，正好达到默认阈值
+    ("递归是什么", 0.25, "tools"),
+    ("递归是什么", 0.5, "direct"),
+    ("杭州今天什么天气？", 0.25, "tools"),
+    ("最近的离婚案件", 1.0, "tools"),
+])
+def test_route_question_by_tool_score(question, tool_score, route):
+    assert RoutingPolicy(enabled=True, tool_score=tool_score).route_question(question) == route
+
+
+@pytest.mark.parametrize("text, options, route", [
+    ("好的。", {}, "short"),
+    ("  " + "字" * 40 + "  ", {}, "short"),
+    ("字" * 41, {"min_chars": 40}, "beautify"),
+    (LONG_ANSWER, {}, "well_formed"),
+    (LONG_ANSWER, {"skip_well_formed": False}, "beautify"),
+    (LONG_ANSWER, {"max_sentence_chars": 10}, "beautify"),
+    (LONG_ANSWER, {"min_chars": len(LONG_ANSWER)}, "short"),
+])
+def test_route_output(text, options, route):
+    assert RoutingPolicy(enabled=True, **options).route_output(text) == route
+
+
+@pytest.mark.parametrize("text, expected", [
+    (LONG_ANSWER, True),
+    (LONG_ANSWER.rstrip("。"), False),  # 没有以句末标点结尾
+    ("杭州今天多云。。气温十二到二十度。", False),  # 重复的标点
+    ("杭州今天多云，   气温十二到二十度。", False),  # 连续空白
+    ("杭州 今天多云，气温十二到二十度。", False),  # 中文之间多余的空格
+    ("杭州今天多云。杭州今天多云。", False),  # 重复的句子
+    ("“杭州今天多云。”", True),
+])
+def test_well_formed(text, expected):
+    assert well_formed(text) is expected
+
+
+def test_disabled_policy_always_takes_full_path():
+    policy = RoutingPolicy(enabled=False)
+    assert policy.route_question("你好") is None
+    assert policy.route_output("好的。") is None
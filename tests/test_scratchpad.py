@@ -0,0 +1,92 @@
+from typing import Any, List
+
+import pytest
+from langchain.agents.output_parsers.tools import ToolAgentAction
+from langchain_core.messages import AIMessage, BaseMessage, ToolMessage
+
+from benchmarks.stubs import StubChatModel, install_stub_llm
+from config import Config
+from scratchpad import ObservationPolicy, merge_steps, record_steps, render_steps
+
+
+class RecordingChatModel(StubChatModel):
+    """
+    记录每次带工具调用时收到的消息，用来检查 agent_scratchpad 的大小。
+    """
+
+    prompts: List[List[BaseMessage]] = []
+
+    def _respond(self, messages: List[BaseMessage], **kwargs: Any) -> AIMessage:
+        if kwargs.get("tools"):
+            self.prompts.append(list(messages))
+        return super()._respond(messages, **kwargs)
+
+
+def _scratchpad(messages: List[BaseMessage]) -> List[BaseMessage]:
+    return [m for m in messages if isinstance(m, ToolMessage) or (isinstance(m, AIMessage) and m.tool_calls)]
+
+
+def _loop_steps(loops: int, calls: int, size: int = 1000):
+    steps, observations = [], {}
+    for loop in range(loops):
+        actions = [ToolAgentAction(tool="web_search", tool_input={"query": f"问题{loop}-{i}"}, log="", message_log=[],
+                                   tool_call_id=f"call_{loop}_{i}") for i in range(calls)]
+        outputs = [f"结果{loop}-{i}" + "字" * size for i in range(calls)]
+        new_steps, new_observations = record_steps(steps, actions, outputs)
+        steps = merge_steps(steps, new_steps)
+        observations = {**observations, **new_observations}
+    return steps, observations
+
+
+@pytest.mark.parametrize("loops", [1, 2, 4, 8, 16])
+def test_steps_grow_linearly(loops):
+    steps, observations = _loop_steps(loops, calls=2)
+    assert len(steps) == 2 * loops
+    assert [step.turn for step in steps] == [turn for turn in range(loops) for _ in range(2)]
+    assert len(observations) == 2 * loops
+
+
+def test_rendered_scratchpad_is_bounded_per_loop():
+    from langchain.agents.format_scratchpad.openai_tools import format_to_openai_tool_messages
+
+    policy = ObservationPolicy(keep_recent=4, max_chars=300)
+    sizes = {}
+    for loops in (1, 2, 4, 8, 16, 32):
+        steps, observations = _loop_steps(loops, calls=2)
+        messages = format_to_openai_tool_messages(render_steps(steps, observations, policy))
+        # 每轮一条带 tool_calls 的 AI 消息，加上每个调用一条工具消息
+        assert len(messages) == loops * 3
+        sizes[loops] = sum(len(str(m.content)) for m in messages)
+    # 最近 keep_recent 条保持原文，更早的每条至多 max_chars 个字符，总量随轮数线性增长
+    for loops, size in sizes.items():
+        assert size <= 4 * 1010 + 2 * loops * (300 + len("…（已截断）"))
+    assert sizes[32] - sizes[16] == pytest.approx(2 * (sizes[16] - sizes[8]), rel=0.01)
+
+
+@pytest.mark.parametrize("rounds", [1, 2, 4, 6])
+def test_workflow_scratchpad_grows_linearly(rounds, search_server):
+    from workflow import create_workflow
+
+    Config.BUDGET.update(max_iterations=10, max_duplicate_queries=100, max_tokens=10 ** 6)
+    model = RecordingChatModel(latency=0, tool_calls=2, tool_rounds=rounds)
+    install_stub_llm(model)
+
+    state = create_workflow(False).invoke({"input": "杭州今天什么天气？", "chat_history": [], "intermediate_steps": []})
+
+    assert len(state["intermediate_steps"]) == 2 * rounds
+    # 每次调用 agent 时的 scratchpad 只包含之前各轮的记录，没有被重复拼接
+    assert [len(_scratchpad(prompt)) for prompt in model.prompts] == [3 * i for i in range(rounds + 1)]
+
+
+def test_summarizer_is_chosen_in_config(monkeypatch):
+    import scratchpad
+
+    monkeypatch.setitem(scratchpad.SUMMARIZERS, "first_line", lambda text: text.split("\n", 1)[0])
+    Config.SCRATCHPAD.update(keep_recent=1, summarizer="first_line")
+    policy = ObservationPolicy.from_config()
+    assert policy.apply(0, "第一行\n第二行") == "第一行\n第二行"
+    assert policy.apply(1, "第一行\n第二行") == "第一行"
+
+    Config.SCRATCHPAD["summarizer"] = "missing"
+    with pytest.raises(ValueError):
+        ObservationPolicy.from_config()
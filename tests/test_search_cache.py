@@ -0,0 +1,87 @@
+import asyncio
+import threading
+
+from search_cache import SearchCache
+
+
+def test_disk_hit_does_not_write(tmp_path):
+    path = str(tmp_path / "search.sqlite")
+    SearchCache(sqlite_path=path).put("杭州天气", {"q": 1})
+
+    cache = SearchCache(sqlite_path=path)
+    changes = cache._store.conn.total_changes
+    assert cache.get("杭州天气？") == {"q": 1}
+    assert cache.get_or_fetch("杭州天气", lambda: None) == {"q": 1}
+    assert cache._store.conn.total_changes == changes
+    assert cache.stats()["hits"] == 2
+    cache.close()
+
+
+def test_batched_access_times_keep_lru_order(tmp_path):
+    path = str(tmp_path / "search.sqlite")
+    cache = SearchCache(max_entries=2, sqlite_path=path)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.close()
+
+    # 新进程内存层为空，从磁盘读到 a，访问时间随下一次写入落盘
+    cache = SearchCache(max_entries=2, sqlite_path=path)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    cache.close()
+
+    cache = SearchCache(max_entries=2, sqlite_path=path)
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 0
+    cache.close()
+
+
+def test_async_disk_io_runs_off_loop_and_outside_lock(tmp_path):
+    path = str(tmp_path / "search.sqlite")
+    SearchCache(sqlite_path=path).put("杭州天气", {"q": 1})
+    cache = SearchCache(sqlite_path=path)
+    calls = []
+
+    def spy(func):
+        def wrapper(*args):
+            calls.append((func.__name__, threading.get_ident(), cache._lock.locked()))
+            return func(*args)
+        return wrapper
+
+    cache._store.get = spy(cache._store.get)
+    cache._store.put = spy(cache._store.put)
+
+    async def load():
+        return {"q": 2}
+
+    async def main():
+        hit = await cache.aget_or_fetch("杭州天气", load)
+        fetched = await cache.aget_or_fetch("北京天气", load)
+        return threading.get_ident(), hit, fetched
+
+    loop_thread, hit, fetched = asyncio.run(main())
+    assert (hit, fetched) == ({"q": 1}, {"q": 2})
+    assert [name for name, _, _ in calls] == ["get", "get", "put"]
+    assert all(thread != loop_thread and not locked for _, thread, locked in calls)
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+    cache.close()
+
+
+def test_concurrent_misses_read_disk_once(tmp_path):
+    cache = SearchCache(sqlite_path=str(tmp_path / "search.sqlite"))
+    loads = []
+
+    async def load():
+        loads.append(1)
+        await asyncio.sleep(0.05)
+        return {"q": 1}
+
+    async def main():
+        return await asyncio.gather(*(cache.aget_or_fetch("杭州天气", load) for _ in range(10)))
+
+    assert asyncio.run(main()) == [{"q": 1}] * 10
+    assert len(loads) == 1
+    assert cache.stats()["coalesced"] == 9
+    cache.close()
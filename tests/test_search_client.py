@@ -0,0 +1,84 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import requests
+
+from benchmarks.stub_servers import StubSearchServer
+from search_client import SearchClient
+
+
+def _client(server, **options):
+    options.setdefault("backoff_base", 0.01)
+    return SearchClient(api_key="stub", url=server.url, **options)
+
+
+def _recording_backoff(client):
+    calls = []
+    backoff = client._backoff
+
+    def record(attempt, retry_after=None):
+        calls.append((attempt, retry_after))
+        return backoff(attempt, retry_after)
+
+    client._backoff = record
+    return calls
+
+
+def test_concurrent_searches_reuse_pooled_connections():
+    with StubSearchServer(latency=0.01) as server:
+        client = _client(server, pool_size=4)
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            statuses = list(executor.map(lambda i: client.search(f"问题 {i}").status_code, range(40)))
+
+        async def asearch():
+            return await asyncio.gather(*(client.asearch(f"问题 {i}") for i in range(20)))
+
+        statuses += [resp.status_code for resp in asyncio.run(asearch())]
+        client.close()
+    assert statuses == [200] * 60
+    assert server.requests == 60
+    # 同步与异步入口共享同一个连接池
+    assert server.connections <= 4
+
+
+@pytest.mark.parametrize("options, retry_after", [
+    ({"error_rate": 1.0}, None),
+    ({"rate_limit": 0.001, "retry_after": "0"}, "0"),
+])
+def test_retries_with_backoff_until_max_retries(options, retry_after):
+    with StubSearchServer(**options) as server:
+        client = _client(server, max_retries=2)
+        calls = _recording_backoff(client)
+        resp = client.search("杭州天气")
+        client.close()
+    assert resp.status_code == (503 if "error_rate" in options else 429)
+    assert server.requests == 3
+    assert calls == [(0, retry_after), (1, retry_after)]
+
+
+def test_backoff_is_capped_and_honours_retry_after():
+    client = SearchClient(api_key="stub", backoff_base=1, backoff_max=2)
+    assert all(0 <= client._backoff(10) <= 2 for _ in range(100))
+    assert client._backoff(0, "3") >= 3
+    client.close()
+
+
+def test_non_retryable_status_is_returned_immediately():
+    with StubSearchServer(error_rate=1.0, error_status=400) as server:
+        client = _client(server, max_retries=3)
+        calls = _recording_backoff(client)
+        resp = client.search("杭州天气")
+        client.close()
+    assert resp.status_code == 400
+    assert server.requests == 1
+    assert calls == []
+
+
+def test_read_timeout_surfaces_after_retries():
+    with StubSearchServer(latency=0.5) as server:
+        client = _client(server, read_timeout=0.05, max_retries=1)
+        with pytest.raises(requests.Timeout):
+            client.search("杭州天气")
+        client.close()
+        assert server.requests == 2
@@ -0,0 +1,166 @@
+import time
+
+import pytest
+
+from search_index import SearchIndex
+
+
+@pytest.fixture
+def index():
+    return SearchIndex(max_entries=64, freshness={"weather": {"pattern": "天气", "max_age": 3600}})
+
+
+@pytest.mark.parametrize("stored, query", [
+    ("杭州今天什么天气", "请问杭州今天的天气怎么样"),
+    ("近期的离婚相关案件", "帮我查一下近期离婚相关的案件"),
+    ("2025年1月9日杭州天气", "2025年1月9日杭州什么天气？"),
+])
+def test_paraphrase_reuses_result(index, stored, query):
+    index.add(stored, {"query": stored})
+    assert index.lookup(query) == {"query": stored}
+    assert index.stats()["hits"] == 1
+
+
+@pytest.mark.parametrize("stored, query", [
+    # 日期、数字不同：散列嵌入的相似度很高，但结果不能复用
+    ("2025年1月9日杭州天气", "2025年1月15日杭州什么天气?"),
+    ("2024年杭州离婚相关案件判决书", "2025年杭州离婚相关案件判决书"),
+    ("杭州地铁1号线首班车时间", "杭州地铁2号线首班车时间"),
+    ("三天后杭州天气", "五天后杭州天气"),
+    # 地名不同
+    ("2025年杭州离婚相关案件判决书", "2025年北京离婚相关案件判决书"),
+    ("杭州今天什么天气", "苏州今天什么天气"),
+    ("内蒙古今天什么天气", "呼和浩特今天什么天气"),
+    # 只多了一个数字或地名
+    ("杭州今天什么天气", "杭州今天15点什么天气"),
+    ("离婚相关案件判决书", "杭州离婚相关案件判决书"),
+])
+def test_near_miss_is_not_reused(index, stored, query):
+    index.add(stored, {"query": stored})
+    assert index.lookup(query) is None
+    assert index.stats()["misses"] == 1
+
+
+def test_extra_places(index):
+    index = SearchIndex(places=["余杭"])
+    index.add("余杭区离婚相关案件", {})
+    assert index.lookup("西湖区离婚相关案件") is None
+    assert index.lookup("请问余杭区的离婚相关案件") == {}
+
+
+def test_freshness_by_query_type(index):
+    now = time.time()
+    index.add("杭州今天什么天气", {"kind": "weather"}, created_at=now - 7200)
+    index.add("近期离婚相关案件", {"kind": "legal"}, created_at=now - 7200)
+    assert index.lookup("杭州今天的天气") is None
+    assert index.lookup("近期的离婚相关案件") == {"kind": "legal"}
+    assert index.stats() == {"hits": 1, "misses": 0, "stale": 1, "size": 2}
+
+
+def test_ring_buffer_and_persistence(tmp_path):
+    index = SearchIndex(max_entries=4, path=str(tmp_path))
+    for i in range(6):
+        index.add(f"第{i}号问题", {"i": i})
+    index.close()
+
+    reopened = SearchIndex(max_entries=4, path=str(tmp_path))
+    assert reopened.stats()["size"] == 4
+    assert reopened.lookup("第1号问题") is None
+    assert reopened.lookup("第5号问题") == {"i": 5}
+    # 重新打开后继续覆盖最早的一条
+    reopened.add("第6号问题", {"i": 6})
+    assert reopened.lookup("第2号问题") is None
+    assert reopened.lookup("第3号问题") == {"i": 3}
+    reopened.close()
+
+
+@pytest.mark.parametrize("persistent", [False, True])
+def test_concurrent_writes_never_return_another_query(tmp_path, persistent):
+    import threading
+
+    # 容量很小，写入线程不断覆盖读取线程刚刚选中的槽位
+    index = SearchIndex(max_entries=8, path=str(tmp_path) if persistent else None)
+    stop = threading.Event()
+    wrong = []
+
+    def write():
+        i = 0
+        while not stop.is_set():
+            index.add(f"第{i % 32}号问题", {"i": i % 32})
+            i += 1
+
+    def read():
+        for j in range(2000):
+            payload = index.lookup(f"请问第{j % 32}号问题")
+            if payload is not None and payload["i"] != j % 32:
+                wrong.append((j % 32, payload))
+
+    writers = [threading.Thread(target=write) for _ in range(2)]
+    readers = [threading.Thread(target=read) for _ in range(2)]
+    for thread in writers + readers:
+        thread.start()
+    for thread in readers:
+        thread.join()
+    stop.set()
+    for thread in writers:
+        thread.join()
+    index.close()
+
+    assert wrong == []
+    stats = index.stats()
+    assert stats["hits"] + stats["misses"] + stats["stale"] == 4000
+
+
+def test_payload_is_read_before_the_slot_is_overwritten(tmp_path):
+    import threading
+
+    index = SearchIndex(max_entries=1, path=str(tmp_path))
+    index.add("第1号问题", {"i": 1})
+    read_payload = index._store.payload
+    writer = threading.Thread(target=index.add, args=("第2号问题", {"i": 2}))
+
+    def payload(slot):
+        # 读取结果之前，另一个线程写入新的查询并覆盖同一个槽位
+        writer.start()
+        writer.join(timeout=0.2)
+        return read_payload(slot)
+
+    index._store.payload = payload
+    assert index.lookup("第1号问题") == {"i": 1}
+    writer.join()
+    index._store.payload = read_payload
+    assert index.lookup("第2号问题") == {"i": 2}
+    index.close()
+
+
+def test_async_search_uses_index_off_the_event_loop(search_server, monkeypatch):
+    import asyncio
+    import threading
+
+    import search_index
+    import tools
+    from config import Config
+
+    Config.SEARCH_INDEX.update(enabled=True, path=None)
+    index = SearchIndex()
+    monkeypatch.setattr(search_index, "_index", index)
+    calls = []
+
+    def spy(func):
+        def wrapper(*args):
+            calls.append((func.__name__, threading.get_ident()))
+            return func(*args)
+        return wrapper
+
+    index.lookup, index.add = spy(index.lookup), spy(index.add)
+
+    async def main():
+        first = await tools._aload("杭州今天什么天气")
+        second = await tools._aload("请问杭州今天的天气怎么样")
+        return threading.get_ident(), first, second
+
+    loop_thread, first, second = asyncio.run(main())
+    assert first == second
+    assert search_server.requests == 1
+    assert [name for name, _ in calls] == ["lookup", "add", "lookup"]
+    assert all(thread != loop_thread for _, thread in calls)
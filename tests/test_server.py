@@ -0,0 +1,80 @@
+import asyncio
+import json
+
+import pytest
+
+from server import WorkflowServer
+
+
+class FailingApp:
+    """
+    执行时总是抛出异常的图。
+    """
+
+    checkpointer = None
+
+    async def ainvoke(self, inputs, config=None):
+        raise RuntimeError("GLM 返回了错误")
+
+    async def astream_events(self, inputs, config=None, version="v2"):
+        yield {"event": "on_chat_model_start", "metadata": {}, "data": {}}
+        raise RuntimeError("GLM 返回了错误")
+
+
+async def _request(port: int, path: str, payload) -> tuple:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    writer.write((f"POST {path} HTTP/1.1\r\nHost: test\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n"
+                  ).encode("latin-1") + body)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, body = response.partition(b"\r\n\r\n")
+    return int(head.split(b" ")[1]), body.decode("utf-8")
+
+
+def _run(app, *requests):
+    async def main():
+        server = WorkflowServer(app, port=0)
+        await server.start()
+        try:
+            return [await _request(server.port, path, payload) for path, payload in requests]
+        finally:
+            await server.shutdown()
+
+    return asyncio.run(main())
+
+
+def test_graph_error_returns_500():
+    [(status, body)] = _run(FailingApp(), ("/invoke", {"input": "你好"}))
+    assert status == 500
+    assert json.loads(body) == {"error": "服务内部错误"}
+
+
+def test_stream_error_sends_error_event():
+    [(status, body)] = _run(FailingApp(), ("/stream", {"input": "你好"}))
+    assert status == 200
+    assert body.endswith("event: error\ndata: {\"error\": \"服务内部错误\"}\n\nevent: end\ndata: {}\n\n")
+
+
+@pytest.mark.parametrize("chat_history", [
+    "你好",
+    [["user", "你好"]],
+    [{"role": "robot", "content": "你好"}],
+    [{"role": "user"}],
+    [{"role": "user", "content": ["你好"]}],
+])
+def test_invalid_chat_history_returns_400(chat_history):
+    [(status, body)] = _run(FailingApp(), ("/invoke", {"input": "你好", "chat_history": chat_history}))
+    assert status == 400
+    assert "chat_history" in json.loads(body)["error"]
+
+
+def test_chat_history_is_passed_as_messages(search_server, stub_model):
+    from workflow import create_workflow
+
+    stub_model(tool_calls=0)
+    history = [{"role": "user", "content": "我在杭州"}, {"role": "assistant", "content": "好的"}]
+    [(status, body)] = _run(create_workflow(False), ("/invoke", {"input": "今天天气怎么样？", "chat_history": history}))
+    assert status == 200
+    assert json.loads(body)["output"]
@@ -0,0 +1,91 @@
+import asyncio
+import time
+
+import pytest
+from langchain.agents.output_parsers.tools import ToolAgentAction
+
+from config import Config
+
+LATENCY = 0.2
+
+
+def _actions(*queries):
+    return [ToolAgentAction(tool="web_search", tool_input={"query": query}, log="", message_log=[],
+                            tool_call_id=f"call_{i}") for i, query in enumerate(queries)]
+
+
+def _run(node, data):
+    start = time.perf_counter()
+    if asyncio.iscoroutinefunction(node):
+        update = asyncio.run(node(data))
+    else:
+        update = node(data)
+    return update, time.perf_counter() - start
+
+
+def _observed_queries(update):
+    # 替身搜索服务返回的每条结果以 “[序号] 查询 - ” 开头
+    return [update["observations"][step.result_ref].split(" - ")[0].split("] ", 1)[1]
+            for step in update["intermediate_steps"]]
+
+
+@pytest.fixture(params=["execute_tools", "aexecute_tools"])
+def node(request):
+    import workflow
+
+    return getattr(workflow, request.param)
+
+
+def test_calls_run_in_parallel_in_model_order(node, search_server):
+    search_server.latency = LATENCY
+    queries = ["杭州天气", "杭州天气 补充1", "杭州天气 补充2"]
+    update, elapsed = _run(node, {"input": "杭州天气", "agent_outcome": _actions(*queries), "intermediate_steps": []})
+
+    assert [step.tool_input["query"] for step in update["intermediate_steps"]] == queries
+    assert [step.tool_call_id for step in update["intermediate_steps"]] == ["call_0", "call_1", "call_2"]
+    assert _observed_queries(update) == queries
+    assert search_server.requests == 3
+    assert elapsed < 2 * LATENCY
+
+
+def test_tool_concurrency_is_honoured(node, search_server, monkeypatch):
+    monkeypatch.setattr(Config, "TOOL_CONCURRENCY", 1)
+    search_server.latency = LATENCY
+    queries = ["杭州天气", "杭州天气 补充1", "杭州天气 补充2"]
+    update, elapsed = _run(node, {"input": "杭州天气", "agent_outcome": _actions(*queries), "intermediate_steps": []})
+
+    assert _observed_queries(update) == queries
+    assert elapsed >= 3 * LATENCY
+
+
+def test_duplicate_queries_are_not_searched_again(node, search_server):
+    queries = ["杭州天气", "杭州天气？", "北京天气"]
+    update, _ = _run(node, {"input": "杭州天气", "agent_outcome": _actions(*queries), "intermediate_steps": []})
+    assert search_server.requests == 2
+    assert _observed_queries(update) == ["杭州天气", "杭州天气", "北京天气"]
+    assert update["budget"]["duplicates"] == 1
+
+    # 与之前各轮重复的查询复用已有的结果
+    previous = update["intermediate_steps"]
+    data = {"input": "杭州天气", "agent_outcome": _actions("北京天气", "上海天气"), "intermediate_steps": previous,
+            "observations": update["observations"]}
+    update, _ = _run(node, data)
+    assert search_server.requests == 3
+    assert _observed_queries({**update, "observations": {**data["observations"], **update["observations"]}}) == [
+        "北京天气", "上海天气"]
+
+
+def test_workflow_runs_a_multi_call_turn_in_parallel(search_server, stub_model):
+    from workflow import create_workflow
+
+    search_server.latency = LATENCY
+    stub_model(tool_calls=3)
+    app = create_workflow(False)
+    start = time.perf_counter()
+    state = app.invoke({"input": "杭州今天什么天气？", "chat_history": [], "intermediate_steps": []})
+    elapsed = time.perf_counter() - start
+
+    assert [step.tool_input["query"] for step in state["intermediate_steps"]] == [
+        "杭州今天什么天气？", "杭州今天什么天气？ 补充1", "杭州今天什么天气？ 补充2"]
+    assert search_server.requests == 3
+    assert elapsed < 2 * LATENCY
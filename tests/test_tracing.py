@@ -0,0 +1,17 @@
+import tracing
+
+
+def test_reconfigure_closes_file_handlers(tmp_path):
+    options = {"enabled": True, "level": "INFO", "json": True, "sink": str(tmp_path / "trace.log"), "journal": None}
+    try:
+        tracing.configure(options)
+        [first] = tracing.logger.handlers
+        tracing.configure(options)
+        [second] = tracing.logger.handlers
+    finally:
+        tracing.configure({"enabled": False, "journal": None})
+
+    assert first.stream is None
+    assert second is not first
+    assert tracing.logger.handlers == []
+    assert second.stream is None
@@ -1,38 +1,229 @@
+import asyncio
+import threading
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, NamedTuple, Optional
+
 import requests
-import uuid
-from langchain.tools import tool
+
 from config import Config
+from observations import compact_search_results
+from search_cache import get_search_cache
+from search_client import get_search_client
+from tracing import Lazy, get_logger, preview
+
+if TYPE_CHECKING:
+    from langchain_core.tools import BaseTool
+
+logger = get_logger("tools")
+
+
+class SearchFailed(Exception):
+    """
+    联网搜索返回非 200 状态码，失败的结果不会写入缓存。
+    """
+
+    def __init__(self, status_code: int):
+        super().__init__(f"联网搜索失败，状态码：{status_code}")
+        self.status_code = status_code
+
+
+def _check_response(resp: requests.Response) -> dict:
+    logger.debug("联网搜索工具调用结果: %s", resp.status_code)
+    if resp.status_code != 200:
+        raise SearchFailed(resp.status_code)
+    return resp.json()
+
+
+def _extract_result(query: str, payload: dict) -> str:
+    # 缓存中保存原始响应，压缩在取出后进行，调整 Config.OBSERVATIONS 对已缓存的结果同样生效
+    result = compact_search_results(query, payload)
+    logger.debug("工具返回结果: %s", Lazy(preview, result))
+    return result
+
+
+def _fetch(query: str) -> dict:
+    return _check_response(get_search_client().search(query))
+
+
+async def _afetch(query: str) -> dict:
+    return _check_response(await get_search_client().asearch(query))
+
+
+def _search_index():
+    # 索引依赖 numpy，未启用时不导入
+    if not Config.SEARCH_INDEX["enabled"]:
+        return None
+    from search_index import get_search_index
+
+    return get_search_index()
+
+
+def _load(query: str) -> dict:
+    """
+    精确缓存未命中时的加载顺序：先查本地索引中相似且新鲜的结果，没有时联网并把结果写入索引。
+    """
+    index = _search_index()
+    if index is None:
+        return _fetch(query)
+    payload = index.lookup(query)
+    if payload is None:
+        payload = _fetch(query)
+        index.add(query, payload)
+    return payload
+
+
+async def _aload(query: str) -> dict:
+    """
+    _load 的异步版本；索引的检索（嵌入与矩阵乘法，持久化时可能从磁盘读入页面）与写入在线程池中执行，不阻塞事件循环。
+    """
+    index = _search_index()
+    if index is None:
+        return await _afetch(query)
+    loop = asyncio.get_running_loop()
+    payload = await loop.run_in_executor(None, index.lookup, query)
+    if payload is None:
+        payload = await _afetch(query)
+        await loop.run_in_executor(None, index.add, query, payload)
+    return payload
+
+
+def _web_search(query: str) -> str:
+    logger.debug("query: %s", query)
+    cache = get_search_cache()
+    try:
+        if cache is None:
+            payload = _load(query)
+        else:
+            payload = cache.get_or_fetch(query, lambda: _load(query))
+    except SearchFailed as e:
+        return str(e)
+    return _extract_result(query, payload)
 
 
-# 定义联网搜索工具
-@tool("web_search")
-def web_search(query: str) -> str:
-    """
-    调用联网搜索工具，返回搜索结果。
-    """
-    print("query:", query)
-    tool_name = "web-search-pro"
-    url = "https://open.bigmodel.cn/api/paas/v4/tools"
-    request_id = str(uuid.uuid4())
-    data = {
-        "request_id": request_id,
-        "tool": tool_name,
-        "stream": False,
-        "messages": [{"role": "user", "content": query}]
-    }
-    headers = {'Authorization': Config.API_KEY}
-    resp = requests.post(url, json=data, headers=headers, timeout=300)
-    print("联网搜索工具调用结果:", resp.status_code)
-    if resp.status_code == 200:
-        result = \
-            resp.json().get("choices", [{}])[0].get("message", {}).get("tool_calls", [{}])[1].get("search_result",
-                                                                                                  [{}])[
-                0].get("content", "未找到相关信息")
-        print("工具返回结果:", result)
-        return result
-    else:
-        return f"联网搜索失败，状态码：{resp.status_code}"
-
-
-# 工具列表
-tools = [web_search]
+async def _aweb_search(query: str) -> str:
+    logger.debug("query: %s", query)
+    cache = get_search_cache()
+    try:
+        if cache is None:
+            payload = await _aload(query)
+        else:
+            payload = await cache.aget_or_fetch(query, lambda: _aload(query))
+    except SearchFailed as e:
+        return str(e)
+    return _extract_result(query, payload)
+
+
+def _build_web_search() -> "BaseTool":
+    from langchain_core.tools import StructuredTool
+
+    # 定义联网搜索工具，同时提供同步与异步实现，图节点可以 invoke 也可以 ainvoke
+    return StructuredTool.from_function(
+        func=_web_search,
+        coroutine=_aweb_search,
+        name="web_search",
+        description="调用联网搜索工具，返回搜索结果。",
+    )
+
+
+# 工具名 -> 构建函数，Config.TOOLS 中的名字在这里查找
+_TOOL_BUILDERS: Dict[str, Callable[[], "BaseTool"]] = {
+    "web_search": _build_web_search,
+}
+
+_tools: Optional[List["BaseTool"]] = None
+_dispatcher: Optional["ToolDispatcher"] = None
+_tools_lock = threading.Lock()
+
+
+def register_tool(name: str, builder: Callable[[], "BaseTool"]) -> None:
+    """
+    注册一个可以在 Config.TOOLS 中启用的工具，需在首次调用 get_tools() 之前注册。
+    """
+    _TOOL_BUILDERS[name] = builder
+
+
+def get_tools() -> List["BaseTool"]:
+    """
+    返回 Config.TOOLS 中启用的工具列表，首次调用时创建。
+    """
+    global _tools
+    if _tools is None:
+        with _tools_lock:
+            if _tools is None:
+                unknown = [name for name in Config.TOOLS if name not in _TOOL_BUILDERS]
+                if unknown:
+                    raise ValueError(f"未注册的工具: {unknown}")
+                _tools = [_TOOL_BUILDERS[name]() for name in Config.TOOLS]
+    return _tools
+
+
+class ToolResult(NamedTuple):
+    tool: str
+    tool_call_id: str
+    content: str
+    ok: bool
+
+
+class ToolDispatcher:
+    """
+    按工具名直接调用工具函数，不再经过 ToolNode 的消息往返。
+
+    参数按工具的 args_schema 校验；参数不是字典且工具只有一个参数时，作为该参数的值。
+    工具不存在、参数不合法或执行出错时返回 ok=False 的结果，错误信息交给模型自行修正。
+    """
+
+    def __init__(self, tools: List["BaseTool"]):
+        self.tools = {tool.name: tool for tool in tools}
+
+    def _arguments(self, tool: "BaseTool", tool_input: Any) -> dict:
+        schema = tool.args_schema
+        fields = list(getattr(schema, "model_fields", None) or {})
+        if not isinstance(tool_input, dict):
+            if len(fields) != 1:
+                raise ValueError(f"工具 {tool.name} 需要参数 {fields}")
+            tool_input = {fields[0]: tool_input}
+        if fields:
+            validated = schema.model_validate(tool_input)
+            return {name: getattr(validated, name) for name in fields}
+        return dict(tool_input)
+
+    def _prepare(self, name: str, tool_input: Any):
+        tool = self.tools.get(name)
+        if tool is None:
+            raise ValueError(f"未知的工具 {name}，可用的工具：{list(self.tools)}")
+        return tool, self._arguments(tool, tool_input)
+
+    def invoke(self, name: str, tool_input: Any, tool_call_id: str = "") -> ToolResult:
+        try:
+            tool, arguments = self._prepare(name, tool_input)
+            func = getattr(tool, "func", None)
+            content = func(**arguments) if func is not None else tool.invoke(arguments)
+        except Exception as e:
+            return ToolResult(name, tool_call_id, f"工具调用失败：{e}，请修正后重试。", False)
+        return ToolResult(name, tool_call_id, str(content), True)
+
+    async def ainvoke(self, name: str, tool_input: Any, tool_call_id: str = "") -> ToolResult:
+        try:
+            tool, arguments = self._prepare(name, tool_input)
+            coroutine = getattr(tool, "coroutine", None)
+            if coroutine is not None:
+                content = await coroutine(**arguments)
+            elif getattr(tool, "func", None) is not None:
+                content = await asyncio.get_running_loop().run_in_executor(None, lambda: tool.func(**arguments))
+            else:
+                content = await tool.ainvoke(arguments)
+        except Exception as e:
+            return ToolResult(name, tool_call_id, f"工具调用失败：{e}，请修正后重试。", False)
+        return ToolResult(name, tool_call_id, str(content), True)
+
+
+def get_tool_dispatcher() -> ToolDispatcher:
+    """
+    返回覆盖全部已启用工具的共享调度器。
+    """
+    global _dispatcher
+    if _dispatcher is None:
+        tools = get_tools()
+        with _tools_lock:
+            if _dispatcher is None:
+                _dispatcher = ToolDispatcher(tools)
+    return _dispatcher
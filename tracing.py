@@ -0,0 +1,175 @@
+import functools
+import inspect
+import json
+import logging
+import sys
+import time
+from typing import Any, Callable, Optional
+
+import metrics
+from config import Config
+
+logger = logging.getLogger("langraph_glm")
+span_logger = logging.getLogger("langraph_glm.span")
+# Config.TRACING["journal"] 对应的 codec.StateJournal，未配置时为 None
+_journal = None
+
+
+def get_logger(name: str) -> logging.Logger:
+    """
+    返回挂在 langraph_glm 下的子 logger，统一受 configure() 控制。
+    """
+    return logging.getLogger(f"langraph_glm.{name}")
+
+
+class Lazy:
+    """
+    延迟格式化：只有日志记录真正输出时才调用 fn 生成文本，关闭日志时没有开销。
+    """
+
+    __slots__ = ("fn", "args")
+
+    def __init__(self, fn: Callable[..., Any], *args: Any):
+        self.fn = fn
+        self.args = args
+
+    def __str__(self) -> str:
+        return str(self.fn(*self.args))
+
+
+def preview(value: Any, limit: int = 200) -> str:
+    """
+    截断后的 repr，避免把完整状态或搜索原文写进日志。
+    """
+    text = repr(value)
+    return text if len(text) <= limit else text[:limit] + f"…(+{len(text) - limit})"
+
+
+def approx_size(value: Any, depth: int = 3) -> int:
+    """
+    粗略估计状态大小（字符数），只在记录 span 时计算。
+    """
+    if isinstance(value, str):
+        return len(value)
+    if depth == 0:
+        return 1
+    if isinstance(value, dict):
+        return sum(approx_size(v, depth - 1) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(approx_size(v, depth - 1) for v in value)
+    return 1
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    每条日志输出一行 JSON，span 字段会展开到顶层，便于日志系统采集。
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        span = getattr(record, "span", None)
+        if span:
+            payload.update(span)
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+def configure(options: Optional[dict] = None) -> None:
+    """
+    按 Config.TRACING 配置日志输出；enabled 为 False 时只输出警告及以上级别。
+    """
+    global _journal
+    options = options or Config.TRACING
+    path = options.get("journal")
+    if (_journal.path if _journal is not None else None) != path:
+        if _journal is not None:
+            _journal.close()
+        _journal = None
+        if path:
+            from codec import StateJournal
+
+            _journal = StateJournal(path)
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        # 多次 configure 时关闭旧的 FileHandler，避免泄漏文件描述符
+        handler.close()
+    if not options["enabled"]:
+        logger.setLevel(logging.WARNING)
+        return
+    sink = options.get("sink")
+    handler = logging.FileHandler(sink, encoding="utf-8") if sink else logging.StreamHandler(sys.stderr)
+    handler.setFormatter(JsonFormatter() if options.get("json") else logging.Formatter(
+        "%(asctime)s %(levelname)s %(name)s %(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(options.get("level", "INFO"))
+    logger.propagate = False
+
+
+def _active() -> bool:
+    return metrics.enabled() or _journal is not None or span_logger.isEnabledFor(logging.INFO)
+
+
+def _emit(node: str, start: float, data: Any, result: Any, error: Optional[BaseException]) -> None:
+    elapsed = time.perf_counter() - start
+    if metrics.enabled():
+        metrics.node_seconds.observe(elapsed, node=node)
+    if _journal is not None and isinstance(result, dict):
+        try:
+            _journal.append(node, result)
+        except Exception:
+            # 日志写不进去（无法编码的对象、磁盘错误）不应让已经成功的节点失败
+            logger.exception("写入状态日志失败: node=%s", node)
+    if not span_logger.isEnabledFor(logging.INFO):
+        return
+    span_logger.info("node %s", node, extra={"span": {
+        "node": node,
+        "duration_ms": round(elapsed * 1000, 3),
+        "state_in": approx_size(data),
+        "state_out": approx_size(result) if error is None else None,
+        "error": None if error is None else type(error).__name__,
+    }})
+
+
+def traced(node: str) -> Callable:
+    """
+    节点装饰器：记录节点耗时以及输入、输出状态的大小，耗时同时计入 metrics。
+    日志与指标都关闭时直接调用原函数。
+    """
+
+    def decorator(fn: Callable) -> Callable:
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(data, *args, **kwargs):
+                if not _active():
+                    return await fn(data, *args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    result = await fn(data, *args, **kwargs)
+                except BaseException as e:
+                    _emit(node, start, data, None, e)
+                    raise
+                _emit(node, start, data, result, None)
+                return result
+
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(data, *args, **kwargs):
+            if not _active():
+                return fn(data, *args, **kwargs)
+            start = time.perf_counter()
+            try:
+                result = fn(data, *args, **kwargs)
+            except BaseException as e:
+                _emit(node, start, data, None, e)
+                raise
+            _emit(node, start, data, result, None)
+            return result
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,491 @@
+import asyncio
+import collections
+import itertools
+import math
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing.connection import wait
+from typing import AsyncIterator, Callable, Deque, Dict, List, Optional, Sequence, Set, Tuple
+
+import metrics
+from config import Config
+from tracing import get_logger
+
+logger = get_logger("worker_pool")
+
+_REASONS = {"exited": "已退出", "unresponsive": "没有心跳"}
+
+
+class WorkerCrashed(RuntimeError):
+    """
+    执行任务的工作进程退出或失去响应，任务没有完成。
+    """
+
+
+class WorkerTaskError(RuntimeError):
+    """
+    任务在工作进程中抛出了异常；异常对象不一定能跨进程传递，这里保留类型名与消息。
+    """
+
+    def __init__(self, kind: str, message: str):
+        super().__init__(f"{kind}: {message}")
+        self.kind = kind
+
+
+# --- 工作进程 ---
+
+def _share_rate_limits(workers: int) -> None:
+    # 每个进程有自己的限速器，按进程数平分配额，整个池的请求速率仍不超过 Config.RATE_LIMITS
+    for endpoint, options in list(Config.RATE_LIMITS.items()):
+        Config.RATE_LIMITS[endpoint] = {
+            **options,
+            "rate": options["rate"] / workers,
+            "burst": max(1, options["burst"] / workers),
+            "concurrency": max(1, math.ceil(options["concurrency"] / workers)),
+        }
+
+
+def _session_inputs(app, inputs: Optional[dict], config: Optional[dict]) -> Optional[dict]:
+    # 带检查点的会话在工作进程中读取状态，决定是新的一轮还是继续中断的执行
+    thread_id = ((config or {}).get("configurable") or {}).get("thread_id")
+    if app.checkpointer is None or thread_id is None or inputs is None:
+        return inputs
+    from workflow import turn_inputs
+
+    return turn_inputs(app, config, inputs["input"])
+
+
+async def _stream(app, inputs: Optional[dict], config: Optional[dict], nodes: Sequence[str],
+                  emit: Callable[[str, str], None]) -> None:
+    from workflow import astream_tokens
+
+    async for node, token in astream_tokens(app, inputs, config, tuple(nodes)):
+        emit(node, token)
+
+
+def _serve(app, tasks: "queue.Queue", send: Callable[[tuple], None]) -> None:
+    while True:
+        task = tasks.get()
+        if task is None:
+            return
+        task_id, inputs, config, nodes = task
+        send(("start", task_id))
+        try:
+            inputs = _session_inputs(app, inputs, config)
+            if nodes is None:
+                result = app.invoke(inputs, config)
+            else:
+                asyncio.run(_stream(app, inputs, config, nodes, lambda node, token: send(("token", task_id, node, token))))
+                result = None
+            send(("done", task_id, result))
+        except (EOFError, OSError):
+            # 与父进程的连接已经断开
+            return
+        except Exception as e:
+            send(("error", task_id, type(e).__name__, str(e)))
+
+
+def _worker_main(
+        slot: int,
+        conn,
+        workers: int,
+        shape: str,
+        checkpointer: Optional[bool],
+        concurrency: int,
+        heartbeat_interval: float,
+        initializer: Optional[Callable],
+        initargs: tuple,
+) -> None:
+    # 中断信号由父进程统一处理，工作进程按父进程的指令退出
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    lock = threading.Lock()
+
+    def send(message: tuple) -> None:
+        with lock:
+            conn.send(message)
+
+    if initializer is not None:
+        initializer(*initargs)
+    _share_rate_limits(workers)
+    from graphs import warm_up
+
+    app = warm_up(shape, checkpointer)
+    tasks: "queue.Queue" = queue.Queue()
+    threads = [threading.Thread(target=_serve, args=(app, tasks, send), name=f"graph-{i}", daemon=True)
+               for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    stopped = threading.Event()
+
+    def heartbeat():
+        while not stopped.wait(heartbeat_interval):
+            try:
+                send(("heartbeat",))
+            except (EOFError, OSError):
+                return
+
+    threading.Thread(target=heartbeat, name="heartbeat", daemon=True).start()
+    send(("ready", os.getpid()))
+    try:
+        while True:
+            message = conn.recv()
+            if message is None:
+                break
+            tasks.put(message)
+    except (EOFError, OSError):
+        pass
+    # 等待已分配的任务完成后退出
+    for _ in threads:
+        tasks.put(None)
+    for thread in threads:
+        thread.join()
+    stopped.set()
+    conn.close()
+
+
+# --- 父进程 ---
+
+class _Task:
+    __slots__ = ("task_id", "inputs", "config", "nodes", "future", "on_token", "slot", "started")
+
+    def __init__(self, task_id: int, inputs, config, nodes, on_token):
+        self.task_id = task_id
+        self.inputs = inputs
+        self.config = config
+        self.nodes = nodes
+        self.on_token = on_token
+        self.future: Future = Future()
+        self.slot: Optional["_Slot"] = None
+        self.started = False
+
+
+class _Slot:
+    def __init__(self, index: int):
+        self.index = index
+        self.process = None
+        self.conn = None
+        self.pid: Optional[int] = None
+        self.ready = threading.Event()
+        self.last_seen = 0.0
+        self.assigned: Set[int] = set()
+
+
+class WorkerPool:
+    """
+    多进程执行图：workers 个工作进程各自持有一份预热好的图（graphs.warm_up(shape)），
+    每个进程用 concurrency 个线程同时执行图，模板渲染、JSON 解析与输出解析等 CPU 工作分散到多个核上。
+
+    任务先进入父进程中的共享队列，按各进程的空闲名额分配，结果与流式 token 通过管道传回。
+    不使用跨进程的 multiprocessing.Queue：被强制结束的进程可能持有它的锁，让其余进程一起卡住。
+    父进程按心跳检查工作进程，进程退出或 heartbeat_timeout 秒没有心跳时结束并重启它：
+    尚未开始的任务重新排队，已经开始的任务以 WorkerCrashed 失败。
+
+    initializer(*initargs) 在每个工作进程构建图之前调用（例如替换模型），必须可以被 pickle；
+    工作进程使用 spawn 启动，父进程在运行时对 Config 的修改不会传给工作进程，需要在 initializer 中设置。
+    Config.RATE_LIMITS 的配额按进程数平分。checkpointer 只能是 None、True 或 False，含义同 create_graph。
+    """
+
+    def __init__(
+            self,
+            workers: Optional[int] = None,
+            shape: str = "beautify",
+            checkpointer: Optional[bool] = None,
+            concurrency: int = 8,
+            heartbeat_interval: float = 1.0,
+            heartbeat_timeout: float = 30.0,
+            startup_timeout: float = 60.0,
+            start_method: str = "spawn",
+            initializer: Optional[Callable] = None,
+            initargs: tuple = (),
+    ):
+        self.workers = workers or os.cpu_count() or 1
+        self.shape = shape
+        # 工作进程读不到父进程修改过的 Config，在这里按父进程的配置确定
+        self.checkpointer = Config.CHECKPOINT["enabled"] if checkpointer is None else checkpointer
+        self.sessions = bool(self.checkpointer)
+        self.concurrency = concurrency
+        self.heartbeat_interval = heartbeat_interval
+        self.heartbeat_timeout = heartbeat_timeout
+        self.startup_timeout = startup_timeout
+        self.initializer = initializer
+        self.initargs = initargs
+        self._context = multiprocessing.get_context(start_method)
+        self._slots = [_Slot(i) for i in range(self.workers)]
+        self._queue: Deque[_Task] = collections.deque()
+        self._tasks: Dict[int, _Task] = {}
+        self._ids = itertools.count()
+        self._lock = threading.RLock()
+        self._closing = False
+        self._stopped = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self.counts = {"done": 0, "failed": 0, "crashed": 0, "restarts": 0}
+
+    @classmethod
+    def from_config(cls, **overrides) -> "WorkerPool":
+        return cls(**{**Config.WORKER_POOL, **overrides})
+
+    def __enter__(self) -> "WorkerPool":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "workers": sum(1 for slot in self._slots if slot.ready.is_set()),
+                "queued": len(self._queue),
+                "running": sum(len(slot.assigned) for slot in self._slots),
+                **self.counts,
+            }
+
+    def start(self) -> "WorkerPool":
+        """
+        启动全部工作进程并等待它们完成预热。
+        """
+        for slot in self._slots:
+            self._spawn(slot)
+        for target, name in ((self._read_loop, "worker-pool-reader"), (self._monitor_loop, "worker-pool-monitor")):
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        deadline = time.monotonic() + self.startup_timeout
+        for slot in self._slots:
+            if not slot.ready.wait(max(0.0, deadline - time.monotonic())):
+                self.close(0)
+                raise RuntimeError(f"工作进程 {slot.index} 在 {self.startup_timeout} 秒内没有完成启动")
+        logger.info("工作进程池已启动: %s 个进程，每个进程并发 %s", self.workers, self.concurrency)
+        return self
+
+    def _spawn(self, slot: _Slot) -> None:
+        parent_conn, child_conn = self._context.Pipe()
+        process = self._context.Process(
+            target=_worker_main,
+            args=(slot.index, child_conn, self.workers, self.shape, self.checkpointer, self.concurrency,
+                  self.heartbeat_interval, self.initializer, self.initargs),
+            name=f"graph-worker-{slot.index}",
+            daemon=True,
+        )
+        process.start()
+        child_conn.close()
+        with self._lock:
+            slot.process, slot.conn, slot.pid = process, parent_conn, process.pid
+            slot.ready.clear()
+            slot.last_seen = time.monotonic()
+
+    # --- 提交 ---
+
+    def submit(
+            self,
+            inputs: Optional[dict],
+            config: Optional[dict] = None,
+            on_token: Optional[Callable[[str, str], None]] = None,
+            nodes: Sequence[str] = ("agent", "beautify"),
+    ) -> Future:
+        """
+        提交一次图的执行，返回 Future，结果为最终状态。on_token 不为空时以流式方式执行，
+        在读取线程中依次回调 on_token(节点名, token)，Future 的结果为 None。
+        config 会被 pickle 传给工作进程，其中不能包含回调等不可序列化的对象。
+        """
+        with self._lock:
+            if self._closing:
+                raise RuntimeError("工作进程池已关闭")
+            task = _Task(next(self._ids), inputs, config, tuple(nodes) if on_token is not None else None, on_token)
+            self._tasks[task.task_id] = task
+            self._queue.append(task)
+            self._dispatch()
+        return task.future
+
+    def invoke(self, inputs: Optional[dict], config: Optional[dict] = None, timeout: Optional[float] = None):
+        return self.submit(inputs, config).result(timeout)
+
+    async def ainvoke(self, inputs: Optional[dict], config: Optional[dict] = None):
+        return await asyncio.wrap_future(self.submit(inputs, config))
+
+    async def astream_tokens(
+            self,
+            inputs: Optional[dict],
+            config: Optional[dict] = None,
+            nodes: Sequence[str] = ("agent", "beautify"),
+    ) -> AsyncIterator[Tuple[str, str]]:
+        """
+        与 workflow.astream_tokens 相同，逐个产出 (节点名, token)，图在工作进程中执行。
+        """
+        loop = asyncio.get_running_loop()
+        tokens: asyncio.Queue = asyncio.Queue()
+        # token 与结束消息在同一个读取线程中按顺序处理，队列中的顺序与工作进程发送的顺序一致
+        future = self.submit(inputs, config, lambda node, token: loop.call_soon_threadsafe(
+            tokens.put_nowait, (node, token)), nodes)
+        future.add_done_callback(lambda _: loop.call_soon_threadsafe(tokens.put_nowait, None))
+        while True:
+            item = await tokens.get()
+            if item is None:
+                break
+            yield item
+        future.result()
+
+    def _dispatch(self) -> None:
+        # 调用方需持有 self._lock：把排队的任务交给空闲名额最多的工作进程
+        while self._queue:
+            ready = [slot for slot in self._slots
+                     if slot.ready.is_set() and len(slot.assigned) < self.concurrency]
+            if not ready:
+                return
+            slot = min(ready, key=lambda candidate: len(candidate.assigned))
+            task = self._queue.popleft()
+            try:
+                slot.conn.send((task.task_id, task.inputs, task.config, task.nodes))
+            except (OSError, ValueError) as e:
+                if isinstance(e, ValueError) or not slot.process.is_alive():
+                    # ValueError 为连接已关闭；进程已退出时由监控线程重启，任务放回队首
+                    self._queue.appendleft(task)
+                    slot.ready.clear()
+                    continue
+                self._fail(task, e)
+                continue
+            except Exception as e:
+                # 输入无法 pickle
+                self._fail(task, e)
+                continue
+            task.slot = slot
+            slot.assigned.add(task.task_id)
+
+    def _fail(self, task: _Task, error: BaseException, outcome: str = "failed") -> None:
+        # 调用方需持有 self._lock
+        self._tasks.pop(task.task_id, None)
+        if task.slot is not None:
+            task.slot.assigned.discard(task.task_id)
+        self.counts[outcome] += 1
+        if not task.future.done():
+            task.future.set_exception(error)
+
+    # --- 读取结果与健康检查 ---
+
+    def _read_loop(self) -> None:
+        while not self._stopped.is_set():
+            with self._lock:
+                connections = {slot.conn: slot for slot in self._slots if slot.conn is not None}
+            for conn in wait(list(connections), timeout=0.2):
+                slot = connections[conn]
+                try:
+                    message = conn.recv()
+                except (EOFError, OSError):
+                    self._recover(slot, conn, "exited")
+                    continue
+                self._handle(slot, message)
+
+    def _handle(self, slot: _Slot, message: tuple) -> None:
+        kind = message[0]
+        slot.last_seen = time.monotonic()
+        if kind == "heartbeat":
+            return
+        if kind == "ready":
+            with self._lock:
+                slot.pid = message[1]
+                slot.ready.set()
+                self._dispatch()
+            return
+        task = self._tasks.get(message[1])
+        if task is None:
+            return
+        if kind == "start":
+            task.started = True
+        elif kind == "token":
+            task.on_token(message[2], message[3])
+        else:
+            with self._lock:
+                self._tasks.pop(task.task_id, None)
+                slot.assigned.discard(task.task_id)
+                if kind == "done":
+                    self.counts["done"] += 1
+                    task.future.set_result(message[2])
+                else:
+                    self.counts["failed"] += 1
+                    task.future.set_exception(WorkerTaskError(message[2], message[3]))
+                self._dispatch()
+
+    def _monitor_loop(self) -> None:
+        while not self._stopped.wait(self.heartbeat_interval):
+            now = time.monotonic()
+            for slot in self._slots:
+                conn = slot.conn
+                if conn is None:
+                    continue
+                if not slot.process.is_alive():
+                    self._recover(slot, conn, "exited")
+                elif now - slot.last_seen > (self.heartbeat_timeout if slot.ready.is_set() else self.startup_timeout):
+                    # 预热阶段没有心跳，按 startup_timeout 判断，启动卡住的进程同样会被重启
+                    self._recover(slot, conn, "unresponsive")
+
+    def _recover(self, slot: _Slot, conn, reason: str) -> None:
+        """
+        结束并重启一个工作进程：尚未开始的任务重新排队，已经开始的任务失败。
+        """
+        with self._lock:
+            if slot.conn is not conn:
+                # 读取线程与监控线程可能同时发现同一个进程退出
+                return
+            slot.conn = None
+            slot.ready.clear()
+            process = slot.process
+            tasks = [self._tasks[task_id] for task_id in slot.assigned if task_id in self._tasks]
+            slot.assigned.clear()
+            closing = self._closing
+        conn.close()
+        if process.is_alive():
+            process.kill()
+        process.join(5)
+        if closing:
+            with self._lock:
+                for task in tasks:
+                    self._fail(task, WorkerCrashed("工作进程池已关闭"), "crashed")
+            return
+        logger.warning("工作进程 %s（pid %s）%s，正在重启", slot.index, slot.pid, _REASONS[reason])
+        if metrics.enabled():
+            metrics.worker_restarts.inc(reason=reason)
+        with self._lock:
+            self.counts["restarts"] += 1
+            for task in reversed(tasks):
+                task.slot = None
+                if task.started:
+                    self._fail(task, WorkerCrashed(f"工作进程 {slot.index} {_REASONS[reason]}，任务没有完成"), "crashed")
+                else:
+                    self._queue.appendleft(task)
+        self._spawn(slot)
+
+    def close(self, timeout: Optional[float] = 30) -> None:
+        """
+        停止接收新任务，等待已提交的任务完成（最多 timeout 秒），然后让工作进程退出。
+        """
+        with self._lock:
+            if self._closing:
+                return
+            self._closing = True
+            futures = [task.future for task in self._tasks.values()]
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for future in futures:
+            try:
+                future.exception(None if deadline is None else max(0.0, deadline - time.monotonic()))
+            except Exception:
+                break
+        with self._lock:
+            for task in list(self._queue):
+                self._fail(task, WorkerCrashed("工作进程池已关闭"), "crashed")
+            self._queue.clear()
+            slots = [(slot, slot.conn) for slot in self._slots if slot.conn is not None]
+        for slot, conn in slots:
+            try:
+                conn.send(None)
+            except (OSError, ValueError):
+                pass
+        for slot, conn in slots:
+            slot.process.join(5)
+            self._recover(slot, conn, "stopped")
+        self._stopped.set()
+        for thread in self._threads:
+            thread.join()
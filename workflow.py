@@ -1,147 +1,480 @@
-import uuid
-from typing import TypedDict, Union, List, Annotated
+import asyncio
+import threading
+import time
+from typing import TypedDict, Union, List, Dict, Annotated, Any, AsyncIterator, Optional, Sequence, Tuple
 import operator
 from langchain_core.agents import AgentAction, AgentFinish
-from langchain_core.messages import BaseMessage, AIMessage
-from langgraph.graph import END, StateGraph
-from langgraph.prebuilt import ToolNode
-from langchain.agents.output_parsers.tools import ToolAgentAction
-from agents import agent_runnable, beautify_agent
-from tools import tools
+from langchain_core.messages import BaseMessage, AIMessage, HumanMessage
+from langchain_core.runnables import RunnableConfig
+from langchain_core.runnables.config import ContextThreadPoolExecutor, merge_configs
 from config import Config
+from beautify_pipeline import PIPELINED_LOG, PipelinedBeautifier
+from budget import EXHAUSTED, Budget, UsageCollector, find_duplicates, merge_usage
+from graph_builder import compile_graph, register_node_kind, register_router
+from history import HistoryPolicy
+from prefetch import get_prefetcher
+from routing import RoutingPolicy
+from scratchpad import (ScratchStep, ObservationPolicy, as_steps, merge_observations, merge_steps, record_steps,
+                        render_steps)
+from tracing import Lazy, configure as configure_tracing, get_logger, preview, traced
+
+logger = get_logger("workflow")
+
+# 路由判断不需要工具、由精简 prompt 直接给出的回答
+DIRECT_LOG = "直接作答"
 
 
 # 定义状态字典
 class AgentState(TypedDict):
     input: str
-    chat_history: list[BaseMessage]
-    agent_outcome: Union[AgentAction, AgentFinish, None]
-    intermediate_steps: Annotated[List[tuple[AgentAction, str]], operator.add]
+    # 每轮结束时追加本轮的问答，带检查点运行时跨轮累积
+    chat_history: Annotated[list[BaseMessage], operator.add]
+    agent_outcome: Union[AgentAction, List[AgentAction], AgentFinish, None]
+    # 每个节点只返回本步新增的记录，由 reducer 追加，避免整段历史被重复拼接
+    intermediate_steps: Annotated[List[ScratchStep], merge_steps]
+    observations: Annotated[Dict[str, str], merge_observations]
+    # 本次执行已经消耗的预算（tokens、seconds、duplicates），节点只返回本步的用量
+    budget: Annotated[Dict[str, float], merge_usage]
+
+
+# 编译好的图在首次使用时创建，按检查点存储区分；agents、langgraph 与 langchain.agents 也随之延迟导入
+_apps: Dict[Any, Any] = {}
+_lock = threading.Lock()
+
+
+# 定义节点函数，图中的每个节点由下方注册的节点类型按 Config.GRAPH 的声明构建
+def run_agent(
+        data: AgentState,
+        config: RunnableConfig,
+        prompt: str = "agent_prompt",
+        tools: Optional[Sequence[str]] = None,
+) -> dict:
+    start = time.perf_counter()
+    data = _restored(data)
+    budget = Budget.from_config(config)
+    usage = _budget_usage(data)
+    # 预算用尽时不再调用模型，直接用已有的工具结果作答
+    reason = budget.exhausted(usage)
+    if reason is not None:
+        return _finish_on_budget(budget, reason, data, usage)
+
+    # 会话中保存完整历史，发送给模型的部分由历史策略截断或摘要
+    chat_history = HistoryPolicy.from_config().apply(data.get("chat_history") or [])
+    collector = UsageCollector()
+    config = merge_configs(config, {"callbacks": [collector]})
+    routing = RoutingPolicy.from_config()
+    # 第一轮按本地特征分流：不需要工具的问题用精简的 prompt 直接作答，不带工具 schema 与 scratchpad
+    if not data["intermediate_steps"] and routing.route_question(data["input"]) == "direct":
+        agent_outcome = _run_direct(data["input"], chat_history, config, routing.direct_prompt)
+    else:
+        agent_outcome = _run_tool_agent(data, chat_history, config, prompt, tools)
+    logger.debug("Agent 输出结果: %s", Lazy(preview, agent_outcome))
+
+    spent = {"tokens": collector.tokens, "seconds": time.perf_counter() - start}
+    usage = merge_usage(usage, spent)
+    if isinstance(agent_outcome, AgentFinish):
+        budget.observe(usage)
+        return {"agent_outcome": agent_outcome, "budget": spent}
+    # 这次调用用尽了预算时，不再执行模型请求的工具，它们认领的预取随之丢弃
+    reason = budget.exhausted(usage)
+    if reason is not None:
+        _discard_prefetched(agent_outcome if isinstance(agent_outcome, list) else [agent_outcome])
+        return {**_finish_on_budget(budget, reason, data, usage), "budget": spent}
+    return {"agent_outcome": agent_outcome, "budget": spent}
+
+
+def _run_tool_agent(data: AgentState, chat_history: List[BaseMessage], config: RunnableConfig, prompt: str,
+                    tools: Optional[Sequence[str]]):
+    # 按策略把紧凑记录渲染成 agent_scratchpad 需要的格式，旧结果会被截断或摘要
+    scratchpad = render_steps(
+        data["intermediate_steps"], data.get("observations", {}), ObservationPolicy.from_config()
+    )
+    agent_input = {**data, "chat_history": chat_history, "intermediate_steps": scratchpad}
+    # 每轮第一次调用模型的同时按原始问题预取搜索结果，agent 返回后再决定是否使用
+    prefetcher = get_prefetcher() if not data["intermediate_steps"] else None
+    speculation = prefetcher.speculate(data["input"], tools) if prefetcher is not None else None
+    agent_outcome = None
+    try:
+        if Config.BEAUTIFY["pipelined"]:
+            agent_outcome = _run_agent_pipelined(agent_input, config, prompt, tools)
+        else:
+            from agents import get_agent_runnable
+
+            # 模型在同一轮中可能请求多个工具调用，这里保留完整的列表交给 action 节点
+            agent_outcome = get_agent_runnable(prompt, tools).invoke(agent_input, config)
+    finally:
+        if speculation is not None:
+            prefetcher.resolve(speculation, agent_outcome)
+    return agent_outcome
+
+
+def _run_direct(question: str, chat_history: List[BaseMessage], config: RunnableConfig, prompt: str) -> AgentFinish:
+    from agents import get_direct_agent
+
+    message = get_direct_agent(prompt).invoke({"input": question, "chat_history": chat_history}, config)
+    return AgentFinish(return_values={"output": message.content}, log=DIRECT_LOG)
+
+
+def _restored(data: AgentState) -> AgentState:
+    # 从 JsonPlus 检查点继续执行时，intermediate_steps 中的记录是普通列表
+    steps = data.get("intermediate_steps")
+    if steps and type(steps[-1]) is not ScratchStep:
+        data = {**data, "intermediate_steps": as_steps(steps)}
+    return data
+
+
+def _budget_usage(data: AgentState) -> Dict[str, float]:
+    return {**(data.get("budget") or {}), "iterations": completed_loops(data)}
+
+
+def _finish_on_budget(budget: Budget, reason: str, data: AgentState, usage: Dict[str, float]) -> dict:
+    logger.warning("预算用尽（%s），用已有的结果作答: %s", reason, usage)
+    budget.observe(usage)
+    return {"agent_outcome": budget.finish(reason, data["intermediate_steps"], data.get("observations") or {})}
+
+
+def _run_agent_pipelined(agent_input: dict, config: RunnableConfig, prompt: str, tools: Optional[Sequence[str]]):
+    """
+    流式运行 agent，最终回答的每个句子生成后立即并发润色，返回已润色的 AgentFinish。
+    """
+    from agents import get_agent_runnable, get_beautify_agent
 
+    beautifier = PipelinedBeautifier.from_config(get_beautify_agent())
+    agent_outcome = None
+    agent = get_agent_runnable(prompt, tools)
+    for agent_outcome in agent.stream(agent_input, merge_configs(config, {"callbacks": [beautifier]})):
+        pass
+    if not isinstance(agent_outcome, AgentFinish):
+        beautifier.cancel()
+        return agent_outcome
+    return AgentFinish(
+        return_values={"output": beautifier.finish(agent_outcome.return_values["output"])},
+        log=PIPELINED_LOG,
+    )
 
-# 创建工具节点
-tool_node = ToolNode(tools)
 
+def _observation(result) -> str:
+    # 只保留工具返回的文本，出错时是交给模型的错误说明
+    logger.debug("工具执行结果: %s", Lazy(preview, result))
+    return result.content
 
-# 定义节点函数
-def run_agent(data: AgentState) -> dict:
-    print("\n--- 进入 agent 节点 ---")
-    print("当前状态:", data)
-    agent_outcome = agent_runnable.invoke(data)
-    if isinstance(agent_outcome, list):
-        agent_outcome = agent_outcome[0]
-    print("Agent 输出结果:", agent_outcome)
-    return {"agent_outcome": agent_outcome}
+
+def _execute_action(agent_action) -> str:
+    if not isinstance(agent_action, AgentAction):
+        return "Unknown action"
+    from tools import get_tool_dispatcher
+
+    logger.debug("调用工具: %s, 输入: %s", agent_action.tool, agent_action.tool_input)
+    # 该调用认领了预取的结果时直接使用，预取失败时照常调用工具
+    prefetcher = get_prefetcher()
+    if prefetcher is not None:
+        prefetched = prefetcher.take(getattr(agent_action, "tool_call_id", ""))
+        if prefetched is not None:
+            return prefetched
+    # 按工具名直接调用，参数按工具的 schema 校验，不再构造消息交给 ToolNode
+    return _observation(get_tool_dispatcher().invoke(
+        agent_action.tool, agent_action.tool_input, getattr(agent_action, "tool_call_id", "")
+    ))
+
+
+async def _aexecute_action(agent_action, semaphore: asyncio.Semaphore) -> str:
+    if not isinstance(agent_action, AgentAction):
+        return "Unknown action"
+    from tools import get_tool_dispatcher
+
+    logger.debug("调用工具: %s, 输入: %s", agent_action.tool, agent_action.tool_input)
+    prefetcher = get_prefetcher()
+    if prefetcher is not None:
+        prefetched = await prefetcher.atake(getattr(agent_action, "tool_call_id", ""))
+        if prefetched is not None:
+            return prefetched
+    async with semaphore:
+        result = await get_tool_dispatcher().ainvoke(
+            agent_action.tool, agent_action.tool_input, getattr(agent_action, "tool_call_id", "")
+        )
+    return _observation(result)
+
+
+def _discard_prefetched(actions: list) -> None:
+    prefetcher = get_prefetcher()
+    if prefetcher is not None and actions:
+        prefetcher.discard(actions)
+
+
+def _agent_actions(data: AgentState) -> list:
+    agent_actions = data["agent_outcome"]
+    if not isinstance(agent_actions, list):
+        agent_actions = [agent_actions]
+    logger.debug("Agent 动作: %s", Lazy(preview, agent_actions))
+    return agent_actions
+
+
+def _record_tools(data: AgentState, agent_actions: list, duplicates: list, results: list, start: float) -> dict:
+    # 重复的查询不再调用工具，直接复用之前的结果，但计入预算
+    previous = data["intermediate_steps"]
+    observations = data.get("observations") or {}
+    results = iter(results)
+    outputs = []
+    for source in duplicates:
+        if source is None:
+            outputs.append(next(results))
+        elif source >= 0:
+            outputs.append(outputs[source])
+        else:
+            outputs.append(observations[previous[-1 - source].result_ref])
+    repeated = len(duplicates) - duplicates.count(None)
+    if repeated:
+        logger.debug("本轮有 %s 个重复的查询，复用之前的结果", repeated)
+
+    # 本轮所有结果按模型给出的顺序一起写入，只返回增量
+    steps, new_observations = record_steps(previous, agent_actions, outputs)
+    return {
+        "intermediate_steps": steps,
+        "observations": new_observations,
+        "budget": {"seconds": time.perf_counter() - start, "duplicates": repeated},
+    }
 
 
 def execute_tools(data: AgentState) -> dict:
-    print("\n--- 进入 action 节点 ---")
-    print("当前状态:", data)
-    agent_action = data["agent_outcome"]
-    if isinstance(agent_action, list):
-        agent_action = agent_action[0]
-    print("Agent 动作:", agent_action)
-
-    if isinstance(agent_action, AgentAction):
-        tool_name = agent_action.tool
-        tool_input = agent_action.tool_input["query"]
-        print(f"调用工具: {tool_name}, 输入: {tool_input}")
-
-        # 生成唯一的 tool_call_id
-        tool_call_id = str(uuid.uuid4())
-
-        # 构造符合 ToolNode 要求的输入格式
-        tool_input_dict = {
-            "messages": [
-                {"role": "user", "content": tool_input},
-                AIMessage(
-                    content="",
-                    tool_calls=[
-                        {
-                            "id": tool_call_id,
-                            "name": tool_name,
-                            "args": {"query": tool_input},
-                        }
-                    ],
-                ),
-            ],
-            "tool": tool_name,
-            "tool_input": tool_input,
-        }
-
-        output = tool_node.invoke(tool_input_dict)
-        print("工具执行结果:", output)
+    start = time.perf_counter()
+    data = _restored(data)
+    agent_actions = _agent_actions(data)
+    duplicates = find_duplicates(data["intermediate_steps"], agent_actions)
+    pending = [action for action, source in zip(agent_actions, duplicates) if source is None]
+    _discard_prefetched([action for action, source in zip(agent_actions, duplicates) if source is not None])
+
+    if len(pending) <= 1:
+        results = [_execute_action(action) for action in pending]
     else:
-        output = "Unknown action"
-    return {"intermediate_steps": data["intermediate_steps"] + [(agent_action, str(output))]}
+        # 同一轮的多个工具调用在有界线程池中并发执行，总耗时约等于最慢的一次调用
+        max_workers = min(len(pending), Config.TOOL_CONCURRENCY)
+        with ContextThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(_execute_action, pending))
+
+    return _record_tools(data, agent_actions, duplicates, results, start)
+
+
+async def aexecute_tools(data: AgentState) -> dict:
+    """
+    execute_tools 的异步版本，图通过 ainvoke/astream 运行时使用。
+    """
+    start = time.perf_counter()
+    data = _restored(data)
+    agent_actions = _agent_actions(data)
+    duplicates = find_duplicates(data["intermediate_steps"], agent_actions)
+    pending = [action for action, source in zip(agent_actions, duplicates) if source is None]
+    _discard_prefetched([action for action, source in zip(agent_actions, duplicates) if source is not None])
+
+    semaphore = asyncio.Semaphore(Config.TOOL_CONCURRENCY)
+    results = await asyncio.gather(*(_aexecute_action(action, semaphore) for action in pending))
+
+    return _record_tools(data, agent_actions, duplicates, results, start)
+
 
+def _exchange(data: AgentState, output: str) -> List[BaseMessage]:
+    return [HumanMessage(content=data["input"]), AIMessage(content=output)]
 
-def beautify_output(data: AgentState) -> dict:
-    print("\n--- 进入 beautify 节点 ---")
-    print("当前状态:", data)
 
-    # 获取原始输出
+def beautify_output(data: AgentState, prompt: str = "beautify_prompt") -> dict:
+    # 流水线模式下 agent 节点已经完成润色
+    if isinstance(data["agent_outcome"], AgentFinish) and data["agent_outcome"].log == PIPELINED_LOG:
+        return {"chat_history": _exchange(data, data["agent_outcome"].return_values["output"])}
+
+    # 获取原始输出，其他返回值（如预算用尽的原因）原样保留
     if isinstance(data["agent_outcome"], AgentFinish):
-        original_output = data["agent_outcome"].return_values["output"]
+        return_values = data["agent_outcome"].return_values
+        original_output = return_values["output"]
     else:
+        return_values = {}
         original_output = str(data["agent_outcome"])
 
-    print("原始输出:", original_output)
+    logger.debug("原始输出: %s", Lazy(preview, original_output))
+
+    # 短回答或已经通顺的回答不再润色
+    if RoutingPolicy.from_config().route_output(original_output) not in (None, "beautify"):
+        return {"chat_history": _exchange(data, original_output)}
+
+    from agents import get_beautify_agent
 
     # 调用美化 Agent
-    beautified_output = beautify_agent.invoke({"text": original_output})
-    print("美化后的输出:", beautified_output.content)
+    beautified_output = get_beautify_agent(prompt).invoke({"text": original_output})
+    logger.debug("美化后的输出: %s", Lazy(preview, beautified_output.content))
 
-    # 更新状态
+    # 更新状态，本轮问答追加到对话历史
     return {
         "agent_outcome": AgentFinish(
-            return_values={"output": beautified_output.content},
+            return_values={**return_values, "output": beautified_output.content},
             log="文本美化完成",
-        )
+        ),
+        "chat_history": _exchange(data, beautified_output.content),
     }
 
 
-# 定义条件判断函数
-def should_continue(data: AgentState) -> str:
-    print("\n--- 检查是否继续 ---")
-    agent_outcome = data["agent_outcome"]
-    print("agent_outcome:", agent_outcome)
-    if isinstance(agent_outcome, list):
-        action = agent_outcome[0]
-    else:
-        action = agent_outcome
-    if isinstance(action, AgentFinish):
-        print("Agent 完成，进入美化节点")
-        return "beautify"
-    elif isinstance(action, ToolAgentAction):
-        print(f"Agent 需要调用工具: {action.tool}, 输入: {action.tool_input}")
+# 定义路由：agent_outcome 的类型 -> 路由结果，每种类型只在第一次出现时用 isinstance 判断
+_OUTCOME_ROUTES: Dict[type, str] = {}
+
+
+def _classify_outcome(outcome) -> str:
+    from langchain.agents.output_parsers.tools import ToolAgentAction
+
+    if isinstance(outcome, AgentFinish):
+        return "finish"
+    if isinstance(outcome, ToolAgentAction):
         return "continue"
-    else:
-        print("未知的 Agent 输出，结束执行")
-        return "end"
+    return "end"
+
+
+def route_agent_outcome(data: AgentState) -> str:
+    """
+    agent 需要调用工具时返回 continue，给出最终回答时返回 finish，预算用尽时返回 budget，其他情况返回 end。
+    """
+    outcome = data["agent_outcome"]
+    if type(outcome) is list:
+        outcome = outcome[0] if outcome else None
+    route = _OUTCOME_ROUTES.get(type(outcome))
+    if route is None:
+        route = _OUTCOME_ROUTES[type(outcome)] = _classify_outcome(outcome)
+    if route == "finish" and EXHAUSTED in outcome.return_values:
+        return "budget"
+    if route == "end":
+        logger.warning("未知的 Agent 输出，结束执行: %s", Lazy(preview, outcome))
+    return route
+
+
+def completed_loops(data: AgentState) -> int:
+    # 已经完成的 agent -> action 轮数
+    steps = data.get("intermediate_steps")
+    return ScratchStep(*steps[-1]).turn + 1 if steps else 0
+
+
+# 节点类型与路由器，Config.GRAPH 按名字引用
+def _check_prompt(spec: dict, default: str) -> List[str]:
+    prompt = spec.get("prompt", default)
+    if prompt not in Config.PROMPT_TEMPLATES:
+        return [f"prompt {prompt!r} 不在 Config.PROMPT_TEMPLATES 中"]
+    return []
+
+
+def _validate_agent(spec: dict) -> List[str]:
+    problems = _check_prompt(spec, "agent_prompt")
+    if Config.ROUTING["enabled"]:
+        problems.extend(_check_prompt({"prompt": Config.ROUTING["direct_prompt"]}, "direct_prompt"))
+    unknown = [name for name in spec.get("tools") or [] if name not in Config.TOOLS]
+    if unknown:
+        problems.append(f"工具 {unknown} 没有在 Config.TOOLS 中启用")
+    return problems
+
+
+def _agent_node(name: str, spec: dict):
+    prompt = spec.get("prompt", "agent_prompt")
+    tools = spec.get("tools")
+
+    @traced(name)
+    def node(data: AgentState, config: RunnableConfig) -> dict:
+        return run_agent(data, config, prompt, tools)
+
+    return node
+
+
+def _tools_node(name: str, spec: dict):
+    from langgraph.utils.runnable import RunnableCallable
+
+    return RunnableCallable(traced(name)(execute_tools), traced(name)(aexecute_tools), name=name)
+
+
+def _rewrite_node(name: str, spec: dict):
+    prompt = spec.get("prompt", "beautify_prompt")
+
+    @traced(name)
+    def node(data: AgentState) -> dict:
+        return beautify_output(data, prompt)
+
+    return node
+
+
+register_node_kind("agent", _agent_node, _validate_agent)
+register_node_kind("tools", _tools_node)
+register_node_kind("rewrite", _rewrite_node, lambda spec: _check_prompt(spec, "beautify_prompt"))
+register_router("agent_outcome", route_agent_outcome, ("continue", "finish", "budget", "end"), completed_loops)
 
 
 # 创建和配置图
-def create_workflow():
-    workflow = StateGraph(AgentState)
-
-    # 添加节点
-    for node_name in Config.WORKFLOW_ORDER:
-        if node_name == "agent":
-            workflow.add_node("agent", run_agent)
-        elif node_name == "action":
-            workflow.add_node("action", execute_tools)
-        elif node_name == "beautify":
-            workflow.add_node("beautify", beautify_output)
-
-    # 设置入口点
-    workflow.set_entry_point(Config.WORKFLOW_ORDER[0])
-
-    # 添加条件边
-    for node_name, edges in Config.CONDITIONAL_EDGES.items():
-        if isinstance(edges, dict):
-            workflow.add_conditional_edges(node_name, should_continue, edges)
-        else:
-            workflow.add_edge(node_name, edges)
+def create_workflow(checkpointer=None):
+    """
+    返回编译好的图。首次调用时构建，之后复用同一个实例；节点在运行时才取用模型与工具。
+
+    checkpointer 为 None 时按 Config.CHECKPOINT["enabled"] 决定是否保存检查点；
+    True 使用共享的 SQLite 存储，False 不保存，也可以传入任意 BaseCheckpointSaver。
+    带检查点的图运行时需要在 config 中提供 thread_id，见 session_config()。
+    """
+    configure_tracing()
+    if checkpointer is None:
+        checkpointer = Config.CHECKPOINT["enabled"]
+    app = _apps.get(checkpointer)
+    if app is None:
+        with _lock:
+            app = _apps.get(checkpointer)
+            if app is None:
+                app = _apps[checkpointer] = _build_workflow(checkpointer)
+    return app
+
+
+def resolve_checkpointer(checkpointer):
+    """
+    True 换成共享的 SQLite 存储，False 换成 None，其他值原样返回。
+    """
+    if checkpointer is True:
+        from checkpoints import get_checkpointer
+
+        return get_checkpointer()
+    return checkpointer or None
+
+
+def _build_workflow(checkpointer):
+    # 节点、边与路由按 Config.GRAPH 的声明构建，编译前完整校验拓扑
+    return compile_graph(AgentState, checkpointer=resolve_checkpointer(checkpointer))
+
+
+def session_config(thread_id: str, config: Optional[RunnableConfig] = None) -> RunnableConfig:
+    return merge_configs(config, {"configurable": {"thread_id": thread_id}})
+
+
+def _turn_inputs(snapshot, question: str) -> Optional[dict]:
+    # 同一个问题的上一次执行没有跑完（进程崩溃或节点异常）时从最后完成的节点继续，
+    # 已完成的 agent 与工具调用不会重新执行
+    if snapshot.next and snapshot.values.get("input") == question:
+        return None
+    # 新的一轮：chat_history 保留，上一轮的工具记录、结果与预算清空
+    return {"input": question, "agent_outcome": None, "intermediate_steps": None, "observations": None,
+            "budget": None}
+
+
+def turn_inputs(app, config: RunnableConfig, question: str) -> Optional[dict]:
+    """
+    返回会话中下一轮的输入，返回 None 表示继续上一次中断的执行，直接传给 app.invoke 即可。
+    """
+    return _turn_inputs(app.get_state(config), question)
+
+
+async def aturn_inputs(app, config: RunnableConfig, question: str) -> Optional[dict]:
+    return _turn_inputs(await app.aget_state(config), question)
+
+
+async def astream_tokens(
+        app,
+        inputs: dict,
+        config: Optional[RunnableConfig] = None,
+        nodes: Tuple[str, ...] = ("agent", "beautify"),
+) -> AsyncIterator[Tuple[str, str]]:
+    """
+    以流式方式运行编译好的图，逐个产出 (节点名, token)。
 
-    return workflow.compile()
+    只转发 nodes 中各节点的模型输出，agent 节点请求工具调用的轮次没有文本内容，不会产出 token。
+    """
+    async for event in app.astream_events(inputs, config, version="v2"):
+        if event["event"] != "on_chat_model_stream":
+            continue
+        node = event["metadata"].get("langgraph_node")
+        content = event["data"]["chunk"].content
+        if node in nodes and content:
+            yield node, content